@@ -1,5 +1,5 @@
 # app.py — Recon + GPT Dashboard (DB-backed charts, enrichment, attribution)
-import os, sys, shlex, json, re, subprocess, sqlite3, csv as _csv
+import os, sys, shlex, json, re, subprocess, sqlite3, time, csv as _csv
 from datetime import datetime
 from pathlib import Path
 from typing import Optional, List, Dict, Any, Tuple
@@ -10,6 +10,10 @@ import matplotlib.pyplot as plt
 import matplotlib.patches as _patches
 from dotenv import load_dotenv
 
+from src.report.frames import jsonl_to_df
+from src import db as recon_db
+from src.batch import BatchRun
+
 load_dotenv()
 
 ROOT = Path(__file__).resolve().parent
@@ -47,18 +51,6 @@ def tail_text(path: Path, n=2000) -> str:
     except Exception as e:
         return f"(error reading {path}: {e})"
 
-def jsonl_to_df(path: Path, max_rows: int = 10000) -> pd.DataFrame:
-    rows = []
-    if not path.exists(): return pd.DataFrame()
-    with path.open("r", encoding="utf-8", errors="ignore") as f:
-        for i, line in enumerate(f):
-            if i >= max_rows: break
-            s = line.strip()
-            if not s: continue
-            try: rows.append(json.loads(s))
-            except Exception: pass
-    return pd.DataFrame(rows) if rows else pd.DataFrame()
-
 def count_lines(p: Path) -> int:
     if not p.exists(): return 0
     try: return sum(1 for _ in p.open("r", encoding="utf-8", errors="ignore"))
@@ -73,7 +65,8 @@ def build_cmd(target: str, run_id: str, katana_depth: int, fast_discovery: bool,
               do_ports: bool, do_tls: bool, do_screens: bool, do_takeovers: bool,
               httpx_threads: int, httpx_rate: int, nuclei_conc: int, nuclei_rate: int,
               nuclei_sev: str, nuclei_tags: str, force_url: str,
-              use_subfinder: bool, use_amass: bool, amass_mode: str, write_attrib: bool):
+              use_subfinder: bool, use_amass: bool, amass_mode: str, write_attrib: bool,
+              adaptive_rates: bool = False, run_dir: Optional[Path] = None):
     # IMPORTANT: matches python -m src.cli [OPTIONS] DOMAIN (no "run" subcommand)
     args = [sys.executable, "-m", "src.cli", target,
             "--run-id", run_id, "--katana-depth", str(katana_depth),
@@ -88,6 +81,8 @@ def build_cmd(target: str, run_id: str, katana_depth: int, fast_discovery: bool,
     if nuclei_sev.strip(): args += ["--nuclei-severity", nuclei_sev.strip()]
     if nuclei_tags.strip(): args += ["--nuclei-tags", nuclei_tags.strip()]
     if force_url.strip(): args += ["--force-url", force_url.strip()]
+    if adaptive_rates: args += ["--adaptive-rates"]
+    if run_dir is not None: args += ["--run-dir", str(run_dir)]
     # enumeration toggles
     if use_subfinder:
         args += ["--use-subfinder"]
@@ -114,6 +109,48 @@ def stream_process(cmd, cwd: Path):
         except Exception: pass
         proc.wait()
 
+def render_batch(batch: BatchRun):
+    """Status table + one target's log for a batch, refreshed until it finishes."""
+    st.subheader(f"Batch: {len(batch.jobs)} target(s), {batch.parallel} at a time")
+    if batch.running() and st.button("⏹ Stop batch"):
+        batch.cancel()
+    progress = st.empty()
+    table_box = st.empty()
+    targets = [j["target"] for j in batch.jobs]
+    pick = st.selectbox("Log", targets, key="batch_log_target")
+    job = batch.jobs[targets.index(pick)]
+    log_box = st.empty()
+    while True:
+        stats = batch.stats()
+        ended = sum(n for k, n in stats["counts"].items() if k not in ("queued", "running"))
+        progress.progress(ended / len(batch.jobs) if batch.jobs else 1.0,
+                          text=f"{ended}/{len(batch.jobs)} finished • " +
+                               ", ".join(f"{n} {k}" for k, n in sorted(stats["counts"].items())))
+        table_box.dataframe(pd.DataFrame(batch.table()), hide_index=True, use_container_width=True)
+        log_box.code(tail_text(job["log"], n=600) or "(waiting to start)", language="bash")
+        if not batch.running():
+            break
+        time.sleep(1.0)
+
+    stats = batch.stats()
+    st.success(f"✅ Batch finished in {stats['wall_s']:.0f}s "
+               f"({stats['work_s']:.0f}s of scanning, {stats['speedup']:.1f}x from running in parallel)")
+    if st.session_state.get("batch_summarised"):
+        return
+    st.session_state["batch_summarised"] = True
+    mode = st.session_state.get("batch_auto_mode", "Off")
+    done = [j for j in batch.jobs if j["finished"]]
+    last = max(done, key=lambda j: j["finished"])["run_dir"] if done else None
+    if mode == "This run" and last:
+        if last.exists():
+            with st.spinner("Summarising the last scan in the batch with GPT…"):
+                run_per_run_summary_ui(last, chars_per_chunk=80000)
+        else:
+            st.warning(f"Summary skipped: last run folder not found ({last}). Check its log above.")
+    elif mode == "Global":
+        with st.spinner("Generating Global GPT Summary (ALL runs)…"):
+            run_global_summary_ui(include_medium=False, since_days=None, severities="critical,high", chars_per_chunk=80000)
+
 # ============== Attribution helpers ==============
 
 def load_attribution(run_dir: Path) -> Tuple[Dict[str, set], Dict[str, int]]:
@@ -285,6 +322,63 @@ def run_enrichment(run_dir: Path, refresh_kev: bool = False):
     out = enrich_run_with_known_vulns(str(run_dir), nvd_api_key=os.getenv("NVD_API_KEY"), refresh_kev=refresh_kev)
     return out
 
+# ============== Screenshots ==============
+
+SCREENS_PER_PAGE = 24
+
+def load_screenshot_groups(run_dir: Path) -> List[Dict[str, Any]]:
+    """screenshots.jsonl folded to one entry per stored image, largest groups first."""
+    f = run_dir / "screenshots.jsonl"
+    if not f.exists():
+        return []
+    groups: Dict[str, Dict[str, Any]] = {}
+    for line in f.read_text(encoding="utf-8").splitlines():
+        try:
+            r = json.loads(line)
+        except json.JSONDecodeError:
+            continue
+        g = groups.setdefault(r["image"], {"image": r["image"], "path": r.get("path", ""),
+                                           "thumb": r.get("thumb", ""), "urls": [], "reused": 0})
+        g["urls"].append(r["url"])
+        g["reused"] += bool(r.get("reused"))
+    return sorted(groups.values(), key=lambda g: (-len(g["urls"]), g["urls"][0]))
+
+def _store_path(p: str) -> Optional[Path]:
+    if not p:
+        return None
+    path = Path(p)
+    path = path if path.is_absolute() else ROOT / path
+    return path if path.exists() else None
+
+def render_screenshot_gallery(run_dir: Path):
+    groups = load_screenshot_groups(run_dir)
+    if not groups:
+        st.info("No screenshots for this run (scan with --do-screens).")
+        return
+    n_urls = sum(len(g["urls"]) for g in groups)
+    n_reused = sum(g["reused"] for g in groups)
+    c1, c2, c3 = st.columns(3)
+    c1.metric("URLs", n_urls)
+    c2.metric("Distinct pages", len(groups))
+    c3.metric("Unchanged since last capture", n_reused)
+    pages = (len(groups) - 1) // SCREENS_PER_PAGE + 1
+    page = st.number_input("Page", min_value=1, max_value=pages, value=1, step=1,
+                           key=f"screens_page_{run_dir.name}") if pages > 1 else 1
+    # only this page's thumbnails are read from disk
+    chunk = groups[(page - 1) * SCREENS_PER_PAGE: page * SCREENS_PER_PAGE]
+    cols = st.columns(4)
+    for i, g in enumerate(chunk):
+        with cols[i % 4]:
+            img = _store_path(g["thumb"]) or _store_path(g["path"])
+            label = g["urls"][0] + (f"  (+{len(g['urls']) - 1} more)" if len(g["urls"]) > 1 else "")
+            if img:
+                st.image(str(img), caption=label, use_container_width=True)
+            else:
+                st.caption(f"{label} — image missing")
+            if len(g["urls"]) > 1:
+                with st.expander(f"{len(g['urls'])} URLs look like this"):
+                    st.code("\n".join(g["urls"][:200]))
+
 # ============== File-backed dashboards ==============
 
 def list_runs_sorted_oldest_first() -> List[Path]:
@@ -425,6 +519,29 @@ def db_top_hosts(limit=20, since_days=None, target_like=None) -> pd.DataFrame:
     con.close()
     return df
 
+def db_stage_timings(target_like=None) -> pd.DataFrame:
+    if not DB_PATH.exists(): return pd.DataFrame()
+    con = db_connect()
+    params = {}
+    wh = ""
+    if target_like:
+        wh = "WHERE r.target LIKE :tlike"
+        params["tlike"] = f"%{target_like}%"
+    q = f"""
+      SELECT r.run_id, r.target, sm.stage, sm.started_at, sm.wall_s, sm.cpu_s,
+             sm.peak_rss_kb, sm.items_in, sm.items_out, sm.status
+      FROM stage_metric sm
+      JOIN run r ON r.id = sm.run_id
+      {wh}
+      ORDER BY sm.started_at
+    """
+    try:
+        df = pd.read_sql_query(q, con, params=params)
+    except Exception:
+        df = pd.DataFrame()  # DB predates the stage_metric table
+    con.close()
+    return df
+
 # ===================== UI =====================
 
 st.set_page_config(page_title="Recon + GPT Dashboard", layout="wide")
@@ -458,6 +575,8 @@ with st.sidebar:
         httpx_rate    = st.slider("httpx rate (RPS)", 20, 500, 100, 10)
         nuclei_conc   = st.slider("nuclei concurrency", 10, 500, 50, 10)
         nuclei_rate   = st.slider("nuclei rate (RPS)", 50, 1000, 200, 50)
+        adaptive_rates = st.checkbox("Adaptive rates per target", value=False,
+                                     help="Sliders seed a target's first run; later runs are tuned from its timeouts and throughput")
         nuclei_sev    = st.text_input("nuclei severity", placeholder="critical,high")
         nuclei_tags   = st.text_input("nuclei tags", placeholder="exposures,cve")
 
@@ -469,7 +588,9 @@ with st.sidebar:
     with st.expander("Batch Mode", expanded=False):
         batch_text = st.text_area("Targets (one per line)", height=120,
                                   placeholder="example.com\nhttps://hackerone.com\n*.monash.edu")
-        run_batch = st.button("📚 Run batch sequentially", use_container_width=True)
+        batch_parallel = st.slider("Parallel scans", 1, 8, 3,
+                                   help="Targets scanned at once; scanners still share the machine-wide limits")
+        run_batch = st.button("📚 Run batch", use_container_width=True)
 
     st.divider()
     go = st.button("🚀 Run scan", use_container_width=True)
@@ -493,7 +614,7 @@ with console_tab:
             cmd = build_cmd(target_in, run_id, katana_depth, fast_discovery, gau_enable, do_ports, do_tls,
                             do_screens, do_takeovers, httpx_threads, httpx_rate, nuclei_conc, nuclei_rate,
                             nuclei_sev, nuclei_tags, force_url,
-                            use_subfinder, use_amass, amass_mode, write_attrib)
+                            use_subfinder, use_amass, amass_mode, write_attrib, adaptive_rates)
 
             with st.spinner(f"Scanning {target_in} …"):
                 st.caption(f"Command: `{shlex.join(cmd)}`")
@@ -517,48 +638,31 @@ with console_tab:
                             run_global_summary_ui(include_medium=False, since_days=None, severities="critical,high", chars_per_chunk=80000)
 
     if run_batch:
-        targets = [t.strip() for t in batch_text.splitlines() if t.strip() and not t.strip().startswith("#")]
+        # one scan per host: example.com, https://example.com/ and *.example.com are the same target
+        targets = list(dict.fromkeys(normalize_target(t).lstrip("*.") for t in batch_text.splitlines()
+                                     if t.strip() and not t.strip().startswith("#")))
+        prev = st.session_state.get("batch")
         if not targets:
             st.error("No targets provided in batch.")
+        elif prev is not None and prev.running():
+            st.error("A batch is already running; stop it or wait for it to finish.")
         else:
-            st.info(f"Starting batch of {len(targets)} target(s).")
-            progress = st.progress(0.0, text="Batch progress")
-            blog_box = st.empty()
-            bdone_box = st.empty()
-
-            last_run_dir: Optional[Path] = None
-
-            for idx, tgt in enumerate(targets, 1):
-                run_id = datetime.now().strftime("%Y-%m-%d_%H%M%S")
-                raw_host = normalize_target(tgt)
-                host_token = safe_name(raw_host)
-                last_run_dir = RUNS_DIR / f"{run_id}_{host_token}"
-
+            run_id = datetime.now().strftime("%Y-%m-%d_%H%M%S")
+            jobs = []
+            for tgt in targets:
+                run_dir = RUNS_DIR / f"{run_id}_{safe_name(tgt)}"
                 cmd = build_cmd(tgt, run_id, katana_depth, fast_discovery, gau_enable, do_ports, do_tls,
                                 do_screens, do_takeovers, httpx_threads, httpx_rate, nuclei_conc, nuclei_rate,
                                 nuclei_sev, nuclei_tags, force_url,
-                                use_subfinder, use_amass, amass_mode, write_attrib)
-                with st.spinner(f"[{idx}/{len(targets)}] Scanning {tgt} …"):
-                    st.caption(f"Command: `{shlex.join(cmd)}`")
-                    buffer: List[str] = []
-                    try:
-                        for line in stream_process(cmd, ROOT):
-                            buffer.append(line)
-                            blog_box.code("\n".join(buffer[-600:]), language="bash")
-                    except Exception as e:
-                        st.error(f"Scan crashed for {tgt}: {e}")
-                progress.progress(idx/len(targets), text=f"Batch {idx}/{len(targets)} complete")
-            bdone_box.success("✅ Batch finished")
-
-            if auto_mode == "This run" and last_run_dir:
-                if last_run_dir.exists():
-                    with st.spinner("Summarising the last scan in the batch with GPT…"):
-                        run_per_run_summary_ui(last_run_dir, chars_per_chunk=80000)
-                else:
-                    st.warning(f"Summary skipped: last run folder not found ({last_run_dir}). Check batch console output for errors.")
-            elif auto_mode == "Global":
-                with st.spinner("Generating Global GPT Summary (ALL runs)…"):
-                    run_global_summary_ui(include_medium=False, since_days=None, severities="critical,high", chars_per_chunk=80000)
+                                use_subfinder, use_amass, amass_mode, write_attrib, adaptive_rates,
+                                run_dir=run_dir)
+                jobs.append((tgt, cmd, run_dir))
+            st.session_state["batch"] = BatchRun(jobs, ROOT, parallel=batch_parallel)
+            st.session_state["batch_auto_mode"] = auto_mode
+            st.session_state["batch_summarised"] = False
+
+    if st.session_state.get("batch") is not None:
+        render_batch(st.session_state["batch"])
 
 # ---------------- Runs Browser ----------------
 with runs_tab:
@@ -614,7 +718,7 @@ with runs_tab:
                 cols_hint = [c for c in ["template-id","matched-at","host","severity","info"] if c in df_nuc.columns]
                 st.dataframe(df_nuc[cols_hint] if cols_hint else df_nuc, use_container_width=True, hide_index=True)
         with tabs[5]:
-            st.write("Place screenshots here if you capture them.")
+            render_screenshot_gallery(sel_dir)
         with tabs[6]:
             rep = sel_dir / "report.md"
             if rep.exists():
@@ -727,6 +831,50 @@ with dash_tab:
         else:
             st.dataframe(df_hosts, use_container_width=True, hide_index=True)
 
+        # Zone explorer (reversed-label index on subdomain.rname)
+        st.subheader("Zone explorer")
+        zone = st.text_input("Zone", value="", key="zone_explorer",
+                             help="e.g. apps.monash.edu — lists child zones and every name seen under it")
+        if zone.strip():
+            con = db_connect()
+            try:
+                children = recon_db.zone_children(zone, con=con)
+                names = recon_db.zone_names(zone, limit=5000, con=con)
+            except sqlite3.OperationalError:
+                children, names = None, None
+                st.info("Zone index missing; run `python -m scripts.backfill_runs_to_db` to migrate recon.db.")
+            finally:
+                con.close()
+            if children is not None:
+                zc1, zc2 = st.columns(2)
+                with zc1:
+                    st.caption(f"{len(children)} child zone(s)")
+                    st.dataframe(pd.DataFrame(children, columns=["zone", "names"]),
+                                 use_container_width=True, hide_index=True)
+                with zc2:
+                    st.caption(f"{len(names)} name(s){' (first 5000)' if len(names) == 5000 else ''}")
+                    st.dataframe(pd.DataFrame([(n, c) for n, c, _ in names], columns=["name", "runs_seen"]),
+                                 use_container_width=True, hide_index=True)
+
+        # Stage timings over time
+        st.subheader("Stage timings over time")
+        timing_target = st.text_input("Target contains ", value="", key="timing_target",
+                                      help="Filter stage timings by target string")
+        df_tm = db_stage_timings(target_like=(timing_target or None))
+        df_tm = df_tm[df_tm["status"] != "skipped"] if not df_tm.empty else df_tm
+        if df_tm.empty:
+            st.info("No stage metrics yet (written by src.cli runs, or backfilled from metrics.json).")
+        else:
+            df_tm["dt"] = pd.to_datetime(df_tm["started_at"], unit="s")
+            fig = plt.figure()
+            for stage_name, g in df_tm.groupby("stage"):
+                plt.plot(g["dt"], g["wall_s"], marker="o", label=stage_name)
+            plt.legend(); plt.title("Wall time per stage across runs")
+            plt.xlabel("Stage start"); plt.ylabel("Seconds")
+            st.pyplot(fig)
+            with st.expander("Stage metrics (latest 200)"):
+                st.dataframe(df_tm.drop(columns=["dt"]).tail(200), use_container_width=True, hide_index=True)
+
         st.caption("Charts powered by data/recon.db.")
 
     else:
@@ -0,0 +1,155 @@
+# bench/e2e.py
+"""
+End-to-end pipeline benchmark against the stand-in tools in bench/fakebin.
+
+    python -m bench.e2e                       # 1k, 10k, 100k hosts vs bench/baseline.json
+    python -m bench.e2e --sizes 1000 --update-baseline
+    BENCH_ITEM_US=200 python -m bench.e2e     # add per-item tool latency
+
+Each size runs `python -m src.cli` in a scratch directory (so data/ caches and
+runs stay out of the repo) with every stage cache off, then reads the run's
+metrics.json for per-stage wall time and peak child RSS, plus the peak RSS of
+the CLI process itself. Results go to bench/results/; the exit status is 1 if
+any metric regressed past the tolerance against the stored baseline.
+Baselines are machine-specific: record one with --update-baseline on the box
+you compare on.
+"""
+from __future__ import annotations
+import argparse, json, os, shutil, subprocess, sys, tempfile, time
+from datetime import datetime
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+FAKEBIN = ROOT / "bench" / "fakebin"
+RESULTS_DIR = ROOT / "bench" / "results"
+BASELINE = ROOT / "bench" / "baseline.json"
+TOOLS = ("subfinder", "dnsx", "httpx", "nuclei", "naabu", "tlsx", "gau", "katana", "ffuf", "gowitness")
+
+# Regression = slower/bigger by more than the relative tolerance AND by more
+# than this absolute slack (keeps sub-second stages from flapping).
+WALL_SLACK_S = 0.5
+RSS_SLACK_KB = 20 * 1024
+SKIP_STAGES = {"summary"}   # network-bound LLM call, not part of the pipeline's throughput
+
+def _rss_kb(maxrss: int) -> int:
+    return maxrss // 1024 if sys.platform == "darwin" else maxrss
+
+def run_size(hosts: int, workdir: Path) -> dict:
+    env = os.environ.copy()
+    env["BENCH_HOSTS"] = str(hosts)
+    env["PYTHONPATH"] = str(ROOT) + os.pathsep + env.get("PYTHONPATH", "")
+    env.setdefault("OPENAI_API_KEY", "bench")   # summarise builds its client at import time
+    for t in TOOLS:
+        env[f"{t.upper()}_BIN"] = str(FAKEBIN / t)
+
+    run_id = f"bench{hosts}"
+    cmd = [sys.executable, "-m", "src.cli", "bench.example", "--run-id", run_id,
+           "--no-stage-cache", "--no-dns-cache", "--do-ports", "--no-write-attribution"]
+    log = workdir / f"{run_id}.log"
+    started = time.time()
+    with log.open("w", encoding="utf-8") as lf:
+        proc = subprocess.Popen(cmd, cwd=str(workdir), env=env, stdout=lf, stderr=subprocess.STDOUT)
+        _, status, ru = os.wait4(proc.pid, 0)
+        proc.returncode = os.waitstatus_to_exitcode(status)
+    wall = time.time() - started
+
+    metrics_file = workdir / "data" / "runs" / f"{run_id}_bench.example" / "metrics.json"
+    try:
+        stages = json.loads(metrics_file.read_text(encoding="utf-8"))["stages"]
+    except Exception:
+        raise SystemExit(f"[fatal] no metrics for {hosts} hosts (rc={proc.returncode}); see {log}")
+    failed = [s["stage"] for s in stages if s["status"] == "failed" and s["stage"] not in SKIP_STAGES]
+    if failed:
+        raise SystemExit(f"[fatal] stage(s) failed at {hosts} hosts: {', '.join(failed)}; see {log}")
+
+    return {
+        "hosts": hosts,
+        "wall_s": round(wall, 3),
+        "cli_peak_rss_kb": _rss_kb(ru.ru_maxrss),
+        "stages": {
+            s["stage"]: {k: s.get(k) for k in ("wall_s", "cpu_s", "peak_rss_kb", "items_in", "items_out")}
+            for s in stages if s["stage"] not in SKIP_STAGES
+        },
+    }
+
+def _worse(cur, base, tol: float, slack: float) -> bool:
+    if cur is None or base is None:
+        return False
+    return cur > base * (1 + tol) and cur - base > slack
+
+def compare(result: dict, base: dict, tol: float) -> list[str]:
+    out = []
+    checks = [("total wall_s", result["wall_s"], base.get("wall_s"), WALL_SLACK_S),
+              ("cli_peak_rss_kb", result["cli_peak_rss_kb"], base.get("cli_peak_rss_kb"), RSS_SLACK_KB)]
+    for name, st in result["stages"].items():
+        b = base.get("stages", {}).get(name, {})
+        checks.append((f"{name}.wall_s", st["wall_s"], b.get("wall_s"), WALL_SLACK_S))
+        checks.append((f"{name}.peak_rss_kb", st["peak_rss_kb"], b.get("peak_rss_kb"), RSS_SLACK_KB))
+    for label, cur, ref, slack in checks:
+        if _worse(cur, ref, tol, slack):
+            out.append(f"{result['hosts']} hosts: {label} {cur} vs baseline {ref}")
+    return out
+
+def _print_table(result: dict):
+    print(f"\n== {result['hosts']} hosts: {result['wall_s']:.1f}s total, "
+          f"CLI peak RSS {result['cli_peak_rss_kb'] / 1024:.0f} MiB")
+    print(f"{'stage':<12}{'wall_s':>10}{'cpu_s':>10}{'rss_MiB':>10}{'in':>10}{'out':>10}")
+    for name, s in result["stages"].items():
+        rss = f"{s['peak_rss_kb'] / 1024:.0f}" if s.get("peak_rss_kb") else "-"
+        print(f"{name:<12}{s['wall_s']:>10.2f}{s['cpu_s']:>10.2f}{rss:>10}"
+              f"{s['items_in'] if s['items_in'] is not None else '-':>10}"
+              f"{s['items_out'] if s['items_out'] is not None else '-':>10}")
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    ap.add_argument("--sizes", default="1000,10000,100000", help="Comma-separated host counts")
+    ap.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative regression (0.25 = 25%%)")
+    ap.add_argument("--baseline", default=str(BASELINE))
+    ap.add_argument("--update-baseline", action="store_true", help="Store these results as the new baseline")
+    ap.add_argument("--keep", action="store_true", help="Keep the scratch directories")
+    args = ap.parse_args(argv)
+
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    results = []
+    for n in sizes:
+        workdir = Path(tempfile.mkdtemp(prefix=f"recon-bench-{n}-"))
+        print(f"[+] {n} hosts (scratch: {workdir})")
+        results.append(run_size(n, workdir))
+        _print_table(results[-1])
+        if not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+    out = RESULTS_DIR / f"e2e_{datetime.now().strftime('%Y-%m-%d_%H%M%S')}.json"
+    out.write_text(json.dumps(results, indent=2), encoding="utf-8")
+    print(f"\n[i] results -> {out}")
+
+    baseline_path = Path(args.baseline)
+    baseline = {}
+    if baseline_path.exists():
+        baseline = json.loads(baseline_path.read_text(encoding="utf-8"))
+
+    if args.update_baseline:
+        for r in results:
+            baseline[str(r["hosts"])] = r
+        baseline_path.write_text(json.dumps(baseline, indent=2, sort_keys=True), encoding="utf-8")
+        print(f"[+] baseline updated -> {baseline_path}")
+        return 0
+
+    regressions = []
+    for r in results:
+        base = baseline.get(str(r["hosts"]))
+        if base is None:
+            print(f"[i] no baseline for {r['hosts']} hosts; run with --update-baseline to record one")
+            continue
+        regressions += compare(r, base, args.tolerance)
+    if regressions:
+        print("[fail] regressions beyond tolerance:")
+        for line in regressions:
+            print(f"  - {line}")
+        return 1
+    print("[ok] no regressions")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+# bench/fakebin/fake_tool.py
+"""
+Stand-ins for subfinder, dnsx, httpx, nuclei, naabu, tlsx, gau, katana, ffuf
+and gowitness that emit synthetic but realistically shaped output, so the
+pipeline can be timed without touching real targets. Output is deterministic
+for a given seed.
+
+Knobs (environment):
+  BENCH_HOSTS       names subfinder emits                        (default 1000)
+  BENCH_LIVE        fraction of names that resolve               (0.6)
+  BENCH_UP          fraction of probed hosts that answer HTTP    (0.7)
+  BENCH_FINDINGS    fraction of URLs with a nuclei finding       (0.02)
+  BENCH_ARCHIVE     archived URLs gau emits per name             (20)
+  BENCH_CAPACITY    req/s a target takes before httpx/nuclei
+                    requests start timing out                    (0 = unlimited)
+  BENCH_STARTUP_MS  fixed latency per tool invocation            (0)
+  BENCH_ITEM_US     latency per emitted item, in microseconds    (0)
+  BENCH_SEED        seed for every per-name decision             ("bench")
+"""
+import hashlib, json, os, re, sys, time, zlib
+
+SEED = os.environ.get("BENCH_SEED", "bench")
+ITEM_S = float(os.environ.get("BENCH_ITEM_US", "0")) / 1e6
+
+WORDS = ["api", "app", "auth", "cdn", "dev", "docs", "git", "img", "mail", "portal",
+         "shop", "sso", "stage", "status", "vpn", "www"]
+TECH = [["Nginx"], ["Apache HTTP Server", "PHP"], ["Microsoft IIS", "Microsoft ASP.NET"],
+        ["Nginx", "WordPress", "PHP"], ["Cloudflare"], ["Amazon S3"], ["Envoy"], ["Jenkins", "Jetty"]]
+SEVERITIES = ["info", "info", "low", "medium", "medium", "high", "critical"]
+CNAME_TARGETS = ["d111111abcdef8.cloudfront.net", "example.azurewebsites.net",
+                 "example.herokudns.com", "example.github.io"]
+RANDOM_LABEL = re.compile(r"^[0-9a-f]{12}\.")   # wildcard probes from resolve.detect_wildcards
+
+def _frac(*parts) -> float:
+    # not crc32: it is affine, so decisions keyed on the same name would correlate
+    h = hashlib.blake2b(":".join((SEED,) + tuple(map(str, parts))).encode(), digest_size=4).digest()
+    return int.from_bytes(h, "big") / 2**32
+
+def _pick(seq, *parts):
+    return seq[int(_frac(*parts) * len(seq)) % len(seq)]
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+def _arg(argv, *flags, default=None):
+    for f in flags:
+        if f in argv and argv.index(f) + 1 < len(argv):
+            return argv[argv.index(f) + 1]
+    return default
+
+def _lines(path):
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        for line in f:
+            s = line.strip()
+            if s:
+                yield s
+
+def _emit(s: str):
+    sys.stdout.write(s + "\n")
+    if ITEM_S:
+        time.sleep(ITEM_S)
+
+def _ip(host: str) -> str:
+    # ~8 names per address, so the IP-level port scan has something to collapse
+    pool = max(1, int(_env_float("BENCH_HOSTS", 1000)) // 8)
+    n = int(_frac("ip", host) * pool)
+    return f"10.{(n >> 16) & 255}.{(n >> 8) & 255}.{n & 255}"
+
+def _host_of(s: str) -> str:
+    s = s.split("://", 1)[-1]
+    return s.split("/", 1)[0].split(":", 1)[0]
+
+def _times_out(argv, rate_flag: str, host: str) -> bool:
+    # above capacity, a share 1 - capacity/rate of the hosts time out
+    cap = _env_float("BENCH_CAPACITY", 0)
+    rate = float(_arg(argv, rate_flag, default="0") or 0)
+    return cap > 0 and rate > cap and _frac("timeout", host, rate) < 1 - cap / rate
+
+def subfinder(argv):
+    domain = _arg(argv, "-d", default="bench.example")
+    n = int(_env_float("BENCH_HOSTS", 1000))
+    zones = max(1, n // 50)
+    for i in range(n):
+        _emit(f"{_pick(WORDS, 'w', i)}{i}.z{i % zones}.{domain}")
+
+def dnsx(argv):
+    live = _env_float("BENCH_LIVE", 0.6)
+    for name in _lines(_arg(argv, "-l", "-list")):
+        if RANDOM_LABEL.match(name) or _frac("live", name) >= live:
+            continue
+        rec = {"host": name, "ttl": 300, "resolver": ["127.0.0.1:53"], "a": [_ip(name)],
+               "status_code": "NOERROR", "timestamp": "2025-01-01T00:00:00Z"}
+        if _frac("cname", name) < 0.1:
+            rec["cname"] = [_pick(CNAME_TARGETS, "ct", name)]
+            if _frac("dangling", name) < 0.05:
+                rec["a"] = []            # CNAME to a deprovisioned resource
+                rec["status_code"] = "NXDOMAIN"
+        _emit(json.dumps(rec))
+
+def naabu(argv):
+    for ip in _lines(_arg(argv, "-list", "-l", "-host")):
+        for port in (80, 443):
+            _emit(f"{ip}:{port}")
+        if _frac("alt", ip) < 0.1:
+            _emit(f"{ip}:8080")
+
+def httpx(argv):
+    if "-h" in argv:
+        print("-l -list -json -status-code -title -tech-detect -silent -no-color "
+              "-follow-redirects -threads -rate -timeout -retries -hash")
+        return
+    up = _env_float("BENCH_UP", 0.7)
+    for inp in _lines(_arg(argv, "-l", "-list")):
+        host = _host_of(inp)
+        if _frac("up", host) >= up or _times_out(argv, "-rate", host):
+            continue
+        url = inp if "://" in inp else f"https://{host}"
+        body = hashlib.sha256(f"{SEED}:{url}".encode()).hexdigest()
+        _emit(json.dumps({
+            "timestamp": "2025-01-01T00:00:00Z", "url": url, "input": inp, "host": _ip(host),
+            "port": url.rsplit(":", 1)[-1] if url.count(":") > 1 else "443",
+            "scheme": url.split("://", 1)[0], "title": f"{host.split('.')[0]} home",
+            "webserver": _pick(TECH, "tech", host)[0], "tech": _pick(TECH, "tech", host),
+            "status_code": _pick([200, 200, 200, 301, 302, 403, 404], "sc", url),
+            "content_length": int(_frac("len", url) * 50000),
+            "content_type": "text/html", "hash": {"body_sha256": body}, "a": [_ip(host)],
+        }))
+
+def nuclei(argv):
+    if "-h" in argv:
+        print("-l -jsonl-export -c -rl -timeout -retries -silent -t -tags -etags -severity -elog")
+        return
+    rate = _env_float("BENCH_FINDINGS", 0.02)
+    out = _arg(argv, "-jsonl-export", "-je")
+    elog = _arg(argv, "-elog", "-error-log")
+    errors = open(elog, "w", encoding="utf-8") if elog else None
+    with open(out, "w", encoding="utf-8") as f:
+        for url in _lines(_arg(argv, "-l", "-list")):
+            if _times_out(argv, "-rl", _host_of(url)):
+                if errors:
+                    errors.write(json.dumps({"template": "http/generic", "input": url,
+                                             "error": "context deadline exceeded"}) + "\n")
+                continue
+            if _frac("vuln", url) >= rate:
+                continue
+            tpl = _pick(["exposed-panels", "git-config", "tech-detect", "cve-2021-41773", "ssl-dns-names"], "tpl", url)
+            f.write(json.dumps({
+                "template-id": tpl, "type": "http", "host": url, "matched-at": url,
+                "info": {"name": tpl, "severity": _pick(SEVERITIES, "sev", url), "tags": ["bench"]},
+                "timestamp": "2025-01-01T00:00:00Z",
+            }) + "\n")
+            if ITEM_S:
+                time.sleep(ITEM_S)
+    if errors:
+        errors.close()
+
+def tlsx(argv):
+    as_json = "-json" in argv
+    for inp in _lines(_arg(argv, "-l", "-list")):
+        host = _host_of(inp)
+        if _frac("tls", host) >= _env_float("BENCH_UP", 0.7):
+            continue
+        sans = [host]
+        if _frac("san", host) < 0.05:
+            sans.append("san-" + host)
+        if as_json:
+            fp = hashlib.sha256(f"{SEED}:cert:{host}".encode()).hexdigest()
+            _emit(json.dumps({"host": host, "port": "443", "subject_cn": host, "subject_an": sans,
+                              "fingerprint_hash": {"sha256": fp}}))
+        else:
+            _emit(",".join(sans))
+
+PATHS = ["/", "/login", "/api/v1/users", "/search", "/static/app.js", "/assets/logo.png",
+         "/css/site.css", "/fonts/inter.woff2", "/img/banner.jpg", "/docs/guide.pdf", "/index.php"]
+
+def _page_urls(base: str, key: str, n: int):
+    # mostly assets and tracking-parameter variants of a few pages, as archives look
+    for j in range(n):
+        path = _pick(PATHS, "path", key, j)
+        if _frac("id", key, j) < 0.4:
+            path = f"/item/{int(_frac('n', key, j) * 10**6)}"
+        q = ""
+        r = _frac("q", key, j)
+        if r < 0.3:
+            q = f"?utm_source=news{j % 4}&utm_medium=email"
+        elif r < 0.45:
+            q = f"?id={j % 3}"
+        yield f"{base}{path}{q}"
+
+def gau(argv):
+    domain = next((a for a in argv if not a.startswith("-")), "bench.example")
+    n = int(_env_float("BENCH_HOSTS", 1000))
+    per = int(_env_float("BENCH_ARCHIVE", 20))
+    zones = max(1, n // 50)
+    for i in range(n):
+        host = f"{_pick(WORDS, 'w', i)}{i}.z{i % zones}.{domain}"
+        scheme = "http" if _frac("scheme", host) < 0.3 else "https"
+        for u in _page_urls(f"{scheme}://{host.upper() if i % 7 == 0 else host}", host, per):
+            _emit(u)
+
+def katana(argv):
+    src = _arg(argv, "-list", "-l")
+    seeds = _lines(src) if src else [_arg(argv, "-u", default="https://bench.example")]
+    depth = int(_arg(argv, "-d", "-depth", default="2"))
+    for url in seeds:
+        _emit(url)
+        for u in _page_urls(url.rstrip("/"), url, 3 * depth):
+            _emit(u)
+
+def ffuf(argv):
+    template = _arg(argv, "-u", default="https://bench.example/FUZZ")
+    for word in _lines(_arg(argv, "-w")):
+        url = template.replace("FUZZ", word)
+        if _frac("ffuf", url) < 0.1:
+            _emit(json.dumps({"input": {"FUZZ": word}, "url": url,
+                              "status": _pick([200, 301, 403], "fs", url),
+                              "length": int(_frac("fl", url) * 20000)}))
+
+def _png(path: str, w: int, h: int, pixel):
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return (len(data).to_bytes(4, "big") + kind + data
+                + zlib.crc32(kind + data).to_bytes(4, "big"))
+    raw = b"".join(b"\0" + bytes(pixel(x, y) for x in range(w)) for y in range(h))
+    with open(path, "wb") as f:
+        f.write(b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", w.to_bytes(4, "big") + h.to_bytes(4, "big")
+                                               + bytes([8, 0, 0, 0, 0]))
+                + chunk(b"IDAT", zlib.compress(raw)) + chunk(b"IEND", b""))
+
+def gowitness(argv):
+    # most pages share one of a handful of looks (default pages, login walls)
+    dest = _arg(argv, "--destination", "--screenshot-path", "-P", default=".")
+    os.makedirs(dest, exist_ok=True)
+    for url in _lines(_arg(argv, "-f", "--file")):
+        look = int(_frac("look", _host_of(url)) * 8) if _frac("uniq", url) >= 0.2 else zlib.crc32(url.encode())
+        name = re.sub(r"[^A-Za-z0-9.]+", "-", url) + ".png"
+        _png(os.path.join(dest, name), 64, 40, lambda x, y: (x * (look % 7 + 1) + y * (look % 5 + 1) + look) % 256)
+        if ITEM_S:
+            time.sleep(ITEM_S)
+
+TOOLS = {"subfinder": subfinder, "dnsx": dnsx, "naabu": naabu, "httpx": httpx,
+         "nuclei": nuclei, "tlsx": tlsx, "gau": gau, "katana": katana, "ffuf": ffuf, "gowitness": gowitness}
+
+def main(tool: str):
+    argv = sys.argv[1:]
+    if "-version" in argv:
+        print(f"projectdiscovery {tool} v0.0.0-bench")
+        return
+    startup = _env_float("BENCH_STARTUP_MS", 0)
+    if startup:
+        time.sleep(startup / 1000)
+    TOOLS[tool](argv)
+
+if __name__ == "__main__":
+    main(os.path.basename(sys.argv[0]))
@@ -0,0 +1,201 @@
+# bench/micro.py
+"""
+Micro-benchmarks for the pure-Python artifact parsing/merging hot paths.
+
+    python -m bench.micro                                  # 10k and 100k rows
+    python -m bench.micro --sizes 1000000 --only findings_keys,jsonl_to_df
+
+For each function and size, synthetic inputs are generated once into a scratch
+directory; the call is timed (best of --repeat runs) and then run once more
+under tracemalloc for its peak Python allocation. Reported: rows/sec, calls/sec
+and peak MiB. Results also go to bench/results/micro_<ts>.json so before/after
+numbers for an optimisation can be compared.
+"""
+from __future__ import annotations
+import argparse, gc, json, os, random, shutil, sys, tempfile, time, tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+RESULTS_DIR = ROOT / "bench" / "results"
+sys.path.insert(0, str(ROOT))
+os.environ.setdefault("OPENAI_API_KEY", "bench")   # summarise builds its client at import time
+
+WORDS = ["api", "app", "auth", "cdn", "dev", "docs", "git", "img", "mail", "portal",
+         "shop", "sso", "stage", "status", "vpn", "www"]
+SEVERITIES = ["info", "low", "medium", "high", "critical"]
+
+# ---------- synthetic data ----------
+
+def gen_subs(n: int, domain: str = "bench.example", offset: int = 0):
+    zones = max(1, n // 50)
+    for i in range(offset, offset + n):
+        yield f"{WORDS[i % len(WORDS)]}{i}.z{i % zones}.{domain}"
+
+def gen_httpx(n: int, rng: random.Random):
+    for i, host in enumerate(gen_subs(n)):
+        url = f"https://{host}"
+        yield {
+            "timestamp": "2025-01-01T00:00:00Z", "url": url, "input": host,
+            "status_code": rng.choice([200, 200, 301, 403, 404]),
+            "title": f"{host.split('.')[0]} home", "webserver": "nginx",
+            "tech": rng.sample(["Nginx", "PHP", "WordPress", "React", "Cloudflare"], 2),
+            "content_length": rng.randint(100, 50000), "content_type": "text/html",
+            "hash": {"body_sha256": f"{rng.getrandbits(128):032x}"}, "a": [f"10.0.{i % 256}.{i % 200}"],
+        }
+
+def gen_nuclei(n: int, rng: random.Random):
+    for host in gen_subs(n):
+        tpl = rng.choice(["exposed-panels", "git-config", "tech-detect", "cve-2021-41773"])
+        yield {
+            "template-id": tpl, "type": "http", "host": f"https://{host}",
+            "matched-at": f"https://{host}/{rng.randint(0, 99)}",
+            "info": {"name": tpl, "severity": rng.choice(SEVERITIES), "tags": ["bench"]},
+            "timestamp": "2025-01-01T00:00:00Z",
+        }
+
+def _write_lines(path: Path, lines):
+    with path.open("w", encoding="utf-8") as f:
+        for s in lines:
+            f.write(s + "\n")
+
+def _write_jsonl(path: Path, rows):
+    _write_lines(path, (json.dumps(r) for r in rows))
+
+# ---------- cases ----------
+# Each case: setup(work, n) -> zero-arg callable that performs one measured call.
+
+def case_combine_attribution(work: Path, n: int):
+    from src.pipeline.enumerate import combine_subdomains_with_attribution
+    # three sources with ~50% overlap, as subfinder/amass typically produce;
+    # sorted, as run_subfinder/run_amass write them
+    srcs = []
+    for k, name in enumerate(("subfinder", "amass_passive", "amass_active")):
+        p = work / f"{name}.txt"
+        _write_lines(p, sorted(gen_subs(n // 2, offset=k * n // 4)))
+        srcs.append((name, p))
+    return lambda: combine_subdomains_with_attribution(srcs, work / "subs.txt", work / "attr.csv")
+
+def case_append_unique_lines(work: Path, n: int):
+    from src.pipeline.util import append_unique_lines
+    src, dst = work / "new.txt", work / "dst.txt"
+    _write_lines(dst, gen_subs(n))
+    append_unique_lines(work / "missing.txt", dst)   # build dst's index outside the timing
+    calls = iter(range(1, 1 << 30))
+
+    def call():
+        # merge n rows into a destination that keeps growing, half of them already present
+        k = next(calls)
+        _write_lines(src, gen_subs(n, offset=k * n // 2))
+        append_unique_lines(src, dst)
+    return call
+
+def case_findings_keys(work: Path, n: int):
+    from src.pipeline.delta import findings_keys
+    p = work / "nuclei.jsonl"
+    _write_jsonl(p, gen_nuclei(n, random.Random(1)))
+    return lambda: findings_keys(p, max_rows=n)
+
+def case_chunk_records(work: Path, n: int):
+    from src.pipeline.summarise import _chunk_records
+    records = list(gen_nuclei(n, random.Random(2)))
+    return lambda: _chunk_records(records)
+
+def case_ingest_http(work: Path, n: int):
+    from src.store import db as store
+    p = work / "http.jsonl"
+    _write_jsonl(p, gen_httpx(n, random.Random(3)))
+
+    def call():
+        dbp = work / "store.db"
+        dbp.unlink(missing_ok=True)
+        con = store.init_db(str(dbp), "bench", "bench.example")
+        store.ingest_http(con, "bench", str(p))
+        con.close()
+    return call
+
+def case_ingest_nuclei(work: Path, n: int):
+    from src.store import db as store
+    p = work / "nuclei.jsonl"
+    _write_jsonl(p, gen_nuclei(n, random.Random(4)))
+
+    def call():
+        dbp = work / "store.db"
+        dbp.unlink(missing_ok=True)
+        con = store.init_db(str(dbp), "bench", "bench.example")
+        store.ingest_nuclei(con, "bench", str(p))
+        con.close()
+    return call
+
+def case_jsonl_to_df(work: Path, n: int):
+    from src.report.frames import jsonl_to_df
+    p = work / "http.jsonl"
+    _write_jsonl(p, gen_httpx(n, random.Random(5)))
+    return lambda: jsonl_to_df(p, max_rows=n)
+
+CASES = {
+    "combine_attribution": case_combine_attribution,
+    "append_unique_lines": case_append_unique_lines,
+    "findings_keys": case_findings_keys,
+    "chunk_records": case_chunk_records,
+    "ingest_http": case_ingest_http,
+    "ingest_nuclei": case_ingest_nuclei,
+    "jsonl_to_df": case_jsonl_to_df,
+}
+
+# ---------- runner ----------
+
+def measure(name: str, n: int, repeat: int) -> dict:
+    work = Path(tempfile.mkdtemp(prefix=f"recon-micro-{name}-"))
+    try:
+        call = CASES[name](work, n)
+        best = float("inf")
+        for _ in range(repeat):
+            gc.collect()
+            t0 = time.perf_counter()
+            call()
+            best = min(best, time.perf_counter() - t0)
+        gc.collect()
+        tracemalloc.start()
+        call()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+    return {
+        "case": name, "rows": n, "best_s": round(best, 4),
+        "rows_per_s": round(n / best) if best else None,
+        "calls_per_s": round(1 / best, 3) if best else None,
+        "peak_mib": round(peak / 2**20, 2),
+    }
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    ap.add_argument("--sizes", default="10000,100000", help="Comma-separated row counts (up to 1000000)")
+    ap.add_argument("--only", default="", help=f"Comma-separated subset of: {', '.join(CASES)}")
+    ap.add_argument("--repeat", type=int, default=3, help="Timed runs per case (best is reported)")
+    args = ap.parse_args(argv)
+
+    names = [c.strip() for c in args.only.split(",") if c.strip()] or list(CASES)
+    unknown = [c for c in names if c not in CASES]
+    if unknown:
+        ap.error(f"unknown case(s): {', '.join(unknown)}")
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+
+    print(f"{'case':<22}{'rows':>10}{'best_s':>10}{'rows/s':>12}{'calls/s':>10}{'peak_MiB':>10}")
+    results = []
+    for name in names:
+        for n in sizes:
+            r = measure(name, n, max(1, args.repeat))
+            results.append(r)
+            print(f"{name:<22}{n:>10}{r['best_s']:>10.3f}{r['rows_per_s']:>12}"
+                  f"{r['calls_per_s']:>10.2f}{r['peak_mib']:>10.1f}", flush=True)
+
+    RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+    out = RESULTS_DIR / f"micro_{datetime.now().strftime('%Y-%m-%d_%H%M%S')}.json"
+    out.write_text(json.dumps(results, indent=2), encoding="utf-8")
+    print(f"\n[i] results -> {out}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -28,7 +28,7 @@ def main():
         p = rd / "subs.txt"
         if p.exists():
             subs = [l.strip() for l in p.read_text(encoding="utf-8").splitlines() if l.strip()]
-            odb.bulk_insert("subdomain", ["run_id","name"], ((run_db_id, s) for s in subs))
+            odb.insert_subdomains(run_db_id, subs)
 
         # live
         p = rd / "live.txt"
@@ -86,6 +86,15 @@ def main():
                                  v.get("cve"), v.get("cvss"), 1 if v.get("kev") else 0, v.get("summary","")))
             odb.bulk_insert("known_vuln", ["run_id","product","version","cve","cvss","kev","summary"], rows)
 
+        # metrics.json (per-stage timings, written by src.cli)
+        p = rd / "metrics.json"
+        if p.exists():
+            try:
+                stages = json.loads(p.read_text(encoding="utf-8")).get("stages", [])
+            except Exception:
+                stages = []
+            odb.record_stage_metrics(run_db_id, stages)
+
         odb.index_urls_into_fts()
         odb.mark_finished(run_db_id)
 
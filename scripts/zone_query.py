@@ -0,0 +1,39 @@
+# scripts/zone_query.py
+"""
+Query historical subdomains by zone from data/recon.db.
+
+  python -m scripts.zone_query apps.monash.edu              # every name under the zone
+  python -m scripts.zone_query apps.monash.edu --children   # next level down, with counts
+  python -m scripts.zone_query monash.edu --run 2025-08-12_001823 --limit 100
+"""
+import argparse
+from src import db as odb
+
+def main():
+    ap = argparse.ArgumentParser(description="Zone / suffix queries over recon.db subdomains")
+    ap.add_argument("zone", help="Zone, e.g. apps.monash.edu ('' lists top-level labels with --children)")
+    ap.add_argument("--children", action="store_true", help="List immediate child zones instead of names")
+    ap.add_argument("--no-counts", action="store_true", help="With --children, skip per-child counts")
+    ap.add_argument("--run", default="", help="Restrict to one run_id (YYYY-mm-dd_HHMMSS)")
+    ap.add_argument("--limit", type=int, default=0, help="Max names to print (0 = all)")
+    args = ap.parse_args()
+
+    odb.init_schema()
+    if args.children:
+        for child, n in odb.zone_children(args.zone, with_counts=not args.no_counts):
+            print(f"{child}\t{n}" if not args.no_counts else child)
+        return
+
+    run_db_id = None
+    if args.run:
+        con = odb.connect()
+        row = con.execute("SELECT id FROM run WHERE run_id=? ORDER BY id DESC LIMIT 1", (args.run,)).fetchone()
+        con.close()
+        if not row:
+            raise SystemExit(f"[fatal] no run with run_id {args.run}")
+        run_db_id = row[0]
+    for name, runs, _ in odb.zone_names(args.zone, run_db_id=run_db_id, limit=args.limit or None):
+        print(f"{name}\t{runs}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+# src/batch.py
+from __future__ import annotations
+
+import os
+import signal
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+# Batch mode for the dashboard: one `src.cli` subprocess per target, up to
+# `parallel` of them at once, in background threads so the Streamlit script
+# only polls. Each target's output goes to its own <run_dir>/cli.log (the same
+# place passive mode writes it) instead of one shared console. The scanners
+# inside those pipelines still go through the machine-wide governor, so
+# raising `parallel` overlaps the cheap stages without overloading targets.
+
+ACTIVE = ("queued", "running")
+
+class BatchRun:
+    """
+    Start a batch of (target, cmd, run_dir) jobs. Jobs begin immediately;
+    poll table()/running() to follow them and cancel() to stop the rest.
+    """
+
+    def __init__(self, jobs: List[Tuple[str, List[str], Path]], cwd: Path, parallel: int = 3):
+        self.parallel = max(1, parallel)
+        self.started = time.time()
+        self.finished: float | None = None
+        self.jobs: List[Dict[str, Any]] = [
+            {"target": t, "cmd": cmd, "run_dir": Path(rd), "log": Path(rd) / "cli.log",
+             "status": "queued", "rc": None, "started": None, "finished": None, "last_line": ""}
+            for t, cmd, rd in jobs
+        ]
+        self._cwd = cwd
+        self._lock = threading.Lock()
+        self._procs: Dict[int, subprocess.Popen] = {}
+        self._cancelled = False
+        self._left = len(self.jobs)
+        pool = ThreadPoolExecutor(max_workers=self.parallel, thread_name_prefix="batch")
+        for i in range(len(self.jobs)):
+            pool.submit(self._run, i)
+        pool.shutdown(wait=False)
+        if not self.jobs:
+            self.finished = self.started
+
+    def _run(self, i: int):
+        job = self.jobs[i]
+        try:
+            if self._cancelled:
+                job["status"] = "cancelled"
+                return
+            job["run_dir"].mkdir(parents=True, exist_ok=True)
+            job["status"], job["started"] = "running", time.time()
+            with job["log"].open("w", encoding="utf-8") as log:
+                proc = subprocess.Popen(job["cmd"], cwd=str(self._cwd), stdout=subprocess.PIPE,
+                                        stderr=subprocess.STDOUT, text=True, bufsize=1,
+                                        errors="replace", env=os.environ.copy(),
+                                        start_new_session=True)   # cancel() signals its scanners too
+                with self._lock:
+                    self._procs[i] = proc
+                for line in proc.stdout:
+                    log.write(line)
+                    log.flush()
+                    if line.strip():
+                        job["last_line"] = line.strip()[:200]
+                job["rc"] = proc.wait()
+            if self._cancelled and job["rc"] != 0:
+                job["status"] = "cancelled"
+            else:
+                job["status"] = "done" if job["rc"] == 0 else "failed"
+        except Exception as e:
+            job["status"], job["last_line"] = "failed", f"could not start: {e}"
+        finally:
+            job["finished"] = time.time() if job["started"] else None
+            with self._lock:
+                self._procs.pop(i, None)
+                self._left -= 1
+                if self._left == 0:
+                    self.finished = time.time()
+
+    def running(self) -> bool:
+        return self.finished is None
+
+    def cancel(self):
+        """Skip queued targets and terminate the running ones, with the scanners they started."""
+        self._cancelled = True
+        with self._lock:
+            for proc in self._procs.values():
+                try:
+                    os.killpg(proc.pid, signal.SIGTERM)
+                except ProcessLookupError:
+                    pass
+
+    def table(self) -> List[Dict[str, Any]]:
+        """One row per target for the status table."""
+        now = time.time()
+        rows = []
+        for job in self.jobs:
+            elapsed = (job["finished"] or now) - job["started"] if job["started"] else 0.0
+            rows.append({
+                "target": job["target"], "status": job["status"],
+                "elapsed_s": round(elapsed, 1), "exit": job["rc"],
+                "run": job["run_dir"].name, "last line": job["last_line"],
+            })
+        return rows
+
+    def stats(self) -> Dict[str, Any]:
+        """Counts per status, batch wall time and the summed time of its scans."""
+        counts: Dict[str, int] = {}
+        for job in self.jobs:
+            counts[job["status"]] = counts.get(job["status"], 0) + 1
+        work = sum((j["finished"] or time.time()) - j["started"] for j in self.jobs if j["started"])
+        wall = (self.finished or time.time()) - self.started
+        return {"counts": counts, "wall_s": round(wall, 1), "work_s": round(work, 1),
+                "speedup": round(work / wall, 2) if wall > 0 else 0.0}
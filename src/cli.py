@@ -1,11 +1,13 @@
 from __future__ import annotations
 
+import time
 import typer
 from pathlib import Path
 from datetime import datetime
 
 from src.pipeline import enumerate as enum_mod
-from src.pipeline import resolve, probe, scan, summarise
+from src import db
+from src.pipeline import contentdisc, discovery, governor, manifest, metrics, nucleiplan, nucleistate, resolve, ports, probe, ratecontrol, scan, screenshots, stagecache, summarise, takeovers, tls, urlfilter
 
 app = typer.Typer(help="Recon-GPT pipeline CLI")
 
@@ -17,26 +19,102 @@ def _validate_amass_mode(mode: str) -> str:
     return m
 
 
+def _stage(run_dir: Path, name: str, fn, inputs=(), outputs=(), params=None, resume: bool = False,
+           target: str = "") -> bool:
+    """
+    Run one pipeline stage and record it in the run manifest and metrics.json
+    (wall time, child CPU, peak child RSS, primary input/output line counts).
+    When resuming, a stage whose inputs are unchanged and whose outputs are
+    still intact since its last successful run is skipped.
+    Failures are reported and recorded, never raised. Returns True on success.
+    """
+    inputs, outputs = list(inputs), list(outputs)
+    if resume and manifest.is_complete(run_dir, name, inputs, outputs, params):
+        typer.echo(f"[i] {name}: already complete with unchanged inputs, skipping")
+        # keep the timings of the run that actually did the work
+        if not any(s.get("stage") == name for s in metrics.load_run_metrics(run_dir)["stages"]):
+            snap = metrics.snapshot()
+            metrics.write_run_metrics(run_dir, target,
+                                      metrics.stage_entry(name, snap, snap, "skipped", inputs, outputs))
+        return True
+    started = time.time()
+    metrics.reset_child_peak()
+    before = metrics.snapshot()
+    status, error = "ok", ""
+    try:
+        fn()
+    except Exception as e:
+        typer.echo(f"[warn] {name} failed: {e}")
+        status, error = "failed", str(e)
+    manifest.record(run_dir, name, inputs, outputs, params, status, started, error=error)
+    metrics.write_run_metrics(run_dir, target,
+                              metrics.stage_entry(name, before, metrics.snapshot(), status,
+                                                  inputs, outputs, error=error))
+    return status == "ok"
+
+
+def _store_metrics(run_dir: Path):
+    """Copy the run's metrics.json into recon.db for the dashboard."""
+    parts = run_dir.name.split("_", 2)
+    run_key = "_".join(parts[:2])
+    target = parts[2] if len(parts) >= 3 else run_dir.name
+    try:
+        db.init_schema()
+        rid = db.upsert_run(run_key, target, str(run_dir))
+        db.record_stage_metrics(rid, metrics.load_run_metrics(run_dir)["stages"])
+    except Exception as e:
+        typer.echo(f"[warn] could not store stage metrics in recon.db: {e}")
+
+
 @app.command()
 def main(
     domain: str,
     run_id: str = typer.Option(None, "--run-id", help="Custom run ID"),
-    # discovery toggles (future placeholders)
+    run_dir_opt: str = typer.Option("", "--run-dir", help="Write the run into this directory instead of data/runs/<run-id>_<domain>"),
+    resume: str = typer.Option("", "--resume", help="Resume an existing run directory, skipping stages that already completed"),
+    stage_cache: bool = typer.Option(True, "--stage-cache/--no-stage-cache", help="Reuse dnsx/httpx output for byte-identical inputs from earlier runs"),
+    stage_cache_mb: int = typer.Option(1024, "--stage-cache-mb", help="Size bound for the shared stage cache (LRU-evicted)"),
+    # discovery toggles
     katana_depth: int = typer.Option(0, "--katana-depth", help="Katana crawl depth (0=off)"),
     fast_discovery: bool = typer.Option(False, "--fast-discovery", help="Enable fast discovery mode (katana/gau)"),
     gau_enable: bool = typer.Option(False, "--gau-enable", help="Enable GAU for archived URLs"),
+    brute_wordlist: str = typer.Option("", "--brute-wordlist", help="Wordlist for ffuf/feroxbuster content discovery on every live host (empty=off)"),
+    brute_tool: str = typer.Option("ffuf", "--brute-tool", help="Content discovery tool: ffuf or feroxbuster"),
+    brute_procs: int = typer.Option(4, "--brute-procs", help="Max content discovery processes running at once"),
+    brute_rate: int = typer.Option(20, "--brute-rate", help="Per-host request rate (req/s) for content discovery"),
+    brute_seconds: int = typer.Option(600, "--brute-seconds", help="Per-host time budget for content discovery"),
     do_ports: bool = typer.Option(False, "--do-ports", help="Run Naabu for port scanning"),
     do_tls: bool = typer.Option(False, "--do-tls", help="Expand via TLS certs"),
+    tls_rounds: int = typer.Option(3, "--tls-rounds", help="Max TLS SAN expansion rounds (stops earlier at a fixed point)"),
+    tls_cache_hours: int = typer.Option(24, "--tls-cache-hours", help="Reuse certificates handshaked within N hours instead of reconnecting"),
     do_screens: bool = typer.Option(False, "--do-screens", help="Run screenshots with gowitness"),
     do_takeovers: bool = typer.Option(False, "--do-takeovers", help="Check subdomain takeovers"),
+    takeover_fingerprints: str = typer.Option("", "--takeover-fingerprints", help="subjack-style fingerprints.json (default: built-in provider table)"),
+    # resolution
+    dns_cache: bool = typer.Option(True, "--dns-cache/--no-dns-cache", help="Reuse cached DNS answers; only resolve new or expired names"),
+    dns_cache_min_ttl: int = typer.Option(3600, "--dns-cache-min-ttl", help="Floor (seconds) applied to record TTLs in the DNS cache"),
+    wildcard_prune: bool = typer.Option(True, "--wildcard-prune/--no-wildcard-prune", help="Collapse names that only hit wildcard DNS before probing"),
     # httpx tuning
     httpx_threads: int = typer.Option(50, "--httpx-threads", help="httpx concurrency threads"),
     httpx_rate: int = typer.Option(100, "--httpx-rate", help="httpx rate limit (RPS)"),
+    probe_cache_ttl: int = typer.Option(0, "--probe-cache-ttl", help="Reuse cached httpx rows for hosts with unchanged DNS probed within N minutes (0=off)"),
     # nuclei tuning
+    cluster_reps: int = typer.Option(3, "--cluster-reps", help="URLs per path/parameter shape passed to nuclei (0=scan every URL)"),
     nuclei_concurrency: int = typer.Option(50, "--nuclei-concurrency", help="nuclei concurrency"),
     nuclei_rate: int = typer.Option(200, "--nuclei-rate", help="nuclei rate limit"),
     nuclei_severity: str = typer.Option("", "--nuclei-severity", help="Filter nuclei by severity (e.g. critical,high)"),
     nuclei_tags: str = typer.Option("", "--nuclei-tags", help="Filter nuclei by tags (e.g. cve,exposures)"),
+    nuclei_plan: bool = typer.Option(False, "--nuclei-plan/--no-nuclei-plan", help="Pick nuclei tags per host group from httpx tech detections (ignored with --nuclei-tags)"),
+    nuclei_tech_map: str = typer.Option("", "--nuclei-tech-map", help="Path to JSON file {tech: tags} extending the built-in tech -> nuclei tag table"),
+    nuclei_baseline_tags: str = typer.Option(nucleiplan.BASELINE_TAGS, "--nuclei-baseline-tags", help="Restrict the --nuclei-plan baseline run (every URL) to these tags; default: every template without a tech-map tag"),
+    nuclei_rescan_hours: int = typer.Option(0, "--nuclei-rescan-hours", help="Only rescan URLs that are new, changed (httpx fingerprint) or last scanned over N hours ago; carry earlier findings forward for the rest (0=scan everything)"),
+    # adaptive rates
+    adaptive_rates: bool = typer.Option(False, "--adaptive-rates/--no-adaptive-rates", help="Pick httpx/nuclei rate and workers per target from earlier runs' timeouts and throughput (the values above seed a target's first run)"),
+    adaptive_max_timeouts: float = typer.Option(0.05, "--adaptive-max-timeouts", help="Timeout ratio above which --adaptive-rates backs off"),
+    adaptive_bounds: str = typer.Option("", "--adaptive-bounds", help='JSON {"httpx"|"nuclei": {"rate": [lo, hi], "workers": [lo, hi]}} overriding the built-in bounds'),
+    # machine-wide limits (shared by every pipeline on this host)
+    max_scanners: int = typer.Option(governor.MAX_PROCS, "--max-scanners", envvar="RECON_MAX_PROCS", help="Scanner processes (httpx, nuclei, naabu, ...) allowed at once across all running pipelines (0=no limit)"),
+    max_rps: int = typer.Option(governor.MAX_RPS, "--max-rps", envvar="RECON_MAX_RPS", help="Combined request rate of all running scanners across pipelines (0=no limit)"),
     # seed URL
     force_url: str = typer.Option("", "--force-url", help="Force-add specific URL if discovery yields none"),
     # enumeration sources & options
@@ -49,14 +127,26 @@ def main(
     Run a recon scan on a DOMAIN and save results into data/runs/<TIMESTAMP>_<DOMAIN>/
     """
     amass_mode = _validate_amass_mode(amass_mode)
+    if brute_tool not in contentdisc.TOOLS:
+        raise typer.BadParameter(f"brute-tool must be one of: {', '.join(contentdisc.TOOLS)}")
+    stagecache.configure(enabled=stage_cache, max_mb=stage_cache_mb)
+    governor.configure(max_procs=max_scanners, max_rps=max_rps)
 
-    # 1) Prepare run dir
-    ts = run_id or datetime.now().strftime("%Y-%m-%d_%H%M%S")
+    # 1) Prepare run dir (or reopen one to resume)
     safe_domain = domain.replace("/", "_")
-    run_dir = Path("data") / "runs" / f"{ts}_{safe_domain}"
-    run_dir.mkdir(parents=True, exist_ok=True)
+    if resume:
+        run_dir = Path(resume)
+        if not run_dir.is_dir():
+            raise typer.BadParameter(f"--resume: no such run directory: {run_dir}")
+        typer.echo(f"[+] Resuming run directory: {run_dir}")
+    else:
+        ts = run_id or datetime.now().strftime("%Y-%m-%d_%H%M%S")
+        run_dir = Path(run_dir_opt) if run_dir_opt else Path("data") / "runs" / f"{ts}_{safe_domain}"
+        run_dir.mkdir(parents=True, exist_ok=True)
+        typer.echo(f"[+] Run directory: {run_dir}")
 
-    typer.echo(f"[+] Run directory: {run_dir}")
+    def stage(name, fn, inputs=(), outputs=(), params=None) -> bool:
+        return _stage(run_dir, name, fn, inputs, outputs, params, resume=bool(resume), target=domain)
 
     # 2) Stage file paths
     sub_file = run_dir / f"{safe_domain}_subs.txt"          # final combined
@@ -66,103 +156,347 @@ def main(
     attr_csv = run_dir / "sub_attribution.csv"
 
     live_file = run_dir / f"{safe_domain}_live.txt"
+    dns_records = run_dir / "dns_records.jsonl"
+    live_tls = run_dir / "live_tls.txt"
+    dns_records_tls = run_dir / "dns_records_tls.jsonl"
+    probe_hosts = run_dir / "live_pruned.txt"
+    wildcards_json = run_dir / "wildcards.json"
+    takeover_candidates = run_dir / "takeover_candidates.jsonl"
+    takeover_findings = run_dir / "takeovers.jsonl"
+    ips_file = run_dir / "ips.txt"
+    ports_file = run_dir / "ports.txt"
+    port_urls_file = run_dir / "port_urls.txt"
+    probe_targets = run_dir / "httpx_targets.txt"
     urls_file = run_dir / f"{safe_domain}_urls.txt"
     http_file = run_dir / f"{safe_domain}_http.jsonl"
     nuclei_file = run_dir / f"{safe_domain}_nuclei.jsonl"
+    gau_out = run_dir / "gau.txt"
+    katana_out = run_dir / "katana.txt"
+    scan_urls = run_dir / f"{safe_domain}_urls_all.txt"
+    url_filter_json = run_dir / "url_filter.json"
+    brute_out = run_dir / "bruteforce_urls.txt"
+    brute_json = run_dir / "bruteforce.json"
+    nuclei_targets = run_dir / "nuclei_targets.txt"
+    clusters_json = run_dir / "url_clusters.json"
 
     # 3) Enumeration
     named_inputs = []
 
     if use_subfinder:
         typer.echo(f"[+] Subfinder: {domain}")
-        try:
+
+        def _subfinder():
             n = enum_mod.run_subfinder(domain, subfinder_out)
             typer.echo(f"[i] subfinder -> {n} unique subdomains")
+
+        if stage("subfinder", _subfinder, outputs=[subfinder_out], params={"domain": domain}):
             named_inputs.append(("subfinder", subfinder_out))
-        except Exception as e:
-            typer.echo(f"[warn] subfinder failed: {e}")
 
     if use_amass:
-        if amass_mode in {"passive", "both"}:
-            typer.echo(f"[+] Amass (passive): {domain}")
-            try:
-                n = enum_mod.run_amass(domain, amass_passive_out, passive=True)
-                typer.echo(f"[i] amass(passive) -> {n} unique subdomains")
-                named_inputs.append(("amass_passive", amass_passive_out))
-            except Exception as e:
-                typer.echo(f"[warn] amass passive failed: {e}")
-        if amass_mode in {"active", "both"}:
-            typer.echo(f"[+] Amass (active): {domain}")
-            try:
-                n = enum_mod.run_amass(domain, amass_active_out, passive=False)
-                typer.echo(f"[i] amass(active) -> {n} unique subdomains")
-                named_inputs.append(("amass_active", amass_active_out))
-            except Exception as e:
-                typer.echo(f"[warn] amass active failed: {e}")
-
-    if not named_inputs:
-        sub_file.write_text("", encoding="utf-8")
-        if write_attribution:
-            attr_csv.write_text("subdomain,sources\n", encoding="utf-8")
-        typer.echo("[i] No enumeration sources enabled or they failed; continuing with empty subs.")
-    else:
-        if write_attribution:
+        for mode, out in (("passive", amass_passive_out), ("active", amass_active_out)):
+            if amass_mode not in {mode, "both"}:
+                continue
+            typer.echo(f"[+] Amass ({mode}): {domain}")
+
+            def _amass(mode=mode, out=out):
+                n = enum_mod.run_amass(domain, out, passive=(mode == "passive"))
+                typer.echo(f"[i] amass({mode}) -> {n} unique subdomains")
+
+            if stage(f"amass_{mode}", _amass, outputs=[out], params={"domain": domain}):
+                named_inputs.append((f"amass_{mode}", out))
+
+    def _combine():
+        if not named_inputs:
+            sub_file.write_text("", encoding="utf-8")
+            if write_attribution:
+                attr_csv.write_text("subdomain,sources\n", encoding="utf-8")
+            typer.echo("[i] No enumeration sources enabled or they failed; continuing with empty subs.")
+        elif write_attribution:
             total = enum_mod.combine_subdomains_with_attribution(named_inputs, sub_file, attr_csv)
             typer.echo(f"[i] combined subdomains -> {total} unique (attribution written)")
         else:
             total = enum_mod.combine_subdomains([p for _, p in named_inputs], sub_file)
             typer.echo(f"[i] combined subdomains -> {total} unique")
 
+    stage("combine", _combine,
+          inputs=[p for _, p in named_inputs],
+          outputs=[sub_file] + ([attr_csv] if write_attribution else []),
+          params={"sources": [n for n, _ in named_inputs]})
+
     # 4) Resolve
     typer.echo("[+] DNSX: resolving hosts")
-    try:
-        resolve.run_dnsx(sub_file, live_file)
-    except Exception as e:
-        typer.echo(f"[warn] dnsx failed: {e}")
+    stage("dnsx",
+          lambda: resolve.run_dnsx(sub_file, live_file, records_file=dns_records,
+                                   use_cache=dns_cache, min_ttl=dns_cache_min_ttl),
+          inputs=[sub_file], outputs=[live_file, dns_records])
+
+    # 4') TLS — follow CN/SAN names to a fixed point; later stages read the
+    # expanded host list, sub_file itself is left as enumeration produced it.
+    if do_tls and live_file.exists() and live_file.stat().st_size > 0:
+        typer.echo("[+] TLSX: expanding via certificate names")
+
+        def _tls():
+            st = tls.expand_via_tls(live_file, dns_records, sub_file, domain, run_dir,
+                                    live_tls, dns_records_tls, max_rounds=tls_rounds,
+                                    cert_ttl_hours=tls_cache_hours, use_dns_cache=dns_cache)
+            typer.echo(f"[i] tls: {st['rounds']} round(s), {st['handshaked']} handshaked, "
+                       f"{st['cache_hits']} from cache, {st['certs']} unique certs -> "
+                       f"{st['new_names']} new names, {st['new_live']} resolved")
+
+        if stage("tls", _tls, inputs=[live_file, dns_records, sub_file],
+                 outputs=[live_tls, dns_records_tls, run_dir / "tls_names.txt"],
+                 params={"domain": domain, "rounds": tls_rounds}):
+            live_file, dns_records = live_tls, dns_records_tls
+
+    # 4a) Wildcard DNS — keep one representative per catch-all zone
+    probe_in = live_file
+    if wildcard_prune and live_file.exists() and live_file.stat().st_size > 0:
+
+        def _wildcards():
+            wc = resolve.prune_wildcards(live_file, dns_records, probe_hosts, report_file=wildcards_json)
+            typer.echo(f"[i] wildcard DNS: {wc['zones']} zone(s), pruned {wc['pruned']} host(s), "
+                       f"{wc['kept']} left to probe")
+
+        if stage("wildcards", _wildcards, inputs=[live_file, dns_records],
+                 outputs=[probe_hosts, wildcards_json]):
+            probe_in = probe_hosts
+
+    # 4a') Takeovers — only names whose CNAME lands on a claimable provider
+    # are fetched; everything else is ruled out from the dnsx records alone.
+    if do_takeovers and dns_records.exists():
+        typer.echo("[+] Takeovers: checking fingerprinted CNAMEs")
+
+        def _takeovers():
+            st = takeovers.check_takeovers(dns_records, takeover_candidates, takeover_findings,
+                                           fingerprints=takeover_fingerprints or None)
+            typer.echo(f"[i] takeovers: {st['records']} records -> {st['candidates']} candidates checked, "
+                       f"{st['vulnerable']} vulnerable, {st['dangling']} dangling")
+
+        stage("takeovers", _takeovers, inputs=[dns_records],
+              outputs=[takeover_candidates, takeover_findings],
+              params={"fingerprints": takeover_fingerprints})
+
+    # 4b) Ports (Naabu) — scan each unique IP once, then fan open web ports
+    # back out to every hostname on that IP for httpx.
+    if do_ports:
+        typer.echo("[+] Naabu: scanning unique IPs")
+
+        def _naabu():
+            keep = None
+            if probe_in != live_file:
+                keep = {h.strip() for h in probe_in.read_text().splitlines() if h.strip()}
+            hosts_by_ip = ports.build_ip_targets(dns_records, ips_file, only_hosts=keep)
+            n_hosts = len({h for hs in hosts_by_ip.values() for h in hs})
+            typer.echo(f"[i] naabu: {n_hosts} resolved hosts -> {len(hosts_by_ip)} unique IPs")
+            if hosts_by_ip:
+                ports.run_naabu(str(ips_file), str(ports_file))
+            ports.synth_http_urls(str(ports_file), str(port_urls_file), hosts_by_ip)
+            extra = [u for u in port_urls_file.read_text().splitlines() if u.strip()]
+            typer.echo(f"[i] naabu: {len(extra)} web URLs on open ports")
+            live = probe_in.read_text() if probe_in.exists() else ""
+            probe_targets.write_text(live + "".join(u + "\n" for u in extra))
+
+        if stage("naabu", _naabu, inputs=[probe_in, dns_records],
+                 outputs=[ports_file, port_urls_file, probe_targets]):
+            probe_in = probe_targets
 
     # 5) Probe
+    rate_bounds = ratecontrol.load_bounds(adaptive_bounds or None) if adaptive_rates else None
+    if adaptive_rates:
+        httpx_rate, httpx_threads, known = ratecontrol.recommend(domain, "httpx", httpx_rate, httpx_threads, rate_bounds)
+        nuclei_rate, nuclei_concurrency, _ = ratecontrol.recommend(domain, "nuclei", nuclei_rate, nuclei_concurrency, rate_bounds)
+        typer.echo(f"[i] adaptive rates ({'from earlier runs' if known else 'first run'}): "
+                   f"httpx {httpx_rate} rps x {httpx_threads} threads, "
+                   f"nuclei {nuclei_rate} rps x {nuclei_concurrency} concurrency")
+
+    def _observe(tool, rate, workers, sent, timeouts, results, started, output=""):
+        obs = ratecontrol.observe(domain, tool, rate, workers, sent, timeouts, results,
+                                  time.time() - started, adaptive_max_timeouts, rate_bounds, output)
+        typer.echo(f"[i] {tool} rate control: {obs['timeouts']}/{obs['sent']} timed out "
+                   f"({obs['timeout_ratio']:.1%}), {obs['throughput']}/s -> {obs['action']}, "
+                   f"next run {obs['next_rate']} rps x {obs['next_workers']}")
+
     typer.echo("[+] HTTPX: probing")
-    try:
-        probe.run_httpx(live_file, http_file, urls_file,
-                        threads=httpx_threads, rate=httpx_rate)
-    except Exception as e:
-        typer.echo(f"[warn] httpx failed: {e}")
+
+    def _httpx():
+        started = time.time()
+        if probe_cache_ttl > 0 and probe_in.exists():
+            used = stats = probe.run_httpx_cached(probe_in, http_file, urls_file, dns_records,
+                                                  ttl_minutes=probe_cache_ttl,
+                                                  threads=httpx_threads, rate=httpx_rate)
+            typer.echo(f"[i] probe cache: {stats['hits']}/{stats['hosts']} hosts reused "
+                       f"({stats['hit_rate']:.0%} hit rate), {stats['probed']} probed")
+        else:
+            used = probe.run_httpx(probe_in, http_file, urls_file,
+                                   threads=httpx_threads, rate=httpx_rate)
+        # learn from the rate httpx actually ran with; nothing ran on a full cache hit
+        if adaptive_rates and used["rate"]:
+            sent, lost, rows = ratecontrol.httpx_signal(probe_in, http_file,
+                                                        ratecontrol.last_output(domain, "httpx"))
+            _observe("httpx", used["rate"], used["threads"], sent, lost, rows, started,
+                     output=str(http_file.resolve()))
+
+    stage("httpx", _httpx, inputs=[probe_in], outputs=[http_file, urls_file])
+
+    # 5') Screenshots — only pages whose body changed since their last capture
+    if do_screens and http_file.exists() and http_file.stat().st_size > 0:
+        typer.echo("[+] Screenshots: capturing changed pages")
+
+        def _screens():
+            st = screenshots.capture_incremental(http_file, run_dir)
+            typer.echo(f"[i] screenshots: {st['urls']} URLs, {st['reused']} unchanged (reused), "
+                       f"{st['captured']} captured, {st['missing']} failed -> "
+                       f"{st['new_images']} new images ({st['grouped']} matched an existing one)")
+
+        stage("screenshots", _screens, inputs=[http_file], outputs=[run_dir / "screenshots.jsonl"])
+
+    # 5a) Content discovery — ffuf/feroxbuster across every live origin,
+    # several hosts at a time; results stream into their own URL set.
+    brute_ok = False
+    if brute_wordlist and urls_file.exists() and urls_file.stat().st_size > 0:
+        typer.echo(f"[+] Content discovery: {brute_tool}, up to {brute_procs} hosts at a time")
+
+        def _bruteforce():
+            origins = contentdisc.origins_from(urls_file)
+            rep = contentdisc.run_scheduler(
+                origins, brute_wordlist, brute_out, tool=brute_tool,
+                max_procs=brute_procs, per_host_rate=brute_rate, per_host_seconds=brute_seconds,
+                scope=domain, report_file=brute_json,
+                on_host_done=lambda o, st: typer.echo(f"[i]   {o}: {st['status']}, {st['found']} found"
+                                                      + (f" ({st['error']})" if st["error"] else "")),
+            )
+            typer.echo(f"[i] content discovery: {rep['hosts']} hosts, {rep['skipped_catch_all']} catch-all skipped, "
+                       f"{rep['failed']} failed -> {rep['added']} new URLs")
+
+        brute_ok = stage("bruteforce", _bruteforce, inputs=[urls_file], outputs=[brute_out, brute_json],
+                         params={"tool": brute_tool, "wordlist": brute_wordlist})
+
+    # 5b) URL discovery — archived (gau), crawled (katana) and brute-forced
+    # URLs are canonicalised, stripped of static assets and de-duplicated
+    # against the probed URLs; later stages read the combined list,
+    # urls_file itself stays httpx's.
+    use_gau = gau_enable or fast_discovery
+    depth = katana_depth or (2 if fast_discovery else 0)
+    if use_gau or depth > 0 or brute_ok:
+        typer.echo("[+] Discovery: " + ", ".join(
+            n for n, on in (("gau", use_gau), ("katana", depth > 0), ("content discovery", brute_ok)) if on))
+
+        def _discovery():
+            sources = [("bruteforce", brute_out)] if brute_ok else []
+            if use_gau:
+                try:
+                    n = discovery.run_gau(domain, str(gau_out))
+                    typer.echo(f"[i] gau -> {n} raw URLs")
+                    sources.append(("gau", gau_out))
+                except Exception as e:
+                    typer.echo(f"[warn] gau failed: {e}")
+            if depth > 0 and urls_file.exists() and urls_file.stat().st_size > 0:
+                try:
+                    n = discovery.run_katana(str(urls_file), str(katana_out), depth=depth)
+                    typer.echo(f"[i] katana(depth={depth}) -> {n} raw URLs")
+                    sources.append(("katana", katana_out))
+                except Exception as e:
+                    typer.echo(f"[warn] katana failed: {e}")
+            rep = urlfilter.merge_discovered(sources, urls_file, scan_urls,
+                                             scope=domain, report_file=url_filter_json)
+            for name, st in rep["sources"].items():
+                typer.echo(f"[i] url filter {name}: {st['read']} read, {st['static']} static, "
+                           f"{st['invalid'] + st['out_of_scope']} invalid/out of scope, "
+                           f"{st['duplicate']} duplicates -> {st['added']} new ({st['reduction']:.1%} reduction)")
+            typer.echo(f"[i] urls: {rep['urls']} total ({rep['base']} probed + {rep['total']['added']} discovered)")
+
+        if stage("discovery", _discovery, inputs=[urls_file] + ([brute_out] if brute_ok else []),
+                 outputs=[scan_urls, url_filter_json],
+                 params={"gau": use_gau, "katana_depth": depth}):
+            urls_file = scan_urls
+
+    # 5c) Shape clustering — nuclei gets a few URLs per path template /
+    # parameter-name set; the full list stays in urls_file for inventory.
+    nuclei_in = urls_file
+    if cluster_reps > 0 and urls_file.exists() and urls_file.stat().st_size > 0:
+
+        def _cluster():
+            rep = urlfilter.cluster_representatives(urls_file, nuclei_targets, reps=cluster_reps,
+                                                    report_file=clusters_json)
+            typer.echo(f"[i] url shapes: {rep['urls']} URLs -> {rep['clusters']} clusters, "
+                       f"{rep['kept']} kept for nuclei ({rep['reduction']:.1%} reduction)")
+
+        if stage("cluster", _cluster, inputs=[urls_file], outputs=[nuclei_targets, clusters_json],
+                 params={"reps": cluster_reps}):
+            nuclei_in = nuclei_targets
 
     # 6) Scan (Nuclei)
-    if urls_file.exists() and urls_file.stat().st_size > 0:
-        typer.echo("[+] Nuclei: scanning")
-        try:
-            scan.run_nuclei(
-                urls_file, nuclei_file,
+    planned = nuclei_plan and not nuclei_tags
+
+    def _nuclei_run(in_file, out_file):
+        started = time.time()
+        error_log = str(run_dir / "nuclei_errors.jsonl") if adaptive_rates else None
+        if planned:
+            used = rep = nucleiplan.run_planned(
+                in_file, http_file, out_file, run_dir,
+                tech_map=nuclei_tech_map or None, baseline_tags=nuclei_baseline_tags,
+                severity=nuclei_severity, concurrency=nuclei_concurrency, rate_limit=nuclei_rate,
+                error_log=error_log,
+            )
+            groups = rep["runs"][1:]
+            typer.echo(f"[i] nuclei plan: baseline over {rep['urls']} URLs + {len(groups)} tech group(s) "
+                       f"covering {sum(g['urls'] for g in groups)} URLs ({rep['untagged_urls']} baseline only)")
+        else:
+            used = scan.run_nuclei(
+                in_file, out_file,
                 concurrency=nuclei_concurrency,
-                rate=nuclei_rate,
+                rate_limit=nuclei_rate,
                 severity=nuclei_severity,
-                tags=nuclei_tags
+                tags=nuclei_tags,
+                error_log=error_log,
             )
-        except Exception as e:
-            typer.echo(f"[warn] nuclei failed: {e}")
+        if adaptive_rates:
+            # a failed run raises before this, without the rate it was granted, so it is not learned from
+            hosts, timeouts = ratecontrol.nuclei_signal(in_file, error_log)
+            _observe("nuclei", used["rate"], used["concurrency"], hosts, timeouts,
+                     metrics.count_items(Path(in_file)) or 0, started)
+
+    nuclei_params = {"severity": nuclei_severity, "tags": nuclei_tags}
+    if planned:
+        # the map's content, not its path: editing the file must rescan
+        nuclei_params.update(plan=True, tech_map=manifest.file_digest(Path(nuclei_tech_map)) if nuclei_tech_map else "",
+                             baseline=nuclei_baseline_tags)
+    incremental = nuclei_rescan_hours > 0
+
+    def _nuclei():
+        if not incremental:
+            _nuclei_run(nuclei_in, nuclei_file)
+            return
+        rep = nucleistate.run_incremental(nuclei_in, http_file, nuclei_file, run_dir, _nuclei_run,
+                                          params=nuclei_params, rescan_hours=nuclei_rescan_hours,
+                                          target=domain)
+        typer.echo(f"[i] nuclei incremental: {rep['scanned']}/{rep['urls']} URLs scanned, "
+                   f"{rep['carried']} unchanged ({rep['fresh_findings']} new + "
+                   f"{rep['carried_findings']} carried findings)")
+
+    if urls_file.exists() and urls_file.stat().st_size > 0:
+        typer.echo("[+] Nuclei: scanning")
+        stage("nuclei", _nuclei, inputs=[nuclei_in] + ([http_file] if planned or incremental else []),
+              outputs=[nuclei_file], params=dict(nuclei_params, rescan_hours=nuclei_rescan_hours))
     else:
         typer.echo("[i] No URLs to scan.")
         if force_url.strip():
             urls_file.write_text(force_url.strip() + "\n", encoding="utf-8")
             typer.echo(f"[i] Seeded URL from --force-url: {force_url.strip()}")
-            try:
-                scan.run_nuclei(
-                    urls_file, nuclei_file,
-                    concurrency=nuclei_concurrency,
-                    rate=nuclei_rate,
-                    severity=nuclei_severity,
-                    tags=nuclei_tags
-                )
-            except Exception as e:
-                typer.echo(f"[warn] nuclei failed after seeding: {e}")
+            stage("nuclei", _nuclei, inputs=[urls_file], outputs=[nuclei_file],
+                  params=dict(nuclei_params, rescan_hours=nuclei_rescan_hours))
 
     # 7) Summarise
-    try:
-        typer.echo("[+] Summarising results with GPT")
-        summarise.run_summary(http_file, nuclei_file)
-    except Exception as e:
-        typer.echo(f"[warn] summary failed: {e}")
+    typer.echo("[+] Summarising results with GPT")
+    stage("summary", lambda: summarise.run_summary(http_file, nuclei_file),
+          inputs=[http_file, nuclei_file])
+
+    if stagecache.STATS:
+        typer.echo(f"[i] stage cache: {stagecache.summary()}")
+
+    _store_metrics(run_dir)
+    total = sum(s.get("wall_s") or 0 for s in metrics.load_run_metrics(run_dir)["stages"])
+    typer.echo(f"[i] stage metrics -> {run_dir / metrics.METRICS_NAME} ({total:.1f}s across stages)")
 
 
 if __name__ == "__main__":
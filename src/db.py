@@ -5,7 +5,7 @@ from pathlib import Path
 from typing import Iterable, Any
 
 DB_PATH = Path("data/recon.db")
-SCHEMA_PATH = Path("src/schema.sql")
+SCHEMA_PATH = Path(__file__).with_name("schema.sql")
 
 def connect() -> sqlite3.Connection:
     DB_PATH.parent.mkdir(parents=True, exist_ok=True)
@@ -18,9 +18,92 @@ def init_schema():
     if not SCHEMA_PATH.exists():
         raise FileNotFoundError(f"Schema file not found: {SCHEMA_PATH}")
     con = connect()
+    _migrate(con)
     con.executescript(SCHEMA_PATH.read_text(encoding="utf-8"))
     con.close()
 
+def _migrate(con: sqlite3.Connection):
+    """Bring databases created by older schema.sql versions up to date (before indexes on new columns)."""
+    cols = {r[1] for r in con.execute("PRAGMA table_info(subdomain)")}
+    if cols and "rname" not in cols:
+        con.execute("ALTER TABLE subdomain ADD COLUMN rname TEXT")
+        con.create_function("rname_key", 1, rname_key, deterministic=True)
+        con.execute("UPDATE subdomain SET rname = rname_key(name)")
+
+# ---------- reversed-label zone index ----------
+
+def rname_key(name: str) -> str:
+    """
+    Reversed-label key: 'a.apps.monash.edu' -> 'edu.monash.apps.a.'.
+    Everything under a zone then shares the zone's key as a prefix, so
+    suffix queries become index range scans instead of LIKE '%...'.
+    """
+    n = (name or "").strip().lower().rstrip(".")
+    if n.startswith("*."):
+        n = n[2:]
+    return ".".join(reversed(n.split("."))) + "." if n else ""
+
+def _zone_range(zone: str) -> tuple[str, str]:
+    # '/' sorts right after '.', so [key, key[:-1] + '/') is exactly the zone
+    lo = rname_key(zone)
+    return (lo, lo[:-1] + "/") if lo else ("", "\uffff")
+
+def insert_subdomains(run_db_id: int, names: Iterable[str]):
+    """Insert a run's subdomains with their reversed-label keys."""
+    bulk_insert("subdomain", ["run_id", "name", "rname"],
+                ((run_db_id, n, rname_key(n)) for n in names))
+
+def zone_names(zone: str, run_db_id: int | None = None, limit: int | None = None,
+               con: sqlite3.Connection | None = None) -> list[tuple[str, int, int]]:
+    """
+    Names at or under zone, as (name, runs_seen, last_run_db_id), ordered by
+    reversed key so siblings cluster. Optionally restricted to one run.
+    """
+    lo, hi = _zone_range(zone)
+    own = con is None
+    con = con or connect()
+    sql = """SELECT name, COUNT(*), MAX(run_id) FROM subdomain
+             WHERE rname >= ? AND rname < ?""" + (" AND run_id = ?" if run_db_id else "") + """
+             GROUP BY rname, name ORDER BY rname"""
+    params: list[Any] = [lo, hi] + ([run_db_id] if run_db_id else [])
+    if limit:
+        sql += " LIMIT ?"
+        params.append(int(limit))
+    rows = con.execute(sql, params).fetchall()
+    if own:
+        con.close()
+    return rows
+
+def zone_children(zone: str, with_counts: bool = True,
+                  con: sqlite3.Connection | None = None) -> list[tuple[str, int]]:
+    """
+    Immediate child labels of zone across all runs, as (child_zone, names_under_it).
+    Children are found by seeking past each one in the rname index, so listing
+    them costs one index probe per child rather than a scan of the whole zone.
+    """
+    lo, hi = _zone_range(zone)
+    own = con is None
+    con = con or connect()
+    out = []
+    cur = lo + "\x00"      # skip the zone apex itself
+    base = zone.strip().lower().rstrip(".")
+    while True:
+        row = con.execute("SELECT rname FROM subdomain WHERE rname >= ? AND rname < ? ORDER BY rname LIMIT 1",
+                          (cur, hi)).fetchone()
+        if not row:
+            break
+        label = row[0][len(lo):].split(".", 1)[0]
+        child_lo = lo + label + "."
+        count = 0
+        if with_counts:
+            count = con.execute("SELECT COUNT(DISTINCT rname) FROM subdomain WHERE rname >= ? AND rname < ?",
+                                (child_lo, child_lo[:-1] + "/")).fetchone()[0]
+        out.append((f"{label}.{base}" if base else label, count))
+        cur = child_lo[:-1] + "/"
+    if own:
+        con.close()
+    return out
+
 def upsert_run(run_id: str, target: str, run_path: str) -> int:
     con = connect()
     cur = con.cursor()
@@ -50,6 +133,20 @@ def bulk_insert(table: str, cols: Iterable[str], rows: Iterable[Iterable[Any]]):
     con.executemany(sql, rows)
     con.close()
 
+STAGE_METRIC_COLS = ("stage", "started_at", "wall_s", "cpu_s", "peak_rss_kb",
+                     "items_in", "items_out", "status", "error")
+
+def record_stage_metrics(run_db_id: int, stages: Iterable[dict]):
+    """Replace a run's per-stage metrics (entries as written to metrics.json)."""
+    con = connect()
+    cols = ",".join(("run_id",) + STAGE_METRIC_COLS)
+    ph = ",".join(["?"] * (len(STAGE_METRIC_COLS) + 1))
+    con.executemany(
+        f"INSERT OR REPLACE INTO stage_metric ({cols}) VALUES ({ph})",
+        [(run_db_id, *(s.get(c) for c in STAGE_METRIC_COLS)) for s in stages],
+    )
+    con.close()
+
 def index_urls_into_fts():
     con = connect()
     # Insert only new rows (skip existing rowids).
@@ -25,6 +25,9 @@ from src.pipeline.delta import (
 # Enrichment (NVD + CISA KEV)
 from src.pipeline.enrich import enrich_run_with_known_vulns, update_kev_cache
 
+# Prometheus metrics (textfile collector / optional HTTP endpoint)
+from src.pipeline import openmetrics as om
+
 ROOT = Path(__file__).resolve().parents[1]       # project root
 RUNS_DIR = ROOT / "data" / "runs"
 DATA_DIR = ROOT / "data"
@@ -34,6 +37,42 @@ LOGS_DIR.mkdir(parents=True, exist_ok=True)
 
 KEV_STAMP = DATA_DIR / "kev.last_refresh"        # when we last refreshed KEV cache
 
+# Counter/histogram state survives between cycles here; the rendered metrics go
+# to RECON_METRICS_TEXTFILE (point it into node_exporter's textfile directory).
+METRICS_STATE = DATA_DIR / "passive_metrics.json"
+METRICS_TEXTFILE = Path(os.getenv("RECON_METRICS_TEXTFILE", str(DATA_DIR / "passive.prom")))
+
+om.describe("recon_passive_cycles_total", "counter", "Passive cycles completed.")
+om.describe("recon_passive_cycle_duration_seconds", "histogram", "Wall time of one passive cycle.")
+om.describe("recon_passive_last_cycle_duration_seconds", "gauge", "Wall time of the most recent cycle.")
+om.describe("recon_passive_last_cycle_timestamp_seconds", "gauge", "Unix time the most recent cycle finished.")
+om.describe("recon_passive_loop_interval_seconds", "gauge", "Sleep interval of --loop mode (0 when run one-shot).")
+om.describe("recon_passive_due_targets", "gauge", "Targets due at the start of the most recent cycle.")
+om.describe("recon_passive_target_lag_seconds", "gauge", "How late (past its interval) a target's scan started.")
+om.describe("recon_passive_target_scan_duration_seconds", "histogram", "Wall time of one target's CLI scan.")
+om.describe("recon_passive_scan_failures_total", "counter", "CLI scans that exited non-zero or could not start.")
+om.describe("recon_passive_enrichment_duration_seconds", "histogram", "Wall time of NVD/KEV enrichment per run.",
+            buckets=(0.5, 1, 2, 5, 10, 30, 60, 120, 300, 600))
+om.describe("recon_passive_enrichment_failures_total", "counter", "Enrichment attempts that raised.")
+om.describe("recon_passive_slack_notifications_total", "counter", "Slack webhook posts attempted.")
+om.describe("recon_passive_slack_failures_total", "counter", "Slack webhook posts that errored or returned non-2xx.")
+
+_metrics_loaded = False
+
+def _metrics_load():
+    global _metrics_loaded
+    if not _metrics_loaded:
+        om.load_state(METRICS_STATE)
+        _metrics_loaded = True
+
+def _metrics_flush(verbose: bool = True):
+    try:
+        om.save_state(METRICS_STATE)
+        om.write_textfile(METRICS_TEXTFILE)
+    except Exception as e:
+        if verbose:
+            print(f"[warn] Could not write metrics: {e}")
+
 # ---------- helpers ----------
 
 def normalize_target(target: str) -> str:
@@ -99,16 +138,23 @@ def load_targets_from_file(path: Path) -> List[Tuple[str, int]]:
 def build_cli_cmd(target: str, run_id: str) -> List[str]:
     """
     Build the CLI command for a single scan.
-    Tweak defaults here (nuclei tags/severity, httpx rates, etc.).
+    Tweak defaults here (nuclei tags/severity, starting httpx rates, etc.).
     """
     return [
-        os.environ.get("PYTHON", str(Path(os.sys.executable))), "-m", "src.cli", "run", target,
+        os.environ.get("PYTHON", str(Path(os.sys.executable))), "-m", "src.cli", target,
         "--run-id", run_id,
         "--httpx-threads", "50",
         "--httpx-rate", "120",
+        # Skip re-probing hosts whose DNS is unchanged since a probe in the last 6h
+        "--probe-cache-ttl", "360",
         "--nuclei-concurrency", "60",
         "--nuclei-rate", "250",
         "--nuclei-severity", "critical,high",
+        # Rates above are only the starting point; each target's next run is
+        # tuned from the timeouts and throughput of its previous ones
+        "--adaptive-rates",
+        # Only rescan URLs whose httpx fingerprint changed; full rescan daily
+        "--nuclei-rescan-hours", "24",
         # Optional: uncomment to focus on CVEs
         # "--nuclei-tags", "cve",
     ]
@@ -139,11 +185,14 @@ def run_scan_and_collect(target: str) -> Tuple[Optional[Path], str]:
             capture_output=True,
             env=env,
         )
+        if proc.returncode != 0:
+            om.inc("recon_passive_scan_failures_total", target=target)
         _append(log_path, proc.stdout or "")
         if proc.stderr:
             _append(log_path, f"\n[stderr]\n{proc.stderr}")
         return run_dir, (proc.stdout or "") + ("\n[stderr]\n" + proc.stderr if proc.stderr else "")
     except Exception as e:
+        om.inc("recon_passive_scan_failures_total", target=target)
         _append(log_path, f"\n[error]\n{e}\n")
         return run_dir, f"[error] {e}"
 
@@ -225,10 +274,13 @@ def maybe_slack_notify(payload: dict):
     if not webhook:
         return
     import requests
+    om.inc("recon_passive_slack_notifications_total")
     try:
-        requests.post(webhook, json=payload, timeout=10)
+        resp = requests.post(webhook, json=payload, timeout=10)
+        if resp.status_code >= 300:
+            om.inc("recon_passive_slack_failures_total")
     except Exception:
-        pass
+        om.inc("recon_passive_slack_failures_total")
 
 def notify_run_summary(deltas: dict, enrich_counts: Dict[str, Any]):
     total_new = len(deltas["new_subdomains"]) + len(deltas["new_urls"]) + len(deltas["new_findings"])
@@ -282,6 +334,8 @@ def one_cycle(verbose: bool = True) -> int:
     Returns number of targets processed.
     """
     init_db()
+    _metrics_load()
+    cycle_started = time.time()
 
     # sync targets file into DB (idempotent)
     targets = load_targets_from_file(TARGETS_FILE)
@@ -298,6 +352,7 @@ def one_cycle(verbose: bool = True) -> int:
 
     if verbose:
         print(f"[i] {len(due)} target(s) due.")
+    om.set_gauge("recon_passive_due_targets", len(due))
 
     processed = 0
     for domain, interval, last in due:
@@ -307,13 +362,20 @@ def one_cycle(verbose: bool = True) -> int:
         if verbose:
             print(f"[+] Running {domain} (interval={interval}m, last={last})")
 
+        if last:
+            om.set_gauge("recon_passive_target_lag_seconds",
+                         max(0, now - (last + interval * 60)), target=domain)
+
         # 1) full scan via CLI
+        t0 = time.time()
         run_dir, _ = run_scan_and_collect(domain)
+        om.observe("recon_passive_target_scan_duration_seconds", time.time() - t0, target=domain)
 
         # 2) deltas
         deltas = compute_and_save_deltas(run_dir)
 
         # 3) enrichment (NVD + KEV)
+        t0 = time.time()
         try:
             out_path = enrich_run_with_known_vulns(
                 str(run_dir),
@@ -324,7 +386,9 @@ def one_cycle(verbose: bool = True) -> int:
         except Exception as e:
             if verbose:
                 print(f"[warn] Enrichment failed: {e}")
+            om.inc("recon_passive_enrichment_failures_total")
             enrich_counts = {"components": 0, "nvd_cves": 0, "kev_cves": 0}
+        om.observe("recon_passive_enrichment_duration_seconds", time.time() - t0)
 
         # 4) notify (Slack) if anything interesting
         notify_run_summary(deltas, enrich_counts)
@@ -339,9 +403,37 @@ def one_cycle(verbose: bool = True) -> int:
                 f"enrich: NVD={enrich_counts.get('nvd_cves',0)}, KEV={enrich_counts.get('kev_cves',0)})"
             )
 
+    elapsed = time.time() - cycle_started
+    om.inc("recon_passive_cycles_total")
+    om.observe("recon_passive_cycle_duration_seconds", elapsed)
+    om.set_gauge("recon_passive_last_cycle_duration_seconds", elapsed)
+    om.set_gauge("recon_passive_last_cycle_timestamp_seconds", time.time())
+    _metrics_flush(verbose)
+
     return processed
 
 if __name__ == "__main__":
-    count = one_cycle(verbose=True)
-    if count == 0:
-        print("[i] No targets due; nothing to do.")
+    import argparse
+    ap = argparse.ArgumentParser(description="Run the passive recon scheduler.")
+    ap.add_argument("--loop", type=int, default=0,
+                    help="Keep running, starting a cycle every N seconds (default: one cycle and exit)")
+    ap.add_argument("--metrics-port", type=int, default=int(os.getenv("RECON_METRICS_PORT", "0")),
+                    help="Serve Prometheus metrics on 127.0.0.1:PORT/metrics while looping (0=off)")
+    args = ap.parse_args()
+
+    # Restore persisted series first: loading them later would overwrite the
+    # live loop interval with whatever an earlier (maybe one-shot) run saved.
+    _metrics_load()
+    om.set_gauge("recon_passive_loop_interval_seconds", max(0, args.loop))
+    if args.metrics_port and args.loop > 0:
+        om.serve(args.metrics_port)
+        print(f"[i] Metrics on http://127.0.0.1:{args.metrics_port}/metrics")
+
+    while True:
+        started = time.time()
+        count = one_cycle(verbose=True)
+        if count == 0:
+            print("[i] No targets due; nothing to do.")
+        if args.loop <= 0:
+            break
+        time.sleep(max(0, args.loop - (time.time() - started)))
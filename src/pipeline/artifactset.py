@@ -0,0 +1,132 @@
+# src/pipeline/artifactset.py
+from __future__ import annotations
+import hashlib, os, sqlite3
+from pathlib import Path
+from typing import Iterable
+
+# Append-only, de-duplicated line files (urls.txt, subs.txt, ...).
+# Next to each text file sits `<name>.idx`, a small SQLite table of 64-bit
+# line hashes, so a merge only looks up and appends the *new* lines instead of
+# re-reading the whole destination. The index also records how many bytes of
+# the text file it covers plus a checksum of the last block it indexed: if the
+# file grew behind our back the tail is indexed, if it was rewritten the index
+# is rebuilt from scratch.
+#
+# A 64-bit hash collision would make a genuinely new line look seen; at ten
+# million lines the chance of any collision is ~3e-6.
+
+_TAIL = 4096
+_CHUNK = 500
+
+def _key(line: str) -> int:
+    return int.from_bytes(hashlib.blake2b(line.encode("utf-8"), digest_size=8).digest(), "big", signed=True)
+
+class ArtifactSet:
+    """
+    A text file of unique, non-empty, stripped lines with a persistent hash index.
+
+        with ArtifactSet(run_dir / "urls.txt") as urls:
+            added = urls.merge_file(run_dir / "katana.txt")
+    """
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self.index_path = self.path.with_name(self.path.name + ".idx")
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._con = sqlite3.connect(self.index_path)
+        self._con.execute("PRAGMA journal_mode=WAL;")
+        self._con.execute("CREATE TABLE IF NOT EXISTS h (k INTEGER PRIMARY KEY);")
+        self._con.execute("CREATE TABLE IF NOT EXISTS meta (id INTEGER PRIMARY KEY CHECK (id = 1), covered INTEGER, tail TEXT);")
+        self._sync()
+
+    # --- index maintenance ---
+
+    def _tail_digest(self, upto: int) -> str:
+        if upto <= 0:
+            return ""
+        with self.path.open("rb") as f:
+            f.seek(max(0, upto - _TAIL))
+            return hashlib.sha256(f.read(upto - max(0, upto - _TAIL))).hexdigest()
+
+    def _sync(self):
+        row = self._con.execute("SELECT covered, tail FROM meta WHERE id = 1").fetchone()
+        covered, tail = row if row else (0, "")
+        size = self.path.stat().st_size if self.path.exists() else 0
+        if size < covered or self._tail_digest(covered) != tail:
+            # truncated or rewritten since we last looked
+            with self._con:
+                self._con.execute("DELETE FROM h")
+            covered = 0
+        if size > covered:
+            self._index_from(covered)
+        elif not row:
+            self._save_meta(size)
+
+    def _index_from(self, offset: int):
+        with self.path.open("rb") as f, self._con:
+            f.seek(offset)
+            keys = (_key(s) for s in (raw.decode("utf-8", errors="ignore").strip() for raw in f) if s)
+            self._con.executemany("INSERT OR IGNORE INTO h(k) VALUES(?)", ((k,) for k in keys))
+            self._save_meta(f.tell())
+
+    def _save_meta(self, covered: int):
+        self._con.execute("INSERT OR REPLACE INTO meta(id, covered, tail) VALUES(1, ?, ?)",
+                          (covered, self._tail_digest(covered)))
+
+    # --- public API ---
+
+    def __contains__(self, line: str) -> bool:
+        return self._con.execute("SELECT 1 FROM h WHERE k = ?", (_key(line.strip()),)).fetchone() is not None
+
+    def __len__(self) -> int:
+        return self._con.execute("SELECT COUNT(*) FROM h").fetchone()[0]
+
+    def add_lines(self, lines: Iterable[str]) -> int:
+        """Append every line not already present; returns how many were added."""
+        added = 0
+        with self._con, self.path.open("a+b") as f:
+            f.seek(0, os.SEEK_END)
+            if f.tell():
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    f.write(b"\n")
+            batch: dict = {}
+            for line in lines:
+                s = (line or "").strip()
+                if s:
+                    batch.setdefault(_key(s), s)
+                if len(batch) >= _CHUNK:
+                    added += self._append_new(f, batch)
+                    batch = {}
+            added += self._append_new(f, batch)
+            f.flush()
+            self._save_meta(f.tell())
+        return added
+
+    def _append_new(self, f, batch: dict) -> int:
+        if not batch:
+            return 0
+        keys = list(batch)
+        ph = ",".join("?" * len(keys))
+        have = {k for (k,) in self._con.execute(f"SELECT k FROM h WHERE k IN ({ph})", keys)}
+        new = [k for k in keys if k not in have]
+        self._con.executemany("INSERT INTO h(k) VALUES(?)", ((k,) for k in new))
+        f.write(b"".join(batch[k].encode("utf-8") + b"\n" for k in new))
+        return len(new)
+
+    def merge_file(self, src: str | Path) -> int:
+        """Stream src's lines into the set; returns how many were new."""
+        p = Path(src)
+        if not p.exists():
+            return 0
+        with p.open("r", encoding="utf-8", errors="ignore") as f:
+            return self.add_lines(f)
+
+    def close(self):
+        self._con.close()
+
+    def __enter__(self) -> "ArtifactSet":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,297 @@
+# src/pipeline/cache.py
+from __future__ import annotations
+import json, sqlite3
+from pathlib import Path
+from typing import Dict, Iterable, List, Set, Tuple
+
+# Cross-run caches live in their own SQLite file so they can be wiped
+# without touching recon.db (history) or seen.sqlite (delta tracking).
+DB_PATH = Path("data") / "cache.sqlite"
+
+_CHUNK = 500  # stay well under SQLite's host-parameter limit
+
+def connect() -> sqlite3.Connection:
+    DB_PATH.parent.mkdir(parents=True, exist_ok=True)
+    con = sqlite3.connect(str(DB_PATH), timeout=30)
+    con.execute("PRAGMA journal_mode=WAL;")
+    con.execute("PRAGMA synchronous=NORMAL;")
+    return con
+
+def init_db():
+    with connect() as c:
+        c.execute("""CREATE TABLE IF NOT EXISTS probe_cache (
+            host TEXT NOT NULL,
+            url TEXT NOT NULL,            -- '' marks "probed, no HTTP response"
+            ips TEXT NOT NULL,            -- sorted, comma-joined A answers at probe time
+            row TEXT NOT NULL,            -- raw httpx JSONL row
+            probed_at INTEGER NOT NULL,
+            PRIMARY KEY (host, url)
+        );""")
+        c.execute("""CREATE TABLE IF NOT EXISTS dns_cache (
+            host TEXT PRIMARY KEY,
+            records TEXT NOT NULL,        -- JSON {"a": [...], "aaaa": [...], "cname": [...]}; '' = NXDOMAIN/no answer
+            resolved_at INTEGER NOT NULL,
+            expires_at INTEGER NOT NULL
+        );""")
+        c.execute("CREATE INDEX IF NOT EXISTS ix_dns_cache_expires ON dns_cache(expires_at);")
+        c.execute("""CREATE TABLE IF NOT EXISTS tls_host (
+            host TEXT PRIMARY KEY,
+            fingerprint TEXT NOT NULL,    -- sha256 of the leaf cert; '' = no TLS answer
+            seen_at INTEGER NOT NULL
+        );""")
+        c.execute("""CREATE TABLE IF NOT EXISTS tls_cert (
+            fingerprint TEXT PRIMARY KEY,
+            names TEXT NOT NULL,          -- JSON [CN + SANs], lowercased
+            first_seen INTEGER NOT NULL
+        );""")
+        c.execute("""CREATE TABLE IF NOT EXISTS screen_url (
+            url TEXT PRIMARY KEY,
+            page_key TEXT NOT NULL,       -- httpx body hash (or status/length/title) at capture time
+            image TEXT NOT NULL,          -- screen_image.id
+            captured_at INTEGER NOT NULL
+        );""")
+        c.execute("""CREATE TABLE IF NOT EXISTS screen_image (
+            id TEXT PRIMARY KEY,          -- perceptual hash, or file sha256 without Pillow
+            path TEXT NOT NULL,
+            thumb TEXT NOT NULL,          -- '' when no thumbnail could be made
+            first_seen INTEGER NOT NULL
+        );""")
+        c.execute("""CREATE TABLE IF NOT EXISTS nuclei_state (
+            url TEXT PRIMARY KEY,
+            fingerprint TEXT NOT NULL,    -- httpx status|length|body hash|tech at scan time
+            scan_key TEXT NOT NULL,       -- hash of the nuclei settings used
+            scanned_at INTEGER NOT NULL,
+            findings TEXT NOT NULL        -- JSON list of raw nuclei rows for this URL
+        );""")
+        c.execute("""CREATE TABLE IF NOT EXISTS rate_state (
+            target TEXT NOT NULL,
+            tool TEXT NOT NULL,           -- httpx | nuclei
+            rate INTEGER NOT NULL,        -- requests/sec for the next run
+            workers INTEGER NOT NULL,     -- threads / concurrency for the next run
+            updated_at INTEGER NOT NULL,
+            history TEXT NOT NULL,        -- JSON list of recent observations
+            PRIMARY KEY (target, tool)
+        );""")
+
+def ip_key(ips: Iterable[str]) -> str:
+    return ",".join(sorted(set(ips)))
+
+def _chunks(items: List[str]):
+    for i in range(0, len(items), _CHUNK):
+        yield items[i:i + _CHUNK]
+
+# ---------- httpx probe cache ----------
+
+def probe_cache_lookup(host_ips: Dict[str, str], ttl_seconds: int, now: int) -> Dict[str, List[str]]:
+    """
+    host_ips: {host: ip_key} for the current run.
+    Return {host: [cached httpx rows]} for hosts whose entry is younger than
+    ttl_seconds and was recorded against the same DNS answers.
+    Hosts without answers are never treated as hits.
+    """
+    hosts = [h for h, k in host_ips.items() if k]
+    cutoff = now - ttl_seconds
+    stale = set()
+    hits: Dict[str, List[str]] = {}
+    with connect() as c:
+        for chunk in _chunks(hosts):
+            ph = ",".join("?" * len(chunk))
+            q = f"SELECT host, url, ips, row, probed_at FROM probe_cache WHERE host IN ({ph})"
+            for host, url, ips, row, probed_at in c.execute(q, chunk):
+                if ips != host_ips[host] or probed_at < cutoff:
+                    stale.add(host)
+                    continue
+                rows = hits.setdefault(host, [])
+                if url:
+                    rows.append(row)
+    for h in stale:
+        hits.pop(h, None)
+    return hits
+
+def probe_cache_store(probed: Dict[str, str], rows: Iterable[Tuple[str, str, str]], now: int):
+    """
+    Replace cache entries for every host in probed ({host: ip_key}).
+    rows: (host, url, raw_row) for each httpx row produced this run;
+    probed hosts without any row are cached as "no response".
+    """
+    hosts = list(probed)
+    with connect() as c:
+        for chunk in _chunks(hosts):
+            ph = ",".join("?" * len(chunk))
+            c.execute(f"DELETE FROM probe_cache WHERE host IN ({ph})", chunk)
+        answered = set()
+        batch = []
+        for host, url, row in rows:
+            answered.add(host)
+            batch.append((host, url, probed[host], row, now))
+            if len(batch) >= 1000:
+                c.executemany("INSERT OR REPLACE INTO probe_cache VALUES(?,?,?,?,?)", batch)
+                batch = []
+        batch.extend((h, "", probed[h], "", now) for h in hosts if h not in answered)
+        c.executemany("INSERT OR REPLACE INTO probe_cache VALUES(?,?,?,?,?)", batch)
+
+# ---------- DNS answer cache ----------
+
+def dns_cache_lookup(names: List[str], now: int) -> Tuple[Dict[str, dict], Set[str]]:
+    """
+    Return ({host: records} for unexpired positive entries,
+            {hosts} with an unexpired negative entry).
+    """
+    positive: Dict[str, dict] = {}
+    negative: Set[str] = set()
+    with connect() as c:
+        for chunk in _chunks(names):
+            ph = ",".join("?" * len(chunk))
+            q = f"SELECT host, records FROM dns_cache WHERE expires_at > ? AND host IN ({ph})"
+            for host, records in c.execute(q, [now, *chunk]):
+                if records:
+                    positive[host] = json.loads(records)
+                else:
+                    negative.add(host)
+    return positive, negative
+
+def dns_cache_store(queried: List[str], answers: Dict[str, dict], now: int,
+                    min_ttl: int = 3600, max_ttl: int = 86400, negative_ttl: int = 3600):
+    """
+    Record the outcome of resolving `queried`: answered names are kept for their
+    record TTL (clamped to [min_ttl, max_ttl]); the rest are cached negatively.
+    """
+    rows = []
+    for host in queried:
+        rec = answers.get(host)
+        if rec:
+            ttl = min(max(int(rec.get("ttl") or 0), min_ttl), max_ttl)
+            body = json.dumps({k: rec.get(k) or [] for k in ("a", "aaaa", "cname")})
+            rows.append((host, body, now, now + ttl))
+        else:
+            rows.append((host, "", now, now + negative_ttl))
+    with connect() as c:
+        c.executemany("INSERT OR REPLACE INTO dns_cache VALUES(?,?,?,?)", rows)
+        c.execute("DELETE FROM dns_cache WHERE expires_at <= ?", (now - max_ttl,))
+
+# ---------- TLS certificate cache ----------
+
+def tls_cache_lookup(hosts: List[str], ttl_seconds: int, now: int) -> Dict[str, Tuple[str, List[str]]]:
+    """
+    {host: (fingerprint, names)} for hosts handshaked within ttl_seconds.
+    Hosts that had no TLS answer come back as ('', []).
+    """
+    out: Dict[str, Tuple[str, List[str]]] = {}
+    cutoff = now - ttl_seconds
+    with connect() as c:
+        for chunk in _chunks(hosts):
+            ph = ",".join("?" * len(chunk))
+            q = f"""SELECT h.host, h.fingerprint, COALESCE(t.names, '[]')
+                    FROM tls_host h LEFT JOIN tls_cert t ON t.fingerprint = h.fingerprint
+                    WHERE h.seen_at >= ? AND h.host IN ({ph})"""
+            for host, fp, names in c.execute(q, [cutoff, *chunk]):
+                out[host] = (fp, json.loads(names))
+    return out
+
+def tls_cache_store(probed: List[str], certs: Dict[str, Tuple[str, List[str]]], now: int):
+    """Record this run's handshakes: certs = {host: (fingerprint, names)}; the rest had no TLS."""
+    with connect() as c:
+        c.executemany("INSERT OR REPLACE INTO tls_host VALUES(?,?,?)",
+                      [(h, certs.get(h, ("", []))[0], now) for h in probed])
+        c.executemany("INSERT OR IGNORE INTO tls_cert VALUES(?,?,?)",
+                      [(fp, json.dumps(sorted(names)), now) for fp, names in certs.values() if fp])
+
+# ---------- screenshot cache ----------
+
+def screen_lookup(page_keys: Dict[str, str]) -> Dict[str, Tuple[str, str, str]]:
+    """
+    page_keys: {url: page_key} for this run.
+    {url: (image_id, path, thumb)} for URLs captured before with the same page_key
+    whose image is still on disk.
+    """
+    urls = list(page_keys)
+    out: Dict[str, Tuple[str, str, str]] = {}
+    with connect() as c:
+        for chunk in _chunks(urls):
+            ph = ",".join("?" * len(chunk))
+            q = f"""SELECT u.url, u.page_key, i.id, i.path, i.thumb
+                    FROM screen_url u JOIN screen_image i ON i.id = u.image
+                    WHERE u.url IN ({ph})"""
+            for url, key, image, path, thumb in c.execute(q, chunk):
+                if key == page_keys[url] and Path(path).exists():
+                    out[url] = (image, path, thumb)
+    return out
+
+def screen_images(ids: List[str]) -> Dict[str, Tuple[str, str]]:
+    """{image_id: (path, thumb)} for known images."""
+    out: Dict[str, Tuple[str, str]] = {}
+    with connect() as c:
+        for chunk in _chunks(ids):
+            ph = ",".join("?" * len(chunk))
+            for image, path, thumb in c.execute(f"SELECT id, path, thumb FROM screen_image WHERE id IN ({ph})", chunk):
+                out[image] = (path, thumb)
+    return out
+
+def screen_store(images: Iterable[Tuple[str, str, str]], captures: Iterable[Tuple[str, str, str]], now: int):
+    """images: (id, path, thumb) newly stored; captures: (url, page_key, image_id)."""
+    with connect() as c:
+        c.executemany("""INSERT INTO screen_image VALUES(?,?,?,?)
+                         ON CONFLICT(id) DO UPDATE SET path = excluded.path, thumb = excluded.thumb""",
+                      [(i, p, t, now) for i, p, t in images])
+        c.executemany("INSERT OR REPLACE INTO screen_url VALUES(?,?,?,?)",
+                      [(u, k, i, now) for u, k, i in captures])
+
+# ---------- incremental nuclei state ----------
+
+def nuclei_state_lookup(fingerprints: Dict[str, str], scan_key: str, ttl_seconds: int, now: int) -> Dict[str, List[str]]:
+    """
+    {url: [raw nuclei rows]} for URLs last scanned with the same settings,
+    within ttl_seconds, while their fingerprint was the same as now.
+    """
+    urls = list(fingerprints)
+    cutoff = now - ttl_seconds
+    out: Dict[str, List[str]] = {}
+    with connect() as c:
+        for chunk in _chunks(urls):
+            ph = ",".join("?" * len(chunk))
+            q = f"""SELECT url, fingerprint, findings FROM nuclei_state
+                    WHERE scan_key = ? AND scanned_at >= ? AND url IN ({ph})"""
+            for url, fp, findings in c.execute(q, [scan_key, cutoff, *chunk]):
+                if fp == fingerprints[url]:
+                    out[url] = json.loads(findings)
+    return out
+
+def nuclei_state_store(scanned: Dict[str, str], findings: Dict[str, List[str]], scan_key: str, now: int):
+    """scanned: {url: fingerprint} sent to nuclei this run; findings: {url: [raw rows]}."""
+    with connect() as c:
+        c.executemany("INSERT OR REPLACE INTO nuclei_state VALUES(?,?,?,?,?)",
+                      [(u, fp, scan_key, now, json.dumps(findings.get(u, []))) for u, fp in scanned.items()])
+
+# ---------- adaptive rate state ----------
+
+def rate_state_get(target: str, tool: str) -> dict | None:
+    with connect() as c:
+        row = c.execute("SELECT rate, workers, updated_at, history FROM rate_state WHERE target=? AND tool=?",
+                        (target, tool)).fetchone()
+    if not row:
+        return None
+    return {"rate": row[0], "workers": row[1], "updated_at": row[2], "history": json.loads(row[3])}
+
+def rate_state_put(target: str, tool: str, rate: int, workers: int, history: list, now: int):
+    with connect() as c:
+        c.execute("INSERT OR REPLACE INTO rate_state VALUES(?,?,?,?,?,?)",
+                  (target, tool, rate, workers, now, json.dumps(history)))
+
+def nuclei_orphans_get(key: str, scan_key: str, ttl_seconds: int, now: int) -> Dict[str, int]:
+    """
+    {raw nuclei row: last reported at} kept for a whole target (no URL to tie
+    them to), for these settings, leaving out rows not reported within ttl_seconds.
+    """
+    with connect() as c:
+        row = c.execute("SELECT findings FROM nuclei_state WHERE url = ? AND scan_key = ?",
+                        (key, scan_key)).fetchone()
+    cutoff = now - ttl_seconds
+    return {line: at for at, line in (json.loads(row[0]) if row else [])
+            if isinstance(at, int) and at >= cutoff}
+
+def nuclei_orphans_put(key: str, scan_key: str, rows: Dict[str, int], now: int):
+    """rows: {raw nuclei row: last reported at}."""
+    rows = [[at, line] for line, at in rows.items()]
+    with connect() as c:
+        c.execute("INSERT OR REPLACE INTO nuclei_state VALUES(?,?,?,?,?)",
+                  (key, "*", scan_key, now, json.dumps(rows)))
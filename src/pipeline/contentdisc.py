@@ -0,0 +1,166 @@
+# src/pipeline/contentdisc.py
+from __future__ import annotations
+import json, queue, secrets, threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional
+from urllib.parse import urlsplit
+
+import requests
+import urllib3
+
+from .artifactset import ArtifactSet
+from .util import resolve_binary, stream_cmd
+from . import governor, urlfilter
+
+urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)   # baseline probes skip cert checks
+
+# Content discovery (feroxbuster / ffuf) across every live origin at once.
+# Up to `max_procs` tool processes run concurrently, each held to a per-host
+# request rate and time budget. Every result line is pushed onto a queue and
+# a single writer (the calling thread) canonicalises it into the URL set as it
+# arrives, so nothing waits for the slowest host. Origins that answer 200 for
+# random paths are catch-alls: a wordlist would "find" every entry, so they
+# are skipped.
+
+TOOLS = ("ffuf", "feroxbuster")
+
+def origins_from(urls_file: Path) -> List[str]:
+    """Unique scheme://host[:port] origins from a URL list, in first-seen order."""
+    seen: Dict[str, None] = {}
+    p = Path(urls_file)
+    if not p.exists():
+        return []
+    with p.open("r", encoding="utf-8", errors="ignore") as f:
+        for line in f:
+            u = urlfilter.canonical_url(line)
+            if u:
+                parts = urlsplit(u)
+                seen.setdefault(f"{parts.scheme}://{parts.netloc}", None)
+    return list(seen)
+
+def is_catch_all(origin: str, probes: int = 2, timeout: float = 10.0) -> bool:
+    """
+    True if every one of `probes` random, surely-missing paths answers 200.
+    Network errors count as "not catch-all" and leave the decision to the tool.
+    """
+    for _ in range(probes):
+        try:
+            r = requests.get(f"{origin}/{secrets.token_hex(12)}", timeout=timeout,
+                             allow_redirects=False, verify=False, stream=True)
+            r.close()
+        except requests.RequestException:
+            return False
+        if r.status_code != 200:
+            return False
+    return True
+
+def _build_cmd(tool: str, binary: str, origin: str, wordlist: str, rate: int,
+               threads: int, max_seconds: int) -> List[str]:
+    if tool == "ffuf":
+        return [binary, "-u", f"{origin}/FUZZ", "-w", wordlist, "-json", "-s",
+                "-mc", "200,204,301,302,307,401,403",
+                "-rate", str(rate), "-t", str(threads), "-maxtime", str(max_seconds)]
+    return [binary, "-u", origin, "-w", wordlist, "--silent", "--no-state",
+            "--rate-limit", str(rate), "-t", str(threads), "--time-limit", f"{max_seconds}s"]
+
+def _parse_line(tool: str, line: str) -> Optional[str]:
+    s = line.strip()
+    if not s:
+        return None
+    if tool == "ffuf":
+        try:
+            return json.loads(s).get("url")
+        except (json.JSONDecodeError, ValueError, AttributeError):
+            return None
+    # feroxbuster --silent prints bare URLs; older builds prefix status/size columns
+    return s.split()[-1]
+
+def run_scheduler(
+    origins: Iterable[str],
+    wordlist: str,
+    out_urls_file: Path,
+    tool: str = "ffuf",
+    max_procs: int = 4,
+    per_host_rate: int = 20,
+    per_host_threads: int = 10,
+    per_host_seconds: int = 600,
+    scope: str = "",
+    report_file: Optional[Path] = None,
+    on_host_done: Optional[Callable[[str, dict], None]] = None,
+) -> Dict:
+    """
+    Brute-force every origin with `tool`, at most max_procs at a time.
+    out_urls_file is emptied first (a rerun starts over) and found URLs are
+    canonicalised (urlfilter) and appended to it as they stream in.
+    Returns {"hosts", "skipped_catch_all", "failed", "found", "added",
+    "per_host": {origin: {...}}}, also written to report_file.
+    """
+    if tool not in TOOLS:
+        raise ValueError(f"content discovery tool must be one of: {', '.join(TOOLS)}")
+    if not Path(wordlist).is_file():
+        raise RuntimeError(f"wordlist not found: {wordlist}")
+    binary = resolve_binary(tool, candidates=[f"/opt/homebrew/bin/{tool}", f"/usr/local/bin/{tool}"])
+    origins = list(origins)
+    # unbounded: a bounded queue would block the workers for good if the writer died
+    found: "queue.Queue[str]" = queue.Queue()
+    per_host: Dict[str, dict] = {}
+    lock = threading.Lock()
+
+    def work(origin: str):
+        st = {"status": "ok", "found": 0, "error": ""}
+        try:
+            def on_line(line: str):
+                u = _parse_line(tool, line)
+                if u:
+                    st["found"] += 1
+                    found.put(u)
+
+            # the catch-all probes hit the target too, so they run under the lease
+            with governor.acquire(tool, per_host_rate) as rate:
+                if is_catch_all(origin):
+                    st["status"] = "catch_all"
+                else:
+                    rc, err = stream_cmd(_build_cmd(tool, binary, origin, wordlist, rate,
+                                                    per_host_threads, per_host_seconds), on_line)
+                    if rc != 0:
+                        st["status"], st["error"] = "failed", f"{tool} exited {rc}: {err.strip()[-300:]}"
+        except Exception as e:
+            st["status"], st["error"] = "failed", str(e)
+        with lock:
+            per_host[origin] = st
+        if on_host_done:
+            on_host_done(origin, st)
+
+    stats = urlfilter.new_stats()
+    added = 0
+    Path(out_urls_file).write_text("", encoding="utf-8")   # ArtifactSet drops its index on truncation
+    with ArtifactSet(out_urls_file) as urls, \
+            ThreadPoolExecutor(max_workers=max(1, max_procs)) as pool:
+        futures = [pool.submit(work, o) for o in origins]
+        while True:
+            # write whatever arrived in the last half second, then go again
+            batch = []
+            try:
+                batch.append(found.get(timeout=0.5))
+                while len(batch) < 5000:
+                    batch.append(found.get_nowait())
+            except queue.Empty:
+                pass
+            if batch:
+                added += urls.add_lines(urlfilter.canonical_stream(batch, stats, scope))
+            elif all(f.done() for f in futures) and found.empty():
+                break
+    report = {
+        "tool": tool,
+        "hosts": len(origins),
+        "skipped_catch_all": sum(1 for s in per_host.values() if s["status"] == "catch_all"),
+        "failed": sum(1 for s in per_host.values() if s["status"] == "failed"),
+        "found": sum(s["found"] for s in per_host.values()),
+        "added": added,
+        "filtered": {k: stats[k] for k in ("static", "invalid", "out_of_scope")},
+        "per_host": per_host,
+    }
+    if report_file:
+        Path(report_file).write_text(json.dumps(report, indent=2), encoding="utf-8")
+    return report
@@ -1,19 +1,36 @@
 from pathlib import Path
 import json
-from .util import resolve_binary, run_cmd, append_unique_lines
+from .util import resolve_binary, run_cmd, stream_cmd
+from .artifactset import ArtifactSet
+from . import governor, urlfilter
 
-def run_katana(target_url: str, out_file: str, depth: int = 2, headless: bool = False):
+def _stream_to_file(cmd: list[str], out_file: str) -> int:
+    """Write a tool's stdout to out_file line by line (gau can emit millions of URLs)."""
+    n = 0
+    with Path(out_file).open("w", encoding="utf-8") as f:
+
+        def on_line(line: str):
+            nonlocal n
+            if line.strip():
+                f.write(line.strip() + "\n")
+                n += 1
+
+        stream_cmd(cmd, on_line)
+    return n
+
+def run_katana(target: str, out_file: str, depth: int = 2, headless: bool = False) -> int:
+    """Crawl a URL, or every URL in a file if target is a path. Returns lines written."""
     katana = resolve_binary("katana", candidates=["/opt/homebrew/bin/katana","/usr/local/bin/katana"])
-    cmd = [katana, "-u", target_url, "-silent", "-jc", "-d", str(depth)]
+    src_flag = "-list" if Path(target).is_file() else "-u"
+    cmd = [katana, src_flag, target, "-silent", "-jc", "-d", str(depth)]
     if headless:
         cmd += ["-hl"]
-    out = run_cmd(cmd, check=False)
-    Path(out_file).write_text(out.stdout)
+    with governor.acquire("katana"):
+        return _stream_to_file(cmd, out_file)
 
-def run_gau(domain: str, out_file: str):
+def run_gau(domain: str, out_file: str) -> int:
     gau = resolve_binary("gau", candidates=["/opt/homebrew/bin/gau","/usr/local/bin/gau", str(Path.home()/".local/bin/gau")])
-    out = run_cmd([gau, domain], check=False)
-    Path(out_file).write_text(out.stdout)
+    return _stream_to_file([gau, domain], out_file)
 
 def run_ferox(url: str, wordlist: str, out_file: str):
     ferox = resolve_binary("feroxbuster", candidates=["/opt/homebrew/bin/feroxbuster","/usr/local/bin/feroxbuster"])
@@ -43,5 +60,7 @@ def run_ffuf(url_template: str, wordlist: str, out_json: str, out_urls: str):
             pass
     Path(out_urls).write_text("\n".join(sorted(set(urls))) + ("\n" if urls else ""))
 
-def merge_into_urls(temp_file: str, urls_file: str):
-    append_unique_lines(temp_file, urls_file)
+def merge_into_urls(temp_file: str, urls_file: str, scope: str = "") -> dict:
+    """Canonicalise, filter and de-duplicate temp_file into urls_file; returns urlfilter counts."""
+    with ArtifactSet(urls_file) as urls:
+        return urlfilter.filter_into(urls, temp_file, scope)
@@ -1,10 +1,14 @@
 from __future__ import annotations
 
+import heapq
 import os
 import shutil
 import subprocess
+import tempfile
+from itertools import groupby
+from operator import itemgetter
 from pathlib import Path
-from typing import Iterable, List, Optional, Set, Tuple, Dict
+from typing import Iterable, Iterator, List, Optional, Set, Tuple, Dict
 
 
 def _augment_path() -> str:
@@ -17,7 +21,10 @@ def _augment_path() -> str:
 
 
 def _which(name: str) -> Optional[str]:
-    """Locate a binary on PATH (with our extended PATH)."""
+    """Locate a binary: ${NAME}_BIN if set (as in util.resolve_binary), else PATH (with our extended PATH)."""
+    override = os.environ.get(f"{name.upper()}_BIN")
+    if override and os.access(override, os.X_OK):
+        return override
     old = os.environ.get("PATH", "")
     os.environ["PATH"] = _augment_path()
     try:
@@ -74,22 +81,87 @@ def run_amass(domain: str, out_file: Path, passive: bool = True, timeout: Option
     return _write_unique(lines, out_file)
 
 
+def _iter_lines(p: Path) -> Iterator[str]:
+    with p.open("r", encoding="utf-8", errors="ignore") as f:
+        for line in f:
+            s = line.strip()
+            if s:
+                yield s
+
+
+def _is_sorted(p: Path) -> bool:
+    """True if p's non-empty lines are in strictly increasing order (as _write_unique leaves them)."""
+    prev = None
+    for s in _iter_lines(p):
+        if prev is not None and s <= prev:
+            return False
+        prev = s
+    return True
+
+
+def _sorted_inputs(inputs: List[Path], tmp_dir: Path) -> List[Path]:
+    """
+    The merge below needs each input sorted. Per-tool files from _write_unique
+    already are, so they are used as-is; anything else gets a sorted copy.
+    """
+    out = []
+    for i, p in enumerate(inputs):
+        if not p.exists():
+            out.append(None)
+        elif _is_sorted(p):
+            out.append(p)
+        else:
+            tmp = tmp_dir / f"{i}_{p.name}"
+            _write_unique(_iter_lines(p), tmp)
+            out.append(tmp)
+    return out
+
+
+def _tagged(p: Path, b: int) -> Iterator[Tuple[str, int]]:
+    for s in _iter_lines(p):
+        yield s, b
+
+
+def _merge_sorted(named_inputs: List[Tuple[str, Path]], tmp_dir: Path):
+    """
+    Stream (subdomain, source_bitmask) in sorted order over all inputs via a
+    k-way heap merge. Bit i is set when the i-th distinct source name has the
+    subdomain. Memory is O(number of inputs), not O(subdomains).
+    """
+    names = sorted({n for n, _ in named_inputs})
+    bit = {n: 1 << i for i, n in enumerate(names)}
+    paths = _sorted_inputs([p for _, p in named_inputs], tmp_dir)
+    streams = [
+        _tagged(p, bit[name])
+        for (name, _), p in zip(named_inputs, paths) if p is not None
+    ]
+    for sub, group in groupby(heapq.merge(*streams), key=itemgetter(0)):
+        mask = 0
+        for _, b in group:
+            mask |= b
+        yield sub, mask
+
+
+def _sources_for(mask: int, names: List[str], cache: Dict[int, str]) -> str:
+    s = cache.get(mask)
+    if s is None:
+        s = cache[mask] = ";".join(n for i, n in enumerate(names) if mask >> i & 1)
+    return s
+
+
 def combine_subdomains(inputs: List[Path], out_file: Path) -> int:
     """
-    Combine multiple subdomain lists into a single de-duplicated file.
+    Combine multiple subdomain lists into a single de-duplicated, sorted file.
+    Streams a k-way merge, so memory does not grow with the number of names.
     Returns total unique count.
     """
-    all_lines: Set[str] = set()
-    for p in inputs:
-        if not p.exists():
-            continue
-        for line in p.read_text(encoding="utf-8", errors="ignore").splitlines():
-            s = line.strip()
-            if s:
-                all_lines.add(s)
     out_file.parent.mkdir(parents=True, exist_ok=True)
-    out_file.write_text("\n".join(sorted(all_lines)) + ("\n" if all_lines else ""), encoding="utf-8")
-    return len(all_lines)
+    total = 0
+    with tempfile.TemporaryDirectory() as tmp, out_file.open("w", encoding="utf-8") as out:
+        for sub, _ in _merge_sorted([(str(i), p) for i, p in enumerate(inputs)], Path(tmp)):
+            out.write(sub + "\n")
+            total += 1
+    return total
 
 
 def combine_subdomains_with_attribution(
@@ -98,33 +170,24 @@ def combine_subdomains_with_attribution(
     out_attr_csv: Path,
 ) -> int:
     """
-    Build combined subs AND an attribution CSV.
+    Build combined subs AND an attribution CSV in one streaming pass.
     named_inputs: list of (source_name, path_to_file)
     out_attr_csv columns: subdomain,sources  (sources = ';' joined source names)
+    Sources are tracked as a bitmask per name during a k-way merge of the
+    (sorted) per-tool files, so memory stays flat regardless of input size.
     Returns total unique count.
     """
-    # Map subdomain -> set(sources)
-    attr: Dict[str, Set[str]] = {}
-    for source_name, p in named_inputs:
-        if not p.exists():
-            continue
-        for line in p.read_text(encoding="utf-8", errors="ignore").splitlines():
-            s = line.strip()
-            if not s:
-                continue
-            attr.setdefault(s, set()).add(source_name)
-
-    # Write combined subs
-    unique_subs = sorted(attr.keys())
+    names = sorted({n for n, _ in named_inputs})
+    labels: Dict[int, str] = {}
     out_subs_file.parent.mkdir(parents=True, exist_ok=True)
-    out_subs_file.write_text("\n".join(unique_subs) + ("\n" if unique_subs else ""), encoding="utf-8")
-
-    # Write attribution CSV
     out_attr_csv.parent.mkdir(parents=True, exist_ok=True)
-    lines = ["subdomain,sources"]
-    for sub in unique_subs:
-        sources = ";".join(sorted(attr[sub]))
-        lines.append(f"{sub},{sources}")
-    out_attr_csv.write_text("\n".join(lines) + ("\n" if lines else ""), encoding="utf-8")
-
-    return len(unique_subs)
+    total = 0
+    with tempfile.TemporaryDirectory() as tmp, \
+            out_subs_file.open("w", encoding="utf-8") as subs, \
+            out_attr_csv.open("w", encoding="utf-8") as attr:
+        attr.write("subdomain,sources\n")
+        for sub, mask in _merge_sorted(named_inputs, Path(tmp)):
+            subs.write(sub + "\n")
+            attr.write(f"{sub},{_sources_for(mask, names, labels)}\n")
+            total += 1
+    return total
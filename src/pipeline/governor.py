@@ -0,0 +1,126 @@
+# src/pipeline/governor.py
+from __future__ import annotations
+import os, sqlite3, time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List
+
+# Machine-wide limits for the scanners that hit targets (httpx, nuclei, naabu,
+# katana, tlsx, ffuf/feroxbuster, gowitness, subjack and the takeover
+# checks). The dashboard, batch mode and the passive cycle each start their
+# own pipelines, and every one of them assumes it has the machine to itself.
+# Before spawning a tool, a wrapper takes a lease from one SQLite file all
+# those processes share:
+#   - a slot: at most MAX_PROCS scanner processes run at once
+#   - a share of the rate budget: the rates (req/s) of running scanners add
+#     up to at most MAX_RPS. The tools pace their own requests, so a lease
+#     reserves a rate and the tool is started with the rate it was granted,
+#     which may be lower than the one asked for when others are busy.
+# Leases of processes that died are reclaimed by the next caller.
+
+DB_PATH = Path(os.getenv("RECON_GOVERNOR_DB", str(Path("data") / "governor.sqlite")))
+MAX_PROCS = int(os.getenv("RECON_MAX_PROCS", "4"))       # 0 = no slot limit
+MAX_RPS = int(os.getenv("RECON_MAX_RPS", "1000"))        # 0 = no rate budget
+MIN_SHARE = 0.25   # wait rather than start with less than this share of the rate asked for
+POLL_S = 0.5
+
+def configure(max_procs: int | None = None, max_rps: int | None = None):
+    global MAX_PROCS, MAX_RPS
+    if max_procs is not None:
+        MAX_PROCS = max_procs
+    if max_rps is not None:
+        MAX_RPS = max_rps
+
+def connect() -> sqlite3.Connection:
+    DB_PATH.parent.mkdir(parents=True, exist_ok=True)
+    con = sqlite3.connect(str(DB_PATH), timeout=30, isolation_level=None)
+    con.execute("PRAGMA journal_mode=WAL;")
+    con.execute("""CREATE TABLE IF NOT EXISTS lease (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        pid INTEGER NOT NULL,
+        tool TEXT NOT NULL,
+        rate INTEGER NOT NULL,        -- req/s reserved (0 for tools without a rate)
+        acquired_at REAL NOT NULL
+    );""")
+    return con
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+def _reclaim(c: sqlite3.Connection):
+    dead = [(i,) for i, pid in c.execute("SELECT id, pid FROM lease") if not _alive(pid)]
+    if dead:
+        c.executemany("DELETE FROM lease WHERE id = ?", dead)
+
+def _try_acquire(c: sqlite3.Connection, tool: str, rate: int) -> tuple[int | None, int, int, int]:
+    """(lease id or None, granted rate, busy slots, reserved rate), in one write transaction."""
+    c.execute("BEGIN IMMEDIATE")
+    try:
+        _reclaim(c)
+        busy, reserved = c.execute("SELECT COUNT(*), COALESCE(SUM(rate), 0) FROM lease").fetchone()
+        granted = rate
+        if MAX_RPS > 0 and rate > 0:
+            want = min(rate, MAX_RPS)
+            granted = min(want, MAX_RPS - reserved)
+            if granted < max(1, int(want * MIN_SHARE)):
+                c.execute("COMMIT")
+                return None, 0, busy, reserved
+        if MAX_PROCS > 0 and busy >= MAX_PROCS:
+            c.execute("COMMIT")
+            return None, 0, busy, reserved
+        cur = c.execute("INSERT INTO lease(pid, tool, rate, acquired_at) VALUES(?,?,?,?)",
+                        (os.getpid(), tool, granted, time.time()))
+        c.execute("COMMIT")
+        return cur.lastrowid, granted, busy, reserved
+    except BaseException:
+        c.execute("ROLLBACK")
+        raise
+
+@contextmanager
+def acquire(tool: str, rate: int = 0) -> Iterator[int]:
+    """
+    Hold a scanner slot (and `rate` req/s of the budget) for the duration of
+    the block, waiting until both are free. Yields the granted rate; start
+    the tool with it. With both limits off this is a no-op yielding `rate`.
+    """
+    if MAX_PROCS <= 0 and MAX_RPS <= 0:
+        yield rate
+        return
+    c = connect()
+    lease = None
+    waited = False
+    try:
+        while True:
+            lease, granted, busy, reserved = _try_acquire(c, tool, rate)
+            if lease is not None:
+                break
+            if not waited:
+                print(f"[i] governor: {tool} waiting ({busy}/{MAX_PROCS or '-'} scanners running, "
+                      f"{reserved}/{MAX_RPS or '-'} rps reserved)", flush=True)
+                waited = True
+            time.sleep(POLL_S)
+        if granted != rate:
+            print(f"[i] governor: {tool} rate {rate} -> {granted} rps (machine-wide budget)", flush=True)
+        yield granted
+    finally:
+        if lease is not None:
+            c.execute("DELETE FROM lease WHERE id = ?", (lease,))
+        c.close()
+
+def status() -> List[Dict]:
+    """Live leases: [{"pid", "tool", "rate", "held_s"}], oldest first."""
+    c = connect()
+    try:
+        now = time.time()
+        return [{"pid": pid, "tool": tool, "rate": rate, "held_s": round(now - at, 1)}
+                for pid, tool, rate, at in c.execute(
+                    "SELECT pid, tool, rate, acquired_at FROM lease ORDER BY acquired_at")
+                if _alive(pid)]
+    finally:
+        c.close()
@@ -0,0 +1,75 @@
+# src/pipeline/manifest.py
+from __future__ import annotations
+import hashlib, json, os, time
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional
+
+# Per-run record of which stages finished, with hashes of what they read and
+# wrote. `src.cli --resume <run-dir>` uses it to skip stages that are done.
+MANIFEST_NAME = "manifest.json"
+
+def file_digest(path: Path) -> str:
+    """sha256 of a file's contents; '' if it does not exist."""
+    p = Path(path)
+    if not p.is_file():
+        return ""
+    h = hashlib.sha256()
+    with p.open("rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+def inputs_digest(inputs: Iterable[Path], params: Optional[Dict[str, Any]] = None) -> str:
+    """One hash over every input file's content plus the stage's parameters."""
+    h = hashlib.sha256()
+    for p in inputs:
+        h.update(Path(p).name.encode("utf-8") + b"\0" + file_digest(p).encode("ascii") + b"\0")
+    h.update(json.dumps(params or {}, sort_keys=True, default=str).encode("utf-8"))
+    return h.hexdigest()
+
+def load(run_dir: Path) -> Dict[str, Any]:
+    p = Path(run_dir) / MANIFEST_NAME
+    try:
+        return json.loads(p.read_text(encoding="utf-8"))
+    except Exception:
+        return {"stages": {}}
+
+def _save(run_dir: Path, data: Dict[str, Any]):
+    p = Path(run_dir) / MANIFEST_NAME
+    tmp = p.with_suffix(".json.tmp")
+    tmp.write_text(json.dumps(data, indent=2), encoding="utf-8")
+    os.replace(tmp, p)  # atomic: a crash never leaves a half-written manifest
+
+def is_complete(run_dir: Path, stage: str, inputs: Iterable[Path], outputs: Iterable[Path],
+                params: Optional[Dict[str, Any]] = None) -> bool:
+    """
+    True if `stage` last finished OK with the same input hash and every output
+    is still on disk with the content it was recorded with.
+    """
+    entry = load(run_dir).get("stages", {}).get(stage)
+    if not entry or entry.get("status") != "ok":
+        return False
+    if entry.get("input_hash") != inputs_digest(inputs, params):
+        return False
+    recorded = entry.get("outputs", {})
+    for p in outputs:
+        name = Path(p).name
+        # '' records an output the stage legitimately did not produce
+        if name not in recorded or recorded[name] != file_digest(p):
+            return False
+    return True
+
+def record(run_dir: Path, stage: str, inputs: Iterable[Path], outputs: Iterable[Path],
+           params: Optional[Dict[str, Any]], status: str, started_at: float,
+           error: str = ""):
+    data = load(run_dir)
+    stages = data.setdefault("stages", {})
+    stages[stage] = {
+        "status": status,
+        "started_at": round(started_at, 3),
+        "finished_at": round(time.time(), 3),
+        "input_hash": inputs_digest(inputs, params),
+        "outputs": {Path(p).name: file_digest(p) for p in outputs},
+        "error": error,
+    }
+    _save(run_dir, data)
@@ -0,0 +1,95 @@
+# src/pipeline/metrics.py
+from __future__ import annotations
+import json, os, resource, sys, time
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional
+
+METRICS_NAME = "metrics.json"
+
+# Peak RSS of children reaped through reap() since the last reset_child_peak().
+# getrusage(RUSAGE_CHILDREN) only gives a process-lifetime high-water mark, so
+# stream_cmd reaps with wait4 to get each child's own peak. Linux also counts
+# the RSS a child inherited at fork, so tiny tools report ~ the CLI's own size.
+_child_peak_kb = 0
+
+def _rss_kb(maxrss: int) -> int:
+    # ru_maxrss is kilobytes on Linux but bytes on macOS
+    return maxrss // 1024 if sys.platform == "darwin" else maxrss
+
+def reap(proc) -> int:
+    """Wait for a Popen child, remembering its peak RSS. Returns the exit code."""
+    global _child_peak_kb
+    if not hasattr(os, "wait4"):
+        return proc.wait()
+    _, status, ru = os.wait4(proc.pid, 0)
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    _child_peak_kb = max(_child_peak_kb, _rss_kb(ru.ru_maxrss))
+    return proc.returncode
+
+def reset_child_peak():
+    global _child_peak_kb
+    _child_peak_kb = 0
+
+def snapshot() -> Dict[str, float]:
+    ch = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return {
+        "wall": time.time(),
+        "child_cpu": ch.ru_utime + ch.ru_stime,
+        "child_maxrss_kb": _rss_kb(ch.ru_maxrss),
+    }
+
+def count_items(path: Optional[Path]) -> Optional[int]:
+    """Non-empty lines in a file (None if it does not exist)."""
+    if path is None or not Path(path).is_file():
+        return None
+    n = 0
+    with Path(path).open("rb") as f:
+        for line in f:
+            if line.strip():
+                n += 1
+    return n
+
+def stage_entry(stage: str, before: Dict[str, float], after: Dict[str, float], status: str,
+                inputs: Iterable[Path] = (), outputs: Iterable[Path] = (),
+                error: str = "") -> Dict[str, Any]:
+    """
+    Build one stage's metrics. items_in/items_out count lines of the stage's
+    primary (first) input and output. peak_rss_kb is the largest child RSS seen
+    during the stage; children not reaped via reap() only show up when they
+    raise the process-wide high-water mark.
+    """
+    inputs, outputs = list(inputs), list(outputs)
+    peak = _child_peak_kb
+    if after["child_maxrss_kb"] > before["child_maxrss_kb"]:
+        peak = max(peak, int(after["child_maxrss_kb"]))
+    return {
+        "stage": stage,
+        "started_at": round(before["wall"], 3),
+        "wall_s": round(after["wall"] - before["wall"], 3),
+        "cpu_s": round(after["child_cpu"] - before["child_cpu"], 3),
+        "peak_rss_kb": peak or None,
+        "items_in": count_items(inputs[0]) if inputs else None,
+        "items_out": count_items(outputs[0]) if outputs else None,
+        "status": status,
+        "error": error,
+    }
+
+def write_run_metrics(run_dir: Path, target: str, entry: Dict[str, Any]):
+    """Add/replace a stage's entry in <run_dir>/metrics.json (atomically)."""
+    p = Path(run_dir) / METRICS_NAME
+    try:
+        data = json.loads(p.read_text(encoding="utf-8"))
+    except Exception:
+        data = {"run": Path(run_dir).name, "target": target, "stages": []}
+    data["stages"] = [s for s in data.get("stages", []) if s.get("stage") != entry["stage"]]
+    data["stages"].append(entry)
+    tmp = p.with_suffix(".json.tmp")
+    tmp.write_text(json.dumps(data, indent=2), encoding="utf-8")
+    os.replace(tmp, p)
+
+def load_run_metrics(run_dir: Path) -> Dict[str, Any]:
+    p = Path(run_dir) / METRICS_NAME
+    try:
+        return json.loads(p.read_text(encoding="utf-8"))
+    except Exception:
+        return {"stages": []}
@@ -0,0 +1,210 @@
+# src/pipeline/nucleiplan.py
+from __future__ import annotations
+import json
+from pathlib import Path
+from typing import Dict, FrozenSet, List
+from urllib.parse import urlsplit
+
+from .scan import run_nuclei
+
+# Tech-aware nuclei planning. httpx already told us what every origin runs;
+# WordPress templates against an nginx JSON API (and the reverse) cannot
+# match, so URLs are grouped by the nuclei tags their origin's tech maps to,
+# and each group gets one nuclei run restricted to those tags. One more run,
+# the baseline, covers every URL with every template except those carrying a
+# tag of the tech table: CVE and product templates for tech the table does
+# not know still reach every URL, and tech templates (including ones also
+# tagged exposure/misconfig) only run in their tech's group.
+
+# httpx tech name (lowercase, version stripped) -> nuclei template tags
+TECH_TAGS: Dict[str, str] = {
+    "wordpress": "wordpress,wp-plugin,wp-theme",
+    "joomla": "joomla",
+    "drupal": "drupal",
+    "magento": "magento",
+    "php": "php",
+    "laravel": "laravel",
+    "apache http server": "apache",
+    "apache tomcat": "tomcat",
+    "nginx": "nginx",
+    "microsoft iis": "iis",
+    "microsoft asp.net": "iis,aspnet",
+    "jenkins": "jenkins",
+    "jetty": "jetty",
+    "jira": "jira",
+    "confluence": "confluence",
+    "gitlab": "gitlab",
+    "grafana": "grafana",
+    "kibana": "kibana",
+    "elasticsearch": "elastic",
+    "spring": "spring,springboot",
+    "django": "django",
+    "ruby on rails": "rails",
+    "express": "nodejs,express",
+    "adobe coldfusion": "coldfusion",
+    "microsoft sharepoint": "sharepoint",
+    "outlook web app": "exchange",
+    "oracle weblogic server": "weblogic",
+    "jboss": "jboss",
+    "phpmyadmin": "phpmyadmin",
+    "sonarqube": "sonarqube",
+    "amazon s3": "aws,s3",
+    "citrix": "citrix",
+    "fortinet": "fortinet",
+    "vmware": "vmware",
+}
+
+# optional -tags filter for the baseline run; empty = no include filter
+BASELINE_TAGS = ""
+
+def load_tech_map(path: str | None = None) -> Dict[str, str]:
+    """TECH_TAGS, overridden/extended by a JSON {"tech name": "tag1,tag2"} file."""
+    table = dict(TECH_TAGS)
+    if path:
+        extra = json.loads(Path(path).read_text(encoding="utf-8"))
+        table.update({k.strip().lower(): v for k, v in extra.items()})
+    return table
+
+def _tech_name(t: str) -> str:
+    # httpx reports "Nginx:1.25.3" / "PHP:8.1"
+    return str(t).split(":", 1)[0].strip().lower()
+
+def _origin(url: str) -> str:
+    p = urlsplit(url.strip())
+    return f"{p.scheme}://{p.netloc}".lower()
+
+def origin_techs(http_jsonl: str | Path) -> Dict[str, List[str]]:
+    """{origin: [tech names]} from httpx JSONL rows."""
+    out: Dict[str, List[str]] = {}
+    p = Path(http_jsonl)
+    if not p.exists():
+        return out
+    with p.open("r", encoding="utf-8", errors="ignore") as f:
+        for line in f:
+            try:
+                row = json.loads(line)
+            except (json.JSONDecodeError, ValueError):
+                continue
+            url = row.get("url")
+            if not url:
+                continue
+            have = out.setdefault(_origin(url), [])
+            for t in row.get("tech") or row.get("technology") or []:
+                name = _tech_name(t)
+                if name and name not in have:
+                    have.append(name)
+    return out
+
+def _tags_for(techs: List[str], table: Dict[str, str]) -> FrozenSet[str]:
+    tags = set()
+    for t in techs:
+        for tag in (table.get(t) or "").split(","):
+            if tag.strip():
+                tags.add(tag.strip())
+    return frozenset(tags)
+
+def tech_tags(table: Dict[str, str], baseline_tags: str = "") -> List[str]:
+    """Every tag of the tech table that is not itself a baseline tag, sorted."""
+    baseline = {t.strip() for t in baseline_tags.split(",") if t.strip()}
+    return sorted(_tags_for(list(table), table) - baseline)
+
+def plan(urls_file: str | Path, http_jsonl: str | Path, table: Dict[str, str]) -> Dict[FrozenSet[str], List[str]]:
+    """Group the URLs to scan by the tag set their origin's tech maps to ({} = no known tech)."""
+    techs = origin_techs(http_jsonl)
+    groups: Dict[FrozenSet[str], List[str]] = {}
+    with Path(urls_file).open("r", encoding="utf-8", errors="ignore") as f:
+        for line in f:
+            u = line.strip()
+            if u:
+                groups.setdefault(_tags_for(techs.get(_origin(u), []), table), []).append(u)
+    return groups
+
+def run_planned(
+    urls_file: str | Path,
+    http_jsonl: str | Path,
+    out_jsonl_file: str | Path,
+    work_dir: str | Path,
+    tech_map: str | None = None,
+    baseline_tags: str = BASELINE_TAGS,
+    severity: str | None = None,
+    concurrency: int = 50,
+    rate_limit: int = 200,
+    error_log: str | None = None,
+) -> dict:
+    """
+    One baseline nuclei run over every URL (all templates but the tech-tagged
+    ones, or only baseline_tags if given) plus one run per tech group with
+    that group's tags. Findings from all runs are merged (duplicates dropped)
+    into out_jsonl_file; the plan goes to <work_dir>/nuclei_plan.json.
+    With error_log, every run's nuclei error log is concatenated into it.
+    The report's "rate" is the lowest rate any run was granted.
+    A failing run is reported after the others have finished.
+    """
+    work = Path(work_dir)
+    parts_dir = work / "nuclei_parts"
+    parts_dir.mkdir(parents=True, exist_ok=True)
+    table = load_tech_map(tech_map)
+    groups = plan(urls_file, http_jsonl, table)
+    total_urls = sum(len(v) for v in groups.values())
+
+    runs = [{"name": "baseline", "tags": baseline_tags or None,
+             "exclude_tags": ",".join(tech_tags(table, baseline_tags)),
+             "input": str(urls_file), "urls": total_urls}]
+    for i, (tags, urls) in enumerate(sorted(((t, u) for t, u in groups.items() if t),
+                                            key=lambda kv: -len(kv[1]))):
+        inp = parts_dir / f"group{i}_urls.txt"
+        inp.write_text("\n".join(urls) + "\n", encoding="utf-8")
+        runs.append({"name": f"group{i}", "tags": ",".join(sorted(tags)), "input": str(inp), "urls": len(urls)})
+
+    errors = []
+    for r in runs:
+        part = parts_dir / f"{r['name']}.jsonl"
+        r["output"] = str(part)
+        try:
+            r["rate"] = run_nuclei(r["input"], str(part), tags=r["tags"], severity=severity,
+                                   exclude_tags=r.get("exclude_tags") or None,
+                                   concurrency=concurrency, rate_limit=rate_limit,
+                                   error_log=str(parts_dir / f"{r['name']}.errors.jsonl") if error_log else None)["rate"]
+        except Exception as e:
+            errors.append(f"{r['name']}: {e}")
+            r["error"] = str(e)
+
+    findings = 0
+    seen = set()
+    with Path(out_jsonl_file).open("w", encoding="utf-8") as out:
+        for r in runs:
+            part = Path(r["output"])
+            if not part.exists():
+                continue
+            with part.open("r", encoding="utf-8", errors="ignore") as f:
+                for line in f:
+                    try:
+                        obj = json.loads(line)
+                    except (json.JSONDecodeError, ValueError):
+                        continue
+                    key = (obj.get("template-id"), obj.get("matched-at"), obj.get("matcher-name"))
+                    if key in seen:
+                        continue
+                    seen.add(key)
+                    out.write(line.rstrip("\n") + "\n")
+                    findings += 1
+
+    if error_log:
+        with Path(error_log).open("w", encoding="utf-8") as out:
+            for r in runs:
+                part = parts_dir / f"{r['name']}.errors.jsonl"
+                if part.exists():
+                    out.write(part.read_text(encoding="utf-8", errors="ignore"))
+
+    report = {
+        "urls": total_urls,
+        "runs": runs,
+        "untagged_urls": len(groups.get(frozenset(), [])),
+        "findings": findings,
+        "rate": min((r["rate"] for r in runs if r.get("rate")), default=rate_limit),
+        "concurrency": concurrency,
+    }
+    (work / "nuclei_plan.json").write_text(json.dumps(report, indent=2), encoding="utf-8")
+    if errors:
+        raise RuntimeError("; ".join(errors) + f"; partial findings kept in {out_jsonl_file}")
+    return report
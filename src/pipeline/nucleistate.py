@@ -0,0 +1,183 @@
+# src/pipeline/nucleistate.py
+from __future__ import annotations
+import hashlib, json, time
+from pathlib import Path
+from typing import Callable, Dict, List
+from urllib.parse import urlsplit
+
+from . import cache
+
+# Incremental nuclei. Passive mode scans the same targets every interval and
+# most of their pages have not changed in between. Each URL's httpx
+# fingerprint (status, content length, body hash, tech) is stored next to the
+# time it was last scanned and the findings that scan produced. A URL goes back
+# to nuclei only when it is new, its fingerprint changed, the nuclei settings
+# changed, or its last scan is older than the full-rescan TTL; the stored
+# findings of every other URL are carried forward into this run's output, so
+# deltas and reports see the same findings as after a full scan.
+
+def fingerprint(row: dict) -> str:
+    status = row.get("status_code", row.get("status-code", ""))
+    body = (row.get("hash") or {}).get("body_sha256", "")
+    tech = sorted(str(t) for t in (row.get("tech") or row.get("technology") or []))
+    raw = f"{status}|{row.get('content_length', '')}|{body}|{','.join(tech)}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:32]
+
+def _origin(url: str) -> str:
+    p = urlsplit(url.strip())
+    return f"{p.scheme}://{p.netloc}".lower()
+
+def _read_jsonl(path: Path):
+    if not path.exists():
+        return
+    with path.open("r", encoding="utf-8", errors="ignore") as f:
+        for line in f:
+            try:
+                yield line.rstrip("\n"), json.loads(line)
+            except (json.JSONDecodeError, ValueError):
+                continue
+
+def url_fingerprints(urls_file: str | Path, http_jsonl: str | Path) -> Dict[str, str]:
+    """
+    {url: fingerprint} for every URL to scan. URLs httpx did not probe
+    themselves (archive, crawl, brute-force finds) take their origin's
+    fingerprint, so they are rescanned when the site in front of them changes.
+    """
+    by_url: Dict[str, str] = {}
+    by_origin: Dict[str, str] = {}
+    for _, row in _read_jsonl(Path(http_jsonl)):
+        url = row.get("url")
+        if not url:
+            continue
+        fp = fingerprint(row)
+        by_url.setdefault(url, fp)
+        by_origin.setdefault(_origin(url), fp)
+    out: Dict[str, str] = {}
+    with Path(urls_file).open("r", encoding="utf-8", errors="ignore") as f:
+        for line in f:
+            u = line.strip()
+            if u and u not in out:
+                out[u] = by_url.get(u) or by_origin.get(_origin(u)) or "unprobed"
+    return out
+
+def _hostname(v: str) -> str:
+    """Host of a URL or of a bare `host` / `host:port` (DNS, SSL and network templates)."""
+    v = v.strip()
+    if "://" in v:
+        return (urlsplit(v).hostname or "").lower()
+    return (urlsplit("//" + v).hostname or "").lower()
+
+def _attribute(obj: dict, scanned: Dict[str, str], first_by_origin: Dict[str, str],
+               first_by_host: Dict[str, str]) -> str | None:
+    """
+    The scanned URL a nuclei row belongs to: its input URL if nuclei reports
+    it, else the first scanned URL of its origin, else of its host name.
+    """
+    fields = [v for v in (obj.get(k) for k in ("url", "matched-at", "host")) if isinstance(v, str) and v]
+    for v in fields:
+        if v in scanned:
+            return v
+    for v in fields:
+        if "://" in v:
+            hit = first_by_origin.get(_origin(v))
+            if hit:
+                return hit
+    for v in fields:
+        hit = first_by_host.get(_hostname(v))
+        if hit:
+            return hit
+    return None
+
+def scan_key(params: dict) -> str:
+    """Stable hash of the nuclei settings; a different key means a full rescan."""
+    return hashlib.sha256(json.dumps(params, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+def run_incremental(
+    urls_file: str | Path,
+    http_jsonl: str | Path,
+    out_jsonl_file: str | Path,
+    work_dir: str | Path,
+    runner: Callable[[str, str], object],
+    params: dict,
+    rescan_hours: int = 24,
+    target: str = "",
+) -> dict:
+    """
+    Scan only the new/changed/expired URLs of urls_file with
+    runner(in_urls_file, out_jsonl_file) and write out_jsonl_file = fresh
+    findings + findings carried forward for the rest (duplicates dropped).
+    Rows no scanned URL can be tied to are kept under a per-target entry,
+    each with the time nuclei last reported it; they are carried until they
+    go unreported for longer than the rescan TTL (or a full rescan replaces
+    them), so a fixed host-level finding drops out like any other.
+    State is only updated when the runner succeeds; on failure the carried
+    and partial findings are still written before the error is re-raised.
+    Returns {"urls", "scanned", "carried", "fresh_findings",
+    "carried_findings"}, also written to <work_dir>/nuclei_incremental.json.
+    """
+    work = Path(work_dir)
+    now = int(time.time())
+    key = scan_key(params)
+    fps = url_fingerprints(urls_file, http_jsonl)
+
+    cache.init_db()
+    carried = cache.nuclei_state_lookup(fps, key, rescan_hours * 3600, now)
+    todo = {u: fp for u, fp in fps.items() if u not in carried}
+    orphan_key = f"target:{target}"
+    orphans = cache.nuclei_orphans_get(orphan_key, key, rescan_hours * 3600, now)
+
+    fresh_rows: Dict[str, List[str]] = {}
+    unattributed: List[str] = []
+    error = None
+    if todo:
+        todo_file = work / "nuclei_incremental_input.txt"
+        part = work / "nuclei_incremental.jsonl"
+        todo_file.write_text("\n".join(todo) + "\n", encoding="utf-8")
+        try:
+            runner(str(todo_file), str(part))
+        except Exception as e:
+            error = e
+        first_by_origin: Dict[str, str] = {}
+        first_by_host: Dict[str, str] = {}
+        for u in todo:
+            first_by_origin.setdefault(_origin(u), u)
+            first_by_host.setdefault(_hostname(u), u)
+        for line, obj in _read_jsonl(part):
+            owner = _attribute(obj, todo, first_by_origin, first_by_host)
+            if owner:
+                fresh_rows.setdefault(owner, []).append(line)
+            else:
+                unattributed.append(line)
+
+    seen = set()
+    counts = {"fresh_findings": 0, "carried_findings": 0}
+    with Path(out_jsonl_file).open("w", encoding="utf-8") as out:
+        groups = [("fresh_findings", rows) for rows in fresh_rows.values()]
+        groups.append(("fresh_findings", unattributed))
+        groups += [("carried_findings", rows) for rows in carried.values()]
+        if carried:   # on a full rescan the stored unowned rows are superseded
+            groups.append(("carried_findings", list(orphans)))
+        for kind, rows in groups:
+            for line in rows:
+                try:
+                    obj = json.loads(line)
+                except (json.JSONDecodeError, ValueError):
+                    continue
+                k = (obj.get("template-id"), obj.get("matched-at"), obj.get("matcher-name"))
+                if k in seen:
+                    continue
+                seen.add(k)
+                out.write(line + "\n")
+                counts[kind] += 1
+
+    report = {"urls": len(fps), "scanned": len(todo), "carried": len(carried),
+              "rescan_hours": rescan_hours, **counts}
+    (work / "nuclei_incremental.json").write_text(json.dumps(report, indent=2), encoding="utf-8")
+    if error is not None:
+        raise error
+    if todo:
+        cache.nuclei_state_store(todo, fresh_rows, key, now)
+        kept = dict(orphans) if carried else {}
+        kept.update((line, now) for line in unattributed)
+        cache.nuclei_orphans_put(orphan_key, key, kept, now)
+    return report
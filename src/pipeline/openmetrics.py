@@ -0,0 +1,128 @@
+# src/pipeline/openmetrics.py
+from __future__ import annotations
+import json, os, threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, Iterable
+
+# Minimal Prometheus text-format exporter for the passive scheduler.
+# Each passive cycle is usually its own process (cron/launchd), so counter and
+# histogram state is loaded from / saved to a JSON file between cycles; the
+# rendered text goes to a node_exporter textfile-collector path and, when the
+# scheduler runs as a loop, can also be served over HTTP.
+
+DEFAULT_BUCKETS = (1, 5, 15, 30, 60, 120, 300, 600, 1200, 1800, 3600, 7200)
+
+_lock = threading.Lock()
+_families: Dict[str, dict] = {}   # name -> {"type", "help", "buckets"}
+_series: Dict[str, dict] = {}     # name -> {label_str: value | {"buckets": [...], "sum", "count"}}
+
+def describe(name: str, mtype: str, help_text: str, buckets: Iterable[float] = DEFAULT_BUCKETS):
+    """Declare a metric family. mtype is 'counter', 'gauge' or 'histogram'."""
+    _families[name] = {"type": mtype, "help": help_text, "buckets": tuple(buckets)}
+
+def _labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    esc = lambda v: str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+    return "{" + ",".join(f'{k}="{esc(v)}"' for k, v in sorted(labels.items())) + "}"
+
+def inc(name: str, value: float = 1.0, **labels):
+    with _lock:
+        s = _series.setdefault(name, {})
+        key = _labels(labels)
+        s[key] = s.get(key, 0.0) + value
+
+def set_gauge(name: str, value: float, **labels):
+    with _lock:
+        _series.setdefault(name, {})[_labels(labels)] = float(value)
+
+def observe(name: str, value: float, **labels):
+    buckets = _families.get(name, {}).get("buckets", DEFAULT_BUCKETS)
+    with _lock:
+        s = _series.setdefault(name, {})
+        key = _labels(labels)
+        h = s.get(key)
+        if not isinstance(h, dict) or len(h.get("buckets", [])) != len(buckets):
+            h = s[key] = {"buckets": [0] * len(buckets), "sum": 0.0, "count": 0}
+        for i, le in enumerate(buckets):
+            if value <= le:
+                h["buckets"][i] += 1
+        h["sum"] += value
+        h["count"] += 1
+
+def _fmt(v: float) -> str:
+    v = float(v)
+    return str(int(v)) if v.is_integer() else repr(v)
+
+def _with_le(label_str: str, le: str) -> str:
+    inner = label_str[1:-1] if label_str else ""
+    return "{" + (inner + "," if inner else "") + f'le="{le}"' + "}"
+
+def render() -> str:
+    """Current state in the Prometheus text exposition format (0.0.4)."""
+    out = []
+    with _lock:
+        for name in sorted(set(_families) | set(_series)):
+            fam = _families.get(name, {"type": "untyped", "help": "", "buckets": DEFAULT_BUCKETS})
+            if fam["help"]:
+                out.append(f"# HELP {name} {fam['help']}")
+            out.append(f"# TYPE {name} {fam['type']}")
+            for lbl, val in sorted(_series.get(name, {}).items()):
+                if isinstance(val, dict):
+                    for le, n in zip(fam["buckets"], val["buckets"]):
+                        out.append(f"{name}_bucket{_with_le(lbl, _fmt(float(le)))} {n}")
+                    out.append(f"{name}_bucket{_with_le(lbl, '+Inf')} {val['count']}")
+                    out.append(f"{name}_sum{lbl} {_fmt(val['sum'])}")
+                    out.append(f"{name}_count{lbl} {val['count']}")
+                else:
+                    out.append(f"{name}{lbl} {_fmt(val)}")
+    return "\n".join(out) + "\n"
+
+def load_state(path: Path):
+    """Restore counters/histograms saved by a previous process (missing file = fresh start)."""
+    try:
+        data = json.loads(Path(path).read_text(encoding="utf-8"))
+    except Exception:
+        return
+    with _lock:
+        for name, series in (data.get("series") or {}).items():
+            _series.setdefault(name, {}).update(series)
+
+def save_state(path: Path):
+    p = Path(path)
+    p.parent.mkdir(parents=True, exist_ok=True)
+    with _lock:
+        payload = json.dumps({"series": _series})
+    tmp = p.with_suffix(p.suffix + ".tmp")
+    tmp.write_text(payload, encoding="utf-8")
+    os.replace(tmp, p)
+
+def write_textfile(path: Path):
+    """Atomically write render() to path (node_exporter ignores *.tmp files)."""
+    p = Path(path)
+    p.parent.mkdir(parents=True, exist_ok=True)
+    tmp = p.with_name(p.name + ".tmp")
+    tmp.write_text(render(), encoding="utf-8")
+    os.replace(tmp, p)
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        body = render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass  # keep scheduler output clean
+
+def serve(port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """Serve /metrics from a daemon thread; returns the server (call .shutdown() to stop)."""
+    srv = ThreadingHTTPServer((host, port), _Handler)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    return srv
@@ -1,15 +1,40 @@
 from pathlib import Path
 from .util import resolve_binary, run_cmd
+from .resolve import iter_records
+from . import governor
 
 WEB_PORTS = {80,81,88,443,444,591,593,832,981,1010,1311,2082,2083,2086,2087,2095,2096,2480,3000,3001,3002,3003,3128,3333,4000,4001,4100,4443,4567,4711,4712,4993,5000,5104,5108,5800,6543,7000,7001,7396,7474,8000,8001,8008,8014,8042,8069,8080,8081,8082,8083,8088,8090,8091,8096,8100,8181,8222,8243,8280,8281,8333,8443,8500,8834,8880,8888,8983,9000,9043,9060,9080,9090,9091,9200,9443,9800,9981,10000}
 
+def build_ip_targets(records_file: str, out_ips_file: str, only_hosts: set | None = None) -> dict:
+    """
+    Collapse resolved hosts onto their A records so each IP is scanned once.
+    Writes the unique IPs to out_ips_file and returns {ip: [hosts]} for
+    fanning open ports back out to hostnames. only_hosts restricts the map
+    (e.g. to names that survived wildcard pruning).
+    """
+    hosts_by_ip: dict = {}
+    for rec in iter_records(records_file):
+        if only_hosts is not None and rec["host"] not in only_hosts:
+            continue
+        for ip in rec.get("a") or []:
+            hosts_by_ip.setdefault(ip, []).append(rec["host"])
+    ips = sorted(hosts_by_ip)
+    Path(out_ips_file).write_text("\n".join(ips) + ("\n" if ips else ""))
+    return hosts_by_ip
+
 def run_naabu(hosts_file: str, out_ports_file: str, top_ports: int = 1000, rate: int = 2000):
     naabu = resolve_binary("naabu", candidates=["/opt/homebrew/bin/naabu","/usr/local/bin/naabu"])
     cmd = [naabu, "-list", hosts_file, "-top-ports", str(top_ports), "-rate", str(rate), "-silent"]
-    out = run_cmd(cmd, check=False)
+    with governor.acquire("naabu"):   # packets/s, not HTTP requests: a slot but no share of the rate budget
+        out = run_cmd(cmd, check=False)
     Path(out_ports_file).write_text(out.stdout)
 
-def synth_http_urls(ports_file: str, out_urls_file: str):
+def synth_http_urls(ports_file: str, out_urls_file: str, hosts_by_ip: dict | None = None):
+    """
+    Turn naabu `host:port` lines into http(s) URLs for web ports.
+    When hosts_by_ip is given (IP-level scan), each open port is fanned back
+    out to every hostname on that IP so virtual hosts are still probed by name.
+    """
     urls = []
     p = Path(ports_file)
     if not p.exists():
@@ -19,12 +44,14 @@ def synth_http_urls(ports_file: str, out_urls_file: str):
         line = line.strip()
         if not line or ":" not in line:
             continue
-        host, port = line.split(":", 1)
+        host, port = line.rsplit(":", 1)
         try:
             port_i = int(port)
         except ValueError:
             continue
         if port_i in WEB_PORTS:
             scheme = "https" if port_i in {443, 8443, 9443} else "http"
-            urls.append(f"{scheme}://{host}:{port_i}")
+            names = (hosts_by_ip or {}).get(host) or [host]
+            for name in names:
+                urls.append(f"{scheme}://{name}:{port_i}")
     Path(out_urls_file).write_text("\n".join(sorted(set(urls))) + ("\n" if urls else ""))
@@ -1,19 +1,21 @@
 # src/pipeline/probe.py
 import json
-import subprocess
+import time
 from pathlib import Path
-from .util import resolve_binary, httpx_help, flag_supported
+from urllib.parse import urlparse
+from .util import resolve_binary, httpx_help, flag_supported, stream_cmd
+from .resolve import load_host_ips
+from . import cache, governor, stagecache
 
-def run_httpx(
+def _build_httpx_cmd(
     in_file: str,
-    out_json_file: str,
-    out_urls_file: str,
-    threads: int = 50,
-    rate: int = 100,
-    timeout: int = 7,
-    retries: int = 2,
-    follow_redirects: bool = True,
-):
+    threads: int,
+    rate: int,
+    timeout: int,
+    retries: int,
+    follow_redirects: bool,
+) -> tuple[list[str], bool]:
+    """Return (cmd, json_mode) for the installed httpx."""
     httpx_bin = resolve_binary(
         "httpx",
         must_contain="projectdiscovery",
@@ -38,14 +40,11 @@ def run_httpx(
     silent_flag = flag_supported(helptext, "-silent")
     nocolor_flag = flag_supported(helptext, "-no-color")
     follow_flag = flag_supported(helptext, "-follow-redirects")
-
-    out_json = Path(out_json_file)
-    out_urls = Path(out_urls_file)
-    out_json.parent.mkdir(parents=True, exist_ok=True)
+    hash_flag = flag_supported(helptext, "-hash")   # body_sha256 lets screenshots skip unchanged pages
 
     cmd = [
         httpx_bin,
-        in_flag, in_file,
+        in_flag, str(in_file),
         status_flag,
         title_flag,
         tech_flag,
@@ -56,52 +55,44 @@ def run_httpx(
     ]
     if json_mode:
         cmd.append(json_flag)
+        if hash_flag:
+            cmd += [hash_flag, "sha256"]
     if silent_flag:
         cmd.append(silent_flag)
     if nocolor_flag:
         cmd.append(nocolor_flag)
     if follow_redirects and follow_flag:
         cmd.append(follow_flag)
+    return cmd, json_mode
 
-    proc = subprocess.run(cmd, capture_output=True, text=True, check=False)
+def _stream_httpx(cmd: list[str], json_mode: bool, out_json: Path, out_urls: Path,
+                  seen_urls: set[str], mode: str = "w") -> tuple[int, int, str]:
+    """
+    Stream httpx stdout straight to disk: rows are written as they arrive, so a
+    crash or non-zero exit keeps everything probed so far, and the only thing
+    held in memory is the set of URLs already written.
+    Returns (returncode, rows_written, stderr_tail).
+    """
+    rows = 0
 
-    if proc.returncode != 0:
-        # Don’t crash the pipeline; record the stderr so you can see what happened.
-        out_json.write_text("")
-        out_urls.write_text("")
-        err = (proc.stderr or "").strip()
-        if err:
-            print(f"[warn] httpx exited {proc.returncode}:\n{err}")
-        else:
-            print(f"[warn] httpx exited {proc.returncode} with no stderr.")
-        return str(out_json), str(out_urls)
-
-    urls = []
+    with out_json.open(mode, encoding="utf-8") as jf, out_urls.open(mode, encoding="utf-8") as uf:
 
-    if json_mode:
-        # Write raw JSONL and extract URLs
-        with out_json.open("w", encoding="utf-8") as jf:
-            for line in proc.stdout.splitlines():
-                s = line.strip()
-                if not s:
-                    continue
+        def on_line(line: str):
+            nonlocal rows
+            s = line.strip()
+            if not s:
+                return
+            url = ""
+            if json_mode:
                 jf.write(s + "\n")
                 try:
-                    obj = json.loads(s)
-                    u = obj.get("url")
-                    if u:
-                        urls.append(u)
-                except json.JSONDecodeError:
-                    pass
-    else:
-        # No JSON support: parse plain lines; last token is usually the URL
-        lines = [ln.strip() for ln in proc.stdout.splitlines() if ln.strip()]
-        # Create a minimal JSONL ourselves so downstream code keeps working
-        with out_json.open("w", encoding="utf-8") as jf:
-            for ln in lines:
-                parts = ln.split()
-                url = ""
-                # find first token that looks like a URL
+                    url = json.loads(s).get("url") or ""
+                except (json.JSONDecodeError, AttributeError):
+                    return
+            else:
+                # No JSON support: last URL-looking token is usually the URL.
+                # Emit a minimal JSONL row ourselves so downstream code keeps working.
+                parts = s.split()
                 for p in parts[::-1]:
                     if p.startswith("http://") or p.startswith("https://"):
                         url = p
@@ -109,8 +100,169 @@ def run_httpx(
                 if not url and parts:
                     url = parts[-1]
                 if url:
-                    urls.append(url)
-                    jf.write(json.dumps({"url": url, "raw": ln}) + "\n")
+                    jf.write(json.dumps({"url": url, "raw": s}) + "\n")
+            rows += 1
+            if url and url not in seen_urls:
+                seen_urls.add(url)
+                uf.write(url + "\n")
+
+        rc, err = stream_cmd(cmd, on_line)
+    return rc, rows, err
+
+def _fail(rc: int, rows: int, err: str):
+    # Partial results are already on disk; surface stderr and let the caller
+    # decide (the CLI logs it, keeps going, and leaves the stage resumable).
+    err = (err or "").strip()
+    if err:
+        print(err)
+    raise RuntimeError(f"httpx exited {rc} after {rows} row(s); partial results kept")
+
+def run_httpx(
+    in_file: str,
+    out_json_file: str,
+    out_urls_file: str,
+    threads: int = 50,
+    rate: int = 100,
+    timeout: int = 7,
+    retries: int = 2,
+    follow_redirects: bool = True,
+) -> dict:
+    """
+    Probe in_file with httpx. Returns {"json", "urls", "rate", "threads"}:
+    the output paths and the rate/threads httpx actually ran with (the
+    governor may grant less than `rate`; rate is None for a stage cache hit).
+    """
+    cmd, json_mode = _build_httpx_cmd(in_file, threads, rate, timeout, retries, follow_redirects)
+
+    out_json = Path(out_json_file)
+    out_urls = Path(out_urls_file)
+    out_json.parent.mkdir(parents=True, exist_ok=True)
+
+    flags = [c for c in cmd[1:] if c != str(in_file)]
+    key = stagecache.cache_key("httpx", [in_file], cmd[0], flags) if stagecache.ENABLED else None
+    used = {"json": str(out_json), "urls": str(out_urls), "rate": None, "threads": threads}
+    if key and stagecache.fetch("httpx", key, [out_json, out_urls]):
+        return used
+
+    with governor.acquire("httpx", rate) as granted:
+        if granted != rate:
+            cmd, json_mode = _build_httpx_cmd(in_file, threads, granted, timeout, retries, follow_redirects)
+        rc, rows, err = _stream_httpx(cmd, json_mode, out_json, out_urls, set())
+    used["rate"] = granted
+    if rc != 0:
+        _fail(rc, rows, err)
+    if key:
+        stagecache.store("httpx", key, [out_json, out_urls])
+
+    return used
+
+def _row_host(obj: dict) -> str:
+    """Host an httpx row was probed for (its 'input', falling back to the URL host)."""
+    inp = (obj.get("input") or "").strip()
+    if "://" in inp:
+        return urlparse(inp).hostname or ""
+    if inp:
+        return inp.split(":")[0]
+    return urlparse(obj.get("url") or "").hostname or ""
+
+def _line_host(line: str) -> str:
+    """Host name of an httpx input line (bare host, host:port or URL)."""
+    if "://" in line:
+        return urlparse(line).hostname or ""
+    return line.split(":")[0]
+
+def run_httpx_cached(
+    in_file: str,
+    out_json_file: str,
+    out_urls_file: str,
+    records_file: str,
+    ttl_minutes: int = 60,
+    threads: int = 50,
+    rate: int = 100,
+    timeout: int = 7,
+    retries: int = 2,
+    follow_redirects: bool = True,
+) -> dict:
+    """
+    Like run_httpx, but reuse the previous httpx result for hosts whose DNS
+    answers (from run_dnsx's records_file) are unchanged and whose cache entry
+    is younger than ttl_minutes. Only the remaining hosts are probed.
+    Returns per-run stats: hosts, hits, probed, hit_rate, plus the rate and
+    threads httpx ran with (rate None when every host came from the cache).
+    """
+    out_json = Path(out_json_file)
+    out_urls = Path(out_urls_file)
+    out_json.parent.mkdir(parents=True, exist_ok=True)
+
+    cache.init_db()
+    ips_by_host = load_host_ips(records_file)
+    hosts = []
+    with open(in_file, "r", encoding="utf-8", errors="ignore") as f:
+        for line in f:
+            h = line.strip()
+            if h:
+                hosts.append(h)
+    # keyed by the input line as given (a bare host or, from naabu, scheme://host:port),
+    # with the DNS answers of its host name
+    current = {h: cache.ip_key(ips_by_host.get(_line_host(h), [])) for h in hosts}
+
+    now = int(time.time())
+    hits = cache.probe_cache_lookup(current, ttl_minutes * 60, now)
+    misses = [h for h in hosts if h not in hits]
+
+    # Cached rows go first; fresh probes are appended after them.
+    seen_urls: set[str] = set()
+    with out_json.open("w", encoding="utf-8") as jf, out_urls.open("w", encoding="utf-8") as uf:
+        for h in hosts:
+            for row in hits.get(h, ()):
+                try:
+                    url = json.loads(row).get("url") or ""
+                except Exception:
+                    url = ""
+                if url in seen_urls:
+                    continue   # another input line already replayed this URL
+                jf.write(row + "\n")
+                if url:
+                    seen_urls.add(url)
+                    uf.write(url + "\n")
+        offset = jf.tell()
+
+    granted = None
+    if misses:
+        work = out_json.parent / "httpx_input.txt"
+        work.write_text("\n".join(misses) + "\n", encoding="utf-8")
+        with governor.acquire("httpx", rate) as granted:
+            cmd, json_mode = _build_httpx_cmd(str(work), threads, granted, timeout, retries, follow_redirects)
+            rc, rows, err = _stream_httpx(cmd, json_mode, out_json, out_urls, seen_urls, mode="a")
+        if rc != 0:
+            _fail(rc, rows, err)
+        else:
+            probed = {h: current[h] for h in misses}
+
+            def fresh_rows():
+                with out_json.open("r", encoding="utf-8", errors="ignore") as f:
+                    f.seek(offset)
+                    for line in f:
+                        s = line.strip()
+                        try:
+                            obj = json.loads(s)
+                        except Exception:
+                            continue
+                        # store under the input line that produced the row, as it is looked up
+                        owner = (obj.get("input") or "").strip()
+                        if owner not in probed:
+                            owner = _row_host(obj)
+                        if owner in probed:
+                            yield owner, obj.get("url") or s, s
+
+            cache.probe_cache_store(probed, fresh_rows(), now)
 
-    out_urls.write_text("\n".join(sorted(set(urls))) + ("\n" if urls else ""))
-    return str(out_json), str(out_urls)
+    stats = {
+        "hosts": len(hosts),
+        "hits": len(hits),
+        "probed": len(misses),
+        "hit_rate": round(len(hits) / len(hosts), 4) if hosts else 0.0,
+        "rate": granted,
+        "threads": threads,
+    }
+    return stats
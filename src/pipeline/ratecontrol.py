@@ -0,0 +1,154 @@
+# src/pipeline/ratecontrol.py
+from __future__ import annotations
+import json, re, time
+from pathlib import Path
+from typing import Dict, Optional, Set, Tuple
+from urllib.parse import urlsplit
+
+from . import cache
+
+# Adaptive per-target rates for httpx and nuclei (AIMD, as TCP does it).
+# After every run the controller looks at how many requests timed out and
+# how fast results came back, and picks the next run's rate and worker count:
+#   timeout ratio above the threshold  -> halve both (multiplicative decrease)
+#   last increase bought no throughput -> hold (the target is the bottleneck)
+#   otherwise                          -> step both up (additive increase)
+# always within the configured bounds. State lives in cache.sqlite, per
+# target and tool, so fragile targets stay slow and fast ones keep climbing.
+#
+# Timeout signals:
+#   httpx  - hosts that answered in this target's previous run, were probed
+#            again, and returned nothing this time
+#   nuclei - hosts with timeout errors in nuclei's error log (-elog)
+
+DEFAULT_BOUNDS: Dict[str, Dict[str, Tuple[int, int]]] = {
+    "httpx": {"rate": (10, 500), "workers": (5, 200)},
+    "nuclei": {"rate": (20, 1000), "workers": (5, 300)},
+}
+DECREASE = 0.5
+STEP = 0.05            # additive step, as a share of the bounds' span
+MIN_GAIN = 1.05        # an increase must raise throughput by this factor to continue
+HISTORY = 20
+TIMEOUT_RE = re.compile(r"timeout|timed out|deadline exceeded", re.I)
+
+def load_bounds(path: str | None = None) -> Dict[str, Dict[str, Tuple[int, int]]]:
+    """DEFAULT_BOUNDS, overridden by a JSON {"httpx": {"rate": [lo, hi], "workers": [lo, hi]}, ...} file."""
+    bounds = {tool: dict(b) for tool, b in DEFAULT_BOUNDS.items()}
+    if path:
+        for tool, b in json.loads(Path(path).read_text(encoding="utf-8")).items():
+            for k, v in b.items():
+                bounds.setdefault(tool, {})[k] = (int(v[0]), int(v[1]))
+    return bounds
+
+def _clamp(v: float, lo_hi: Tuple[int, int]) -> int:
+    return int(min(max(round(v), lo_hi[0]), lo_hi[1]))
+
+def recommend(target: str, tool: str, rate: int, workers: int,
+              bounds: Optional[dict] = None) -> Tuple[int, int, bool]:
+    """
+    (rate, workers, from_state) for the next run of tool against target: the
+    persisted values, or the given defaults (clamped) on a target's first run.
+    """
+    b = (bounds or DEFAULT_BOUNDS)[tool]
+    cache.init_db()
+    st = cache.rate_state_get(target, tool)
+    if st:
+        return _clamp(st["rate"], b["rate"]), _clamp(st["workers"], b["workers"]), True
+    return _clamp(rate, b["rate"]), _clamp(workers, b["workers"]), False
+
+def _next(rate: int, workers: int, ratio: float, throughput: float, last: Optional[dict],
+          max_ratio: float, b: dict) -> Tuple[int, int, str]:
+    if ratio > max_ratio:
+        return _clamp(rate * DECREASE, b["rate"]), _clamp(workers * DECREASE, b["workers"]), "decrease"
+    if last and last.get("action") == "increase" and throughput < last.get("throughput", 0) * MIN_GAIN:
+        return rate, workers, "hold"
+    step_r = max(1, (b["rate"][1] - b["rate"][0]) * STEP)
+    step_w = max(1, (b["workers"][1] - b["workers"][0]) * STEP)
+    return _clamp(rate + step_r, b["rate"]), _clamp(workers + step_w, b["workers"]), "increase"
+
+def observe(target: str, tool: str, rate: int, workers: int, sent: int, timeouts: int,
+            results: int, seconds: float, max_ratio: float = 0.05,
+            bounds: Optional[dict] = None, output: str = "") -> dict:
+    """
+    Record one run (sent = requests/hosts the timeout ratio is measured over,
+    results = items produced in `seconds`) and persist the next run's rate
+    and workers. Returns the observation, including next_rate/next_workers.
+    """
+    b = (bounds or DEFAULT_BOUNDS)[tool]
+    cache.init_db()
+    st = cache.rate_state_get(target, tool)
+    history = st["history"] if st else []
+    last = history[-1] if history else None
+    ratio = timeouts / sent if sent else 0.0
+    throughput = results / seconds if seconds > 0 else 0.0
+    nrate, nworkers, action = _next(rate, workers, ratio, throughput, last, max_ratio, b)
+    obs = {
+        "at": int(time.time()), "rate": rate, "workers": workers, "sent": sent,
+        "timeouts": timeouts, "timeout_ratio": round(ratio, 4),
+        "throughput": round(throughput, 2), "action": action,
+        "next_rate": nrate, "next_workers": nworkers, "output": output,
+    }
+    history = (history + [obs])[-HISTORY:]
+    cache.rate_state_put(target, tool, nrate, nworkers, history, obs["at"])
+    return obs
+
+def last_output(target: str, tool: str) -> str:
+    """Output file of the previous observed run, if recorded."""
+    cache.init_db()
+    st = cache.rate_state_get(target, tool)
+    return (st["history"][-1].get("output", "") if st and st["history"] else "")
+
+# ---------- signals ----------
+
+def _host(s: str) -> str:
+    s = s.strip()
+    if "://" in s:
+        return (urlsplit(s).hostname or "").lower()
+    return s.split("/", 1)[0].rsplit(":", 1)[0].lower()
+
+def _answered(http_jsonl: Path) -> Set[str]:
+    out: Set[str] = set()
+    if not http_jsonl.exists():
+        return out
+    with http_jsonl.open("r", encoding="utf-8", errors="ignore") as f:
+        for line in f:
+            try:
+                obj = json.loads(line)
+            except (json.JSONDecodeError, ValueError):
+                continue
+            h = _host(obj.get("input") or obj.get("url") or "")
+            if h:
+                out.add(h)
+    return out
+
+def httpx_signal(probe_in: str | Path, http_jsonl: str | Path, prev_http_jsonl: str = "") -> Tuple[int, int, int]:
+    """
+    (sent, timeouts, results): of the hosts probed now that answered in the
+    previous run, how many stayed silent; results = rows written this run.
+    """
+    now = _answered(Path(http_jsonl))
+    prev = _answered(Path(prev_http_jsonl)) if prev_http_jsonl else set()
+    with Path(probe_in).open("r", encoding="utf-8", errors="ignore") as f:
+        probed = {_host(l) for l in f if l.strip()}
+    rows = sum(1 for _ in Path(http_jsonl).open("rb")) if Path(http_jsonl).exists() else 0
+    known = prev & probed
+    return len(known), len(known - now), rows
+
+def nuclei_signal(urls_file: str | Path, error_log: str | Path) -> Tuple[int, int]:
+    """(hosts scanned, hosts with timeout errors in nuclei's -elog JSONL)."""
+    with Path(urls_file).open("r", encoding="utf-8", errors="ignore") as f:
+        hosts = {_host(l) for l in f if l.strip()}
+    timed_out: Set[str] = set()
+    p = Path(error_log)
+    if p.exists():
+        with p.open("r", encoding="utf-8", errors="ignore") as f:
+            for line in f:
+                try:
+                    obj = json.loads(line)
+                except (json.JSONDecodeError, ValueError):
+                    continue
+                if TIMEOUT_RE.search(str(obj.get("error", ""))):
+                    h = _host(str(obj.get("input") or obj.get("address") or ""))
+                    if h in hosts:
+                        timed_out.add(h)
+    return len(hosts), len(timed_out)
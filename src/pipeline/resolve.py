@@ -1,28 +1,239 @@
-import subprocess
+import json
+import time
+import secrets
 import pathlib
+from .util import resolve_binary, stream_cmd
+from . import cache, stagecache
 
-def run_dnsx(in_file: str, out_file: str):
+RECORD_TYPES = {"A", "AAAA", "CNAME"}
+
+def _parse_dnsx_line(line: str):
+    """
+    Parse one `dnsx -resp` line into (host, values).
+    Handles both `sub.example.com [A] [1.2.3.4]` and the older `sub.example.com [1.2.3.4]`.
+    """
+    parts = line.strip().split()
+    if not parts:
+        return "", []
+    values = []
+    for p in parts[1:]:
+        v = p.strip("[]")
+        if v and v.upper() not in RECORD_TYPES:
+            values.append(v)
+    return parts[0], values
+
+def load_host_ips(records_file: str) -> dict:
+    """Read a records JSONL written by run_dnsx into {host: [ips]}."""
+    out = {}
+    for rec in iter_records(records_file):
+        out[rec["host"]] = list(rec.get("a") or [])
+    return out
+
+def iter_records(records_file: str):
+    """Yield {"host", "a", "aaaa", "cname"} dicts from a records JSONL written by run_dnsx."""
+    p = pathlib.Path(records_file)
+    if not p.exists():
+        return
+    with p.open("r", encoding="utf-8", errors="ignore") as f:
+        for line in f:
+            try:
+                rec = json.loads(line)
+            except Exception:
+                continue
+            if rec.get("host"):
+                yield rec
+
+def _merge_dnsx_line(answers: dict, line: str):
+    s = line.strip()
+    if not s:
+        return
+    try:
+        obj = json.loads(s)
+        host = obj.get("host") or ""
+        rec = {k: list(obj.get(k) or []) for k in ("a", "aaaa", "cname")}
+        rec["ttl"] = int(obj.get("ttl") or 0)
+    except (json.JSONDecodeError, AttributeError, TypeError, ValueError):
+        # Plain-text output from dnsx builds without -json
+        host, values = _parse_dnsx_line(s)
+        rec = {"a": values, "aaaa": [], "cname": [], "ttl": 0}
+    if not host:
+        return
+    have = answers.setdefault(host, {"a": [], "aaaa": [], "cname": [], "ttl": rec["ttl"]})
+    for k in ("a", "aaaa", "cname"):
+        have[k].extend(v for v in rec[k] if v not in have[k])
+    if rec["ttl"]:
+        have["ttl"] = min(have["ttl"] or rec["ttl"], rec["ttl"])
+
+def dnsx_query(names: list[str], work_file: str, cacheable: bool = True) -> dict:
+    """
+    Resolve names with dnsx (A/AAAA/CNAME) and return
+    {host: {"a": [...], "aaaa": [...], "cname": [...], "ttl": int}} for every
+    name that answered. Names missing from the result did not resolve.
+    The raw dnsx output is kept next to work_file and, when cacheable, shared
+    through the stage cache so an identical name list isn't re-resolved.
+    """
+    if not names:
+        return {}
+    work = pathlib.Path(work_file)
+    work.parent.mkdir(parents=True, exist_ok=True)
+    work.write_text("\n".join(names) + "\n", encoding="utf-8")
+    raw = work.with_suffix(".out.jsonl")
+
+    dnsx = resolve_binary("dnsx", candidates=["/opt/homebrew/bin/dnsx", "/usr/local/bin/dnsx"])
+    flags = ["-a", "-aaaa", "-cname", "-resp", "-json", "-silent"]
+    cmd = [dnsx, "-l", str(work), *flags]
+
+    answers: dict = {}
+    key = stagecache.cache_key("dnsx", [work], dnsx, flags) if cacheable and stagecache.ENABLED else None
+    if key and stagecache.fetch("dnsx", key, [raw]):
+        with raw.open("r", encoding="utf-8", errors="ignore") as f:
+            for line in f:
+                _merge_dnsx_line(answers, line)
+        return answers
+
+    with raw.open("w", encoding="utf-8") as rf:
+
+        def on_line(line: str):
+            rf.write(line + "\n")
+            _merge_dnsx_line(answers, line)
+
+        rc, err = stream_cmd(cmd, on_line)
+    if rc != 0:
+        raise RuntimeError(f"dnsx exited {rc}: {err.strip()}")
+    if key:
+        stagecache.store("dnsx", key, [raw])
+    return answers
+
+def run_dnsx(
+    in_file: str,
+    out_file: str,
+    records_file: str | None = None,
+    use_cache: bool = False,
+    min_ttl: int = 3600,
+    max_ttl: int = 86400,
+    negative_ttl: int = 3600,
+):
     """
     Run dnsx to resolve subs from in_file.
-    We keep ONLY the domain/host (first token), one per line, for httpx.
+    Writes the hosts with an A/AAAA answer, one per line, to out_file for httpx.
+    If records_file is given, the A/AAAA/CNAME answers of every name that
+    answered are kept there as JSONL ({"host": ..., "a": [...], "aaaa": [...],
+    "cname": [...]}) for later stages; CNAME-only names (dangling or not yet
+    resolved targets) appear only there, for the takeover checks.
+
+    With use_cache, answers are persisted in data/cache.sqlite with their
+    record TTL (clamped to [min_ttl, max_ttl]); names that did not resolve are
+    cached negatively for negative_ttl. Only new or expired names go to dnsx.
     """
     out_path = pathlib.Path(out_file)
     out_path.parent.mkdir(parents=True, exist_ok=True)
 
-    # dnsx prints lines like: sub.example.com A 1.2.3.4
-    # We'll capture stdout and keep just the first column.
-    proc = subprocess.run(
-        ["dnsx", "-a", "-resp", "-l", in_file, "-silent"],
-        capture_output=True,
-        text=True,
-        check=True,
-    )
-    hosts = []
-    for line in proc.stdout.splitlines():
-        # keep the first whitespace-separated token (the hostname)
-        host = line.strip().split()[0] if line.strip() else ""
-        if host:
-            hosts.append(host)
-
-    out_path.write_text("\n".join(sorted(set(hosts))) + ("\n" if hosts else ""))
+    names = []
+    seen = set()
+    with open(in_file, "r", encoding="utf-8", errors="ignore") as f:
+        for line in f:
+            n = line.strip().lower()
+            if n and n not in seen:
+                seen.add(n)
+                names.append(n)
+
+    now = int(time.time())
+    answers: dict = {}
+    pending = names
+    if use_cache:
+        cache.init_db()
+        answers, negative = cache.dns_cache_lookup(names, now)
+        pending = [n for n in names if n not in answers and n not in negative]
+
+    fresh = dnsx_query(pending, str(out_path.parent / "dnsx_input.txt"))
+    answers.update(fresh)
+
+    if use_cache:
+        cache.dns_cache_store(pending, fresh, now, min_ttl=min_ttl, max_ttl=max_ttl,
+                              negative_ttl=negative_ttl)
+        print(f"[i] dns cache: {len(names) - len(pending)}/{len(names)} names served from cache, "
+              f"{len(pending)} sent to dnsx")
+
+    hosts = sorted(h for h in answers if h in seen)
+    live = [h for h in hosts if answers[h]["a"] or answers[h]["aaaa"]]
+    out_path.write_text("\n".join(live) + ("\n" if live else ""))
+    if records_file:
+        with pathlib.Path(records_file).open("w", encoding="utf-8") as f:
+            for host in hosts:
+                rec = answers[host]
+                f.write(json.dumps({"host": host, "a": rec["a"], "aaaa": rec["aaaa"],
+                                    "cname": rec["cname"]}) + "\n")
     return str(out_path)
+
+def _answer_set(rec: dict) -> set:
+    """Addresses a name resolves to; CNAME targets only when there are no addresses."""
+    addrs = set(rec.get("a") or []) | set(rec.get("aaaa") or [])
+    return addrs or {c.lower().rstrip(".") for c in rec.get("cname") or []}
+
+def detect_wildcards(records: dict, work_file: str, probes: int = 2, min_children: int = 3) -> dict:
+    """
+    For every parent zone with at least min_children resolved names, resolve
+    `probes` random labels under it. Returns {zone: set(answers)} for zones
+    where the random labels resolved, i.e. zones with wildcard DNS.
+    """
+    children: dict = {}
+    for host in records:
+        if host.count(".") >= 2:
+            zone = host.split(".", 1)[1]
+            children[zone] = children.get(zone, 0) + 1
+    zones = sorted(z for z, n in children.items() if n >= min_children)
+
+    probe_names = {}
+    for zone in zones:
+        for _ in range(probes):
+            probe_names[f"{secrets.token_hex(6)}.{zone}"] = zone
+
+    wildcards: dict = {}
+    for name, rec in dnsx_query(list(probe_names), work_file, cacheable=False).items():
+        zone = probe_names.get(name)
+        if zone:
+            wildcards.setdefault(zone, set()).update(_answer_set(rec))
+    return wildcards
+
+def prune_wildcards(
+    live_file: str,
+    records_file: str,
+    out_live_file: str,
+    report_file: str | None = None,
+    probes: int = 2,
+    min_children: int = 3,
+) -> dict:
+    """
+    Collapse names that only resolve to their zone's wildcard answers.
+    One representative per wildcard zone is kept so the catch-all is still
+    probed once. Writes the surviving hosts to out_live_file and, optionally,
+    the wildcard answer sets and pruned counts to report_file (JSON).
+    Returns {"zones": n, "kept": n, "pruned": n}.
+    """
+    records = {rec["host"]: rec for rec in iter_records(records_file)}
+    out_path = pathlib.Path(out_live_file)
+    wildcards = detect_wildcards(records, str(out_path.parent / "wildcard_probe.txt"),
+                                 probes=probes, min_children=min_children)
+
+    kept, pruned_by_zone = [], {}
+    represented = set()
+    with open(live_file, "r", encoding="utf-8", errors="ignore") as f:
+        hosts = [line.strip() for line in f if line.strip()]
+    for host in hosts:
+        zone = host.split(".", 1)[1] if "." in host else ""
+        wild = wildcards.get(zone)
+        rec = records.get(host)
+        if wild and rec and _answer_set(rec) <= wild:
+            if zone in represented:
+                pruned_by_zone[zone] = pruned_by_zone.get(zone, 0) + 1
+                continue
+            represented.add(zone)
+        kept.append(host)
+
+    out_path.write_text("\n".join(kept) + ("\n" if kept else ""))
+    if report_file:
+        pathlib.Path(report_file).write_text(json.dumps({
+            zone: {"answers": sorted(ans), "pruned": pruned_by_zone.get(zone, 0)}
+            for zone, ans in sorted(wildcards.items())
+        }, indent=2))
+    return {"zones": len(wildcards), "kept": len(kept), "pruned": sum(pruned_by_zone.values())}
@@ -1,13 +1,16 @@
 import subprocess
 from pathlib import Path
 from .util import resolve_nuclei
+from . import governor
 
 def run_nuclei(
     in_urls_file: str,
     out_jsonl_file: str,
     templates: str | None = None,     # path to templates dir or a glob
     tags: str | None = None,          # comma-separated template tags
+    exclude_tags: str | None = None,  # comma-separated tags to skip (-etags)
     severity: str | None = None,      # e.g. "critical,high" (no spaces)
+    error_log: str | None = None,     # JSONL of failed requests (-elog)
     concurrency: int = 50,            # -c
     rate_limit: int = 200,            # -rl (requests/sec)
     timeout: int = 7,
@@ -16,6 +19,8 @@ def run_nuclei(
     """
     Run nuclei on URLs list and export JSONL to out_jsonl_file.
     Compatible with nuclei versions that support -jsonl-export.
+    Returns {"output", "rate", "concurrency"}, rate being the one nuclei ran
+    with (the governor may grant less than rate_limit).
     """
     nuclei_bin = resolve_nuclei(candidates=["/opt/homebrew/bin/nuclei", "/usr/local/bin/nuclei"])
     out_path = Path(out_jsonl_file)
@@ -35,11 +40,20 @@ def run_nuclei(
         cmd += ["-t", templates]
     if tags:
         cmd += ["-tags", tags]
+    if exclude_tags:
+        cmd += ["-etags", exclude_tags]
     if severity:
         cmd += ["-severity", severity]
+    if error_log:
+        cmd += ["-elog", error_log]
 
-    subprocess.run(cmd, check=False)
+    with governor.acquire("nuclei", rate_limit) as granted:
+        if granted != rate_limit:
+            cmd[cmd.index("-rl") + 1] = str(granted)
+        proc = subprocess.run(cmd, check=False)
 
     if not out_path.exists():
         out_path.write_text("")  # ensure file exists even if zero findings
-    return str(out_path)
+    if proc.returncode != 0:
+        raise RuntimeError(f"nuclei exited {proc.returncode}; partial findings kept in {out_path}")
+    return {"output": str(out_path), "rate": granted, "concurrency": concurrency}
@@ -1,8 +1,169 @@
+import hashlib
+import json
+import re
+import shutil
+import time
 from pathlib import Path
 from .util import resolve_binary, run_cmd
+from . import cache, governor
+
+try:  # optional: perceptual grouping and thumbnails
+    from PIL import Image
+except ImportError:
+    Image = None
+
+# Screenshots are kept in one content-addressed store shared by every run.
+# A URL is only captured again when its httpx page key (body hash) changed,
+# and visually identical captures (same perceptual hash: default pages,
+# parked domains, login walls) are stored once. Each run gets a
+# screenshots.jsonl mapping its URLs to images in the store.
+STORE_DIR = Path("data") / "screens"
+THUMB_WIDTH = 320
+IMAGE_EXTS = (".png", ".jpg", ".jpeg")
 
 def run_gowitness(urls_file: str, out_dir: str):
     gow = resolve_binary("gowitness", candidates=["/opt/homebrew/bin/gowitness","/usr/local/bin/gowitness"])
     Path(out_dir).mkdir(parents=True, exist_ok=True)
     cmd = [gow, "file", "-f", urls_file, "--destination", out_dir]
-    run_cmd(cmd, check=False)
+    with governor.acquire("gowitness"):
+        run_cmd(cmd, check=False)
+
+def page_key(row: dict) -> str:
+    """httpx body hash, or status/length/title when httpx ran without -hash."""
+    h = (row.get("hash") or {}).get("body_sha256")
+    if h:
+        return h
+    status = row.get("status_code", row.get("status-code", ""))
+    return f"{status}:{row.get('content_length', '')}:{row.get('title', '')}"
+
+def dhash(path: Path, size: int = 16) -> str | None:
+    """
+    size*size-bit difference hash as hex (256 bits / 64 chars by default);
+    None without Pillow or for unreadable files. Images are grouped on exact
+    matches, and 8x8 was too coarse for that: distinct pages with the same
+    layout (login forms, error pages) collided.
+    """
+    if Image is None:
+        return None
+    try:
+        with Image.open(path) as im:
+            g = im.convert("L").resize((size + 1, size), Image.LANCZOS)
+            px = list(g.getdata())
+    except Exception:
+        return None
+    bits = 0
+    for y in range(size):
+        row = px[y * (size + 1):(y + 1) * (size + 1)]
+        for x in range(size):
+            bits = (bits << 1) | (row[x] > row[x + 1])
+    return f"{bits:0{size * size // 4}x}"
+
+def _thumbnail(src: Path, dst: Path) -> str:
+    if Image is None:
+        return ""
+    try:
+        with Image.open(src) as im:
+            im = im.convert("RGB")
+            im.thumbnail((THUMB_WIDTH, THUMB_WIDTH * 4))
+            dst.parent.mkdir(parents=True, exist_ok=True)
+            im.save(dst, "JPEG", quality=80)
+        return str(dst)
+    except Exception:
+        return ""
+
+def _norm(s: str) -> str:
+    return re.sub(r"[^a-z0-9]", "", s.lower())
+
+def _match_files(urls: list[str], shot_dir: Path) -> dict:
+    """
+    Map gowitness output files back to URLs. Its file names are the URL with
+    punctuation replaced (some versions add the port), so compare both sides
+    with everything but [a-z0-9] stripped.
+    """
+    by_norm = {}
+    for u in urls:
+        by_norm.setdefault(_norm(u), u)
+        scheme, _, rest = u.partition("://")
+        host, _, path = rest.partition("/")
+        if ":" not in host:
+            port = "443" if scheme == "https" else "80"
+            by_norm.setdefault(_norm(f"{scheme}://{host}:{port}/{path}"), u)
+    out = {}
+    for f in shot_dir.rglob("*"):
+        if f.suffix.lower() in IMAGE_EXTS:
+            u = by_norm.get(_norm(f.stem))
+            if u and u not in out:
+                out[u] = f
+    return out
+
+def capture_incremental(http_jsonl: str, run_dir: str, store_dir: Path = STORE_DIR) -> dict:
+    """
+    Screenshot the URLs in httpx's JSONL whose page changed since their last
+    capture, fold identical-looking captures into one stored image (+ thumbnail)
+    and write <run_dir>/screenshots.jsonl: {url, image, path, thumb, reused}.
+    Returns {"urls", "reused", "captured", "missing", "new_images", "grouped"}.
+    """
+    run = Path(run_dir)
+    keys: dict = {}
+    with open(http_jsonl, "r", encoding="utf-8", errors="ignore") as f:
+        for line in f:
+            try:
+                row = json.loads(line)
+            except (json.JSONDecodeError, ValueError):
+                continue
+            url = row.get("url")
+            if url and url not in keys:
+                keys[url] = page_key(row)
+
+    cache.init_db()
+    reused = cache.screen_lookup(keys)
+    todo = [u for u in keys if u not in reused]
+
+    fresh = {}
+    new_images, captures = [], []
+    stats = {"urls": len(keys), "reused": len(reused), "captured": 0, "missing": 0,
+             "new_images": 0, "grouped": 0}
+    if todo:
+        work = run / "screens_tmp"
+        shutil.rmtree(work, ignore_errors=True)
+        work.mkdir(parents=True)
+        todo_file = run / "screens_input.txt"
+        todo_file.write_text("\n".join(todo) + "\n", encoding="utf-8")
+        run_gowitness(str(todo_file), str(work))
+        shots = _match_files(todo, work)
+        stats["captured"] = len(shots)
+        stats["missing"] = len(todo) - len(shots)
+
+        by_sha = {}
+        for url, f in shots.items():
+            sha = hashlib.sha256(f.read_bytes()).hexdigest()
+            image_id = by_sha.get(sha)
+            if image_id is None:
+                image_id = by_sha[sha] = dhash(f) or sha
+            fresh[url] = (image_id, f)
+        known = cache.screen_images(sorted({i for i, _ in fresh.values()}))
+        stored = dict(known)
+        for url, (image_id, f) in fresh.items():
+            if image_id not in stored:
+                path = store_dir / "img" / image_id[:2] / f"{image_id}{f.suffix.lower()}"
+                path.parent.mkdir(parents=True, exist_ok=True)
+                shutil.copyfile(f, path)
+                thumb = _thumbnail(path, store_dir / "thumb" / image_id[:2] / f"{image_id}.jpg")
+                stored[image_id] = (str(path), thumb)
+                new_images.append((image_id, str(path), thumb))
+            captures.append((url, keys[url], image_id))
+        stats["new_images"] = len(new_images)
+        stats["grouped"] = len(fresh) - len(new_images)
+        cache.screen_store(new_images, captures, int(time.time()))
+        shutil.rmtree(work, ignore_errors=True)
+        todo_file.unlink(missing_ok=True)
+        fresh = {u: (i, *stored[i]) for u, (i, _) in fresh.items()}
+
+    with (run / "screenshots.jsonl").open("w", encoding="utf-8") as out:
+        for url in keys:
+            hit = reused.get(url) or fresh.get(url)
+            if hit:
+                image, path, thumb = hit
+                out.write(json.dumps({"url": url, "image": image, "path": path, "thumb": thumb,
+                                      "reused": url in reused}) + "\n")
+    return stats
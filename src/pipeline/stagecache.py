@@ -0,0 +1,159 @@
+# src/pipeline/stagecache.py
+from __future__ import annotations
+import hashlib, json, os, re, shutil, subprocess, time
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from .cache import connect
+from .manifest import file_digest
+
+# Content-addressed cache of external-tool outputs, shared across runs.
+# Key = hash(input file contents, tool version, effective flags). Output files
+# are stored once under OBJECTS_DIR by content hash; the index lives in
+# data/cache.sqlite and is evicted least-recently-used past MAX_BYTES.
+OBJECTS_DIR = Path("data") / "stage_cache"
+
+# Seconds a cached output stays valid, per stage.
+DEFAULT_TTLS = {"dnsx": 3600, "httpx": 1800}
+
+ENABLED = True
+MAX_BYTES = 1024 * 1024 * 1024
+
+# Per-process hit/miss counters, reported at the end of a CLI run.
+STATS: Dict[str, Dict[str, int]] = {}
+
+def configure(enabled: bool = True, max_mb: int = 1024, ttls: Optional[Dict[str, int]] = None):
+    global ENABLED, MAX_BYTES
+    ENABLED = enabled
+    MAX_BYTES = max_mb * 1024 * 1024
+    if ttls:
+        DEFAULT_TTLS.update(ttls)
+
+def _init():
+    with connect() as c:
+        c.execute("""CREATE TABLE IF NOT EXISTS stage_cache (
+            key TEXT PRIMARY KEY,
+            stage TEXT NOT NULL,
+            outputs TEXT NOT NULL,        -- JSON [blob sha256 per output, in order]
+            size INTEGER NOT NULL,
+            created_at INTEGER NOT NULL,
+            last_used INTEGER NOT NULL
+        );""")
+        c.execute("CREATE INDEX IF NOT EXISTS ix_stage_cache_lru ON stage_cache(last_used);")
+
+@lru_cache(maxsize=None)
+def tool_version(tool_bin: str) -> str:
+    """Version string of a tool (`-version`), or a hash of its banner if none is found."""
+    try:
+        out = subprocess.run([tool_bin, "-version"], capture_output=True, text=True, timeout=30)
+        text = (out.stdout or "") + (out.stderr or "")
+    except Exception:
+        return "unknown"
+    m = re.search(r"v?(\d+\.\d+(?:\.\d+)?)", text)
+    return m.group(1) if m else hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+def cache_key(stage: str, inputs: Iterable[Path], tool_bin: str, flags: List[str]) -> str:
+    h = hashlib.sha256()
+    h.update(stage.encode("utf-8") + b"\0")
+    for p in inputs:
+        h.update(file_digest(p).encode("ascii") + b"\0")
+    h.update(tool_version(tool_bin).encode("utf-8") + b"\0")
+    h.update(json.dumps(list(flags)).encode("utf-8"))
+    return h.hexdigest()
+
+def _blob(sha: str) -> Path:
+    return OBJECTS_DIR / sha[:2] / sha
+
+def _count(stage: str, field: str):
+    STATS.setdefault(stage, {"hits": 0, "misses": 0})[field] += 1
+
+def fetch(stage: str, key: str, outputs: List[Path]) -> bool:
+    """
+    On a hit younger than the stage TTL, copy the cached outputs into place
+    and return True. Copies (not links) keep later in-place appends to run
+    artifacts from corrupting the shared store.
+    """
+    if not ENABLED:
+        return False
+    _init()
+    now = int(time.time())
+    ttl = DEFAULT_TTLS.get(stage, 3600)
+    with connect() as c:
+        row = c.execute("SELECT outputs, created_at FROM stage_cache WHERE key=?", (key,)).fetchone()
+        if not row or row[1] < now - ttl:
+            _count(stage, "misses")
+            return False
+        blobs = json.loads(row[0])
+        if len(blobs) != len(outputs) or not all(_blob(b).exists() for b in blobs):
+            c.execute("DELETE FROM stage_cache WHERE key=?", (key,))
+            _count(stage, "misses")
+            return False
+        try:
+            for sha, out in zip(blobs, outputs):
+                out = Path(out)
+                out.parent.mkdir(parents=True, exist_ok=True)
+                shutil.copyfile(_blob(sha), out)
+        except FileNotFoundError:
+            # evicted by another process between the check and the copy
+            _count(stage, "misses")
+            return False
+        c.execute("UPDATE stage_cache SET last_used=? WHERE key=?", (now, key))
+    _count(stage, "hits")
+    return True
+
+def store(stage: str, key: str, outputs: List[Path]):
+    """Save a stage's outputs under key, then evict LRU entries past MAX_BYTES."""
+    if not ENABLED:
+        return
+    _init()
+    blobs, size = [], 0
+    for out in outputs:
+        sha = file_digest(out)
+        if not sha:
+            return  # incomplete output: never cache it
+        dst = _blob(sha)
+        if not dst.exists():
+            dst.parent.mkdir(parents=True, exist_ok=True)
+            tmp = dst.with_name(f"{sha}.{os.getpid()}.tmp")   # private to this process
+            shutil.copyfile(out, tmp)
+            os.replace(tmp, dst)
+        blobs.append(sha)
+        size += dst.stat().st_size
+    now = int(time.time())
+    with connect() as c:
+        c.execute("INSERT OR REPLACE INTO stage_cache VALUES(?,?,?,?,?,?)",
+                  (key, stage, json.dumps(blobs), size, now, now))
+    evict()
+
+def evict(max_bytes: Optional[int] = None):
+    """
+    Drop least-recently-used entries until the store fits, then delete the
+    blobs of those entries that no remaining entry shares. Other files are
+    left alone: they may be another process's store() in flight.
+    """
+    limit = MAX_BYTES if max_bytes is None else max_bytes
+    with connect() as c:
+        total = c.execute("SELECT COALESCE(SUM(size),0) FROM stage_cache").fetchone()[0]
+        if total <= limit:
+            return
+        dropped = set()
+        for key, size, outs in c.execute("SELECT key, size, outputs FROM stage_cache ORDER BY last_used").fetchall():
+            if total <= limit:
+                break
+            c.execute("DELETE FROM stage_cache WHERE key=?", (key,))
+            dropped.update(json.loads(outs))
+            total -= size
+        live = set()
+        for (outs,) in c.execute("SELECT outputs FROM stage_cache"):
+            live.update(json.loads(outs))
+    for sha in dropped - live:
+        _blob(sha).unlink(missing_ok=True)
+
+def summary() -> str:
+    """One-line hit-rate report, e.g. 'dnsx 1/1 hits, httpx 0/1 hits'."""
+    parts = []
+    for stage, st in sorted(STATS.items()):
+        total = st["hits"] + st["misses"]
+        parts.append(f"{stage} {st['hits']}/{total} hits")
+    return ", ".join(parts)
@@ -1,8 +1,158 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import requests
+import urllib3
+
 from .util import resolve_binary, run_cmd
+from .resolve import iter_records
+from . import governor
+
+urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)   # takeover pages often have broken TLS
 
 def run_subjack(hosts_file: str, out_file: str, fingerprints: str | None = None):
     subjack = resolve_binary("subjack", candidates=["/opt/homebrew/bin/subjack","/usr/local/bin/subjack"])
     cmd = [subjack, "-w", hosts_file, "-o", out_file, "-ssl"]
     if fingerprints:
         cmd += ["-c", fingerprints]
-    run_cmd(cmd, check=False)
+    with governor.acquire("subjack"):
+        run_cmd(cmd, check=False)
+
+# Only a name whose CNAME points at a provider that lets anyone claim the
+# target can be taken over, so candidates are picked from the CNAMEs dnsx
+# already returned instead of re-resolving and fetching every host.
+# Entries use subjack's fingerprints.json schema, so its (or any
+# can-i-take-over-xyz derived) file can be passed in instead:
+#   service, cname (target suffixes), fingerprint (body strings), nxdomain
+#   (claimable when the CNAME target itself does not resolve).
+FINGERPRINTS = [
+    {"service": "github", "cname": ["github.io"], "fingerprint": ["There isn't a GitHub Pages site here."], "nxdomain": False},
+    {"service": "heroku", "cname": ["herokudns.com", "herokussl.com", "herokuapp.com"], "fingerprint": ["No such app", "herokucdn.com/error-pages/no-such-app.html"], "nxdomain": False},
+    {"service": "aws/s3", "cname": ["amazonaws.com"], "fingerprint": ["The specified bucket does not exist", "NoSuchBucket"], "nxdomain": False},
+    {"service": "azure", "cname": ["azurewebsites.net", "cloudapp.net", "cloudapp.azure.com", "trafficmanager.net", "blob.core.windows.net", "azure-api.net", "azureedge.net", "azurefd.net"], "fingerprint": [], "nxdomain": True},
+    {"service": "shopify", "cname": ["myshopify.com"], "fingerprint": ["Sorry, this shop is currently unavailable."], "nxdomain": False},
+    {"service": "fastly", "cname": ["fastly.net"], "fingerprint": ["Fastly error: unknown domain"], "nxdomain": False},
+    {"service": "pantheon", "cname": ["pantheonsite.io"], "fingerprint": ["The gods are wise, but do not know of the site which you seek."], "nxdomain": False},
+    {"service": "tumblr", "cname": ["domains.tumblr.com"], "fingerprint": ["Whatever you were looking for doesn't currently exist at this address."], "nxdomain": False},
+    {"service": "zendesk", "cname": ["zendesk.com"], "fingerprint": ["Help Center Closed"], "nxdomain": False},
+    {"service": "surge", "cname": ["surge.sh"], "fingerprint": ["project not found"], "nxdomain": False},
+    {"service": "bitbucket", "cname": ["bitbucket.io"], "fingerprint": ["Repository not found"], "nxdomain": False},
+    {"service": "ghost", "cname": ["ghost.io"], "fingerprint": ["The thing you were looking for is no longer here, or never was"], "nxdomain": False},
+    {"service": "readme", "cname": ["readme.io"], "fingerprint": ["Project doesnt exist... yet!"], "nxdomain": False},
+    {"service": "unbounce", "cname": ["unbouncepages.com"], "fingerprint": ["The requested URL was not found on this server."], "nxdomain": False},
+    {"service": "wordpress", "cname": ["wordpress.com"], "fingerprint": ["Do you want to register"], "nxdomain": False},
+    {"service": "helpjuice", "cname": ["helpjuice.com"], "fingerprint": ["We could not find what you're looking for."], "nxdomain": False},
+    {"service": "helpscout", "cname": ["helpscoutdocs.com"], "fingerprint": ["No settings were found for this company:"], "nxdomain": False},
+    {"service": "strikingly", "cname": ["s.strikinglydns.com"], "fingerprint": ["page not found"], "nxdomain": False},
+    {"service": "uptimerobot", "cname": ["stats.uptimerobot.com"], "fingerprint": ["page not found"], "nxdomain": False},
+    {"service": "agilecrm", "cname": ["agilecrm.com"], "fingerprint": ["Sorry, this page is no longer available."], "nxdomain": False},
+]
+
+def load_fingerprints(path: str | None = None) -> list[dict]:
+    """The built-in table, or a subjack-style fingerprints.json."""
+    if not path:
+        return FINGERPRINTS
+    data = json.loads(Path(path).read_text(encoding="utf-8"))
+    return [e for e in data if e.get("cname")]
+
+def build_index(fingerprints: list[dict]) -> dict:
+    """{cname suffix: entry}; a lookup walks the target's label suffixes, so it is O(labels)."""
+    index = {}
+    for e in fingerprints:
+        for suffix in e.get("cname") or []:
+            index.setdefault(suffix.lower().strip(".").lstrip("*."), e)
+    return index
+
+def match_provider(target: str, index: dict) -> tuple[str, dict] | None:
+    labels = target.lower().rstrip(".").split(".")
+    for i in range(len(labels)):
+        e = index.get(".".join(labels[i:]))
+        if e:
+            return ".".join(labels[i:]), e
+    return None
+
+def select_candidates(records_file: str, index: dict):
+    """
+    Yield {"host", "cname", "provider", "dangling"} for every resolved name
+    whose CNAME chain ends up at a fingerprinted provider. `dangling` means
+    the chain has no A/AAAA at the end.
+    """
+    for rec in iter_records(records_file):
+        for target in reversed(rec.get("cname") or []):   # last hop first
+            hit = match_provider(target, index)
+            if hit:
+                yield {
+                    "host": rec["host"], "cname": target.lower().rstrip("."),
+                    "provider": hit[1].get("service", hit[0]),
+                    "dangling": not (rec.get("a") or rec.get("aaaa")),
+                }
+                break
+
+def _http_check(cand: dict, entry: dict, timeout: float) -> dict:
+    out = dict(cand, status="not_vulnerable", evidence="")
+    if entry.get("nxdomain"):
+        if cand["dangling"]:
+            out.update(status="vulnerable", evidence=f"CNAME target {cand['cname']} does not resolve")
+        return out
+    if cand["dangling"]:
+        out.update(status="dangling", evidence=f"CNAME target {cand['cname']} does not resolve")
+        return out
+    fps = [f for f in entry.get("fingerprint") or [] if f]
+    for scheme in ("https", "http"):
+        try:
+            r = requests.get(f"{scheme}://{cand['host']}/", timeout=timeout, verify=False,
+                             allow_redirects=True)
+        except requests.RequestException as e:
+            out["evidence"] = str(e)[:200]
+            continue
+        body = r.text[:200_000]
+        for fp in fps:
+            if fp in body:
+                out.update(status="vulnerable", evidence=f"{scheme} {r.status_code}: {fp!r}")
+                return out
+        out["evidence"] = f"{scheme} {r.status_code}: no fingerprint"
+        return out
+    out["status"] = "unreachable"
+    return out
+
+def check_takeovers(
+    records_file: str,
+    out_candidates: str,
+    out_findings: str,
+    fingerprints: str | None = None,
+    workers: int = 50,
+    timeout: float = 5.0,
+) -> dict:
+    """
+    Select candidates from records_file (run_dnsx's JSONL) via the fingerprint
+    index, then HTTP-check only those, `workers` at a time. The checks hold
+    one governor lease reserving `workers` req/s (each worker has at most one
+    request in flight) and shrink to the rate granted.
+    out_candidates gets every candidate with its check result; out_findings
+    only the ones marked vulnerable or dangling.
+    Returns {"records", "candidates", "vulnerable", "dangling"}.
+    """
+    entries = load_fingerprints(fingerprints)
+    index = build_index(entries)
+    records = sum(1 for _ in iter_records(records_file))
+    cands = list(select_candidates(records_file, index))
+
+    results = []
+    if cands:
+        with governor.acquire("takeovers", workers) as granted, \
+                ThreadPoolExecutor(max_workers=max(1, granted)) as pool:
+            results = list(pool.map(lambda c: _http_check(c, match_provider(c["cname"], index)[1], timeout), cands))
+
+    with open(out_candidates, "w", encoding="utf-8") as cf, open(out_findings, "w", encoding="utf-8") as ff:
+        for r in results:
+            line = json.dumps(r) + "\n"
+            cf.write(line)
+            if r["status"] in ("vulnerable", "dangling"):
+                ff.write(line)
+    return {
+        "records": records,
+        "candidates": len(cands),
+        "vulnerable": sum(1 for r in results if r["status"] == "vulnerable"),
+        "dangling": sum(1 for r in results if r["status"] == "dangling"),
+    }
@@ -1,17 +1,145 @@
+import hashlib
+import json
+import time
 from pathlib import Path
-from .util import resolve_binary, run_cmd, append_unique_lines
+from .util import resolve_binary, stream_cmd
+from .resolve import run_dnsx
+from . import cache, governor
 
-def run_tlsx(hosts_file: str, out_names_file: str):
+def _cert_names(obj: dict) -> list[str]:
+    names = [obj.get("subject_cn") or ""] + list(obj.get("subject_an") or [])
+    return sorted({n.strip().lower().rstrip(".") for n in names if n and n.strip()})
+
+def handshake(hosts: list[str], work_file: Path, raw_out: Path) -> dict:
+    """
+    TLS-handshake hosts with `tlsx -json` and return {host: (fingerprint, names)}
+    for every host that presented a certificate. Raw rows are appended to raw_out.
+    """
+    if not hosts:
+        return {}
     tlsx = resolve_binary("tlsx", candidates=["/opt/homebrew/bin/tlsx","/usr/local/bin/tlsx"])
-    cmd = [tlsx, "-l", hosts_file, "-san", "-cn", "-silent", "-resp-only"]
-    out = run_cmd(cmd, check=False)
-    names = []
-    for line in out.stdout.splitlines():
-        for part in line.split(","):
-            s = part.strip()
-            if s:
-                names.append(s)
-    Path(out_names_file).write_text("\n".join(sorted(set(names))) + ("\n" if names else ""))
-
-def merge_names_into_subs(names_file: str, subs_file: str):
-    append_unique_lines(names_file, subs_file)
+    work_file.write_text("\n".join(hosts) + "\n", encoding="utf-8")
+    cmd = [tlsx, "-l", str(work_file), "-json", "-san", "-cn", "-hash", "sha256", "-silent"]
+    certs: dict = {}
+    with raw_out.open("a", encoding="utf-8") as rf:
+
+        def on_line(line: str):
+            try:
+                obj = json.loads(line)
+            except (json.JSONDecodeError, ValueError):
+                return
+            host = (obj.get("host") or obj.get("input") or "").strip().lower()
+            if not host:
+                return
+            rf.write(line + "\n")
+            names = _cert_names(obj)
+            fp = (obj.get("fingerprint_hash") or {}).get("sha256") or ""
+            if not fp:
+                # older tlsx without -hash: identify the cert by its name set
+                fp = "names:" + hashlib.sha256("\n".join(names).encode("utf-8")).hexdigest()
+            certs[host] = (fp, names)
+
+        with governor.acquire("tlsx"):
+            rc, err = stream_cmd(cmd, on_line)
+    if rc != 0 and not certs:
+        raise RuntimeError(f"tlsx exited {rc}: {err.strip()}")
+    return certs
+
+def _in_scope(name: str, domain: str) -> bool:
+    return name == domain or name.endswith("." + domain)
+
+def expand_via_tls(
+    live_file: str,
+    records_file: str,
+    subs_file: str,
+    domain: str,
+    out_dir: str,
+    out_live_file: str,
+    out_records_file: str,
+    max_rounds: int = 3,
+    cert_ttl_hours: int = 24,
+    use_dns_cache: bool = True,
+) -> dict:
+    """
+    Follow certificates transitively until no new in-scope names appear.
+
+    Round 1 handshakes the resolved hosts; every later round only resolves and
+    handshakes the *frontier* — names first seen in a CN/SAN the round before.
+    Certificates are tracked by fingerprint: a cert already expanded (this run,
+    or served from the cross-run cache for hosts handshaked within
+    cert_ttl_hours) contributes nothing new and is not re-parsed.
+
+    Writes, under out_dir: tls_certs.jsonl (raw tlsx rows) and tls_names.txt
+    (new names found). out_live_file / out_records_file are live_file /
+    records_file plus every newly resolved name, for downstream stages.
+    Returns {"rounds", "handshaked", "cache_hits", "certs", "new_names", "new_live"}.
+    """
+    out = Path(out_dir)
+    out.mkdir(parents=True, exist_ok=True)
+    domain = domain.strip().lower().rstrip(".")
+    raw_certs = out / "tls_certs.jsonl"
+    raw_certs.write_text("", encoding="utf-8")
+    names_file = out / "tls_names.txt"
+    names_file.write_text("", encoding="utf-8")
+
+    def read_names(p) -> list[str]:
+        p = Path(p)
+        if not p.exists():
+            return []
+        return [l.strip().lower() for l in p.read_text(encoding="utf-8", errors="ignore").splitlines() if l.strip()]
+
+    live = read_names(live_file)
+    known = set(read_names(subs_file)) | set(live)
+    out_live = Path(out_live_file)
+    out_records = Path(out_records_file)
+    out_live.write_text("".join(h + "\n" for h in live), encoding="utf-8")
+    src_records = Path(records_file)
+    out_records.write_text(src_records.read_text(encoding="utf-8") if src_records.exists() else "",
+                           encoding="utf-8")
+
+    cache.init_db()
+    seen_fps: set = set()
+    stats = {"rounds": 0, "handshaked": 0, "cache_hits": 0, "certs": 0, "new_names": 0, "new_live": 0}
+    frontier = live
+    while frontier and stats["rounds"] < max_rounds:
+        stats["rounds"] += 1
+        now = int(time.time())
+        cached = cache.tls_cache_lookup(frontier, cert_ttl_hours * 3600, now)
+        todo = [h for h in frontier if h not in cached]
+        fresh = handshake(todo, out / "tls_input.txt", raw_certs)
+        cache.tls_cache_store(todo, fresh, now)
+        stats["handshaked"] += len(todo)
+        stats["cache_hits"] += len(frontier) - len(todo)
+
+        found = []
+        for fp, names in list(cached.values()) + list(fresh.values()):
+            if not fp or fp in seen_fps:
+                continue
+            seen_fps.add(fp)
+            for n in names:
+                n = n[2:] if n.startswith("*.") else n
+                if _in_scope(n, domain) and n not in known:
+                    known.add(n)
+                    found.append(n)
+        stats["certs"] = len(seen_fps)
+        if not found:
+            break
+        stats["new_names"] += len(found)
+        with names_file.open("a", encoding="utf-8") as f:
+            f.write("".join(n + "\n" for n in found))
+
+        # resolve only the frontier; what resolves is handshaked next round
+        round_in = out / f"tls_round{stats['rounds']}_names.txt"
+        round_live = out / f"tls_round{stats['rounds']}_live.txt"
+        round_records = out / f"tls_round{stats['rounds']}_records.jsonl"
+        round_in.write_text("\n".join(found) + "\n", encoding="utf-8")
+        run_dnsx(round_in, round_live, records_file=round_records, use_cache=use_dns_cache)
+        frontier = read_names(round_live)
+        stats["new_live"] += len(frontier)
+        with out_live.open("a", encoding="utf-8") as f:
+            f.write("".join(h + "\n" for h in frontier))
+        with out_records.open("a", encoding="utf-8") as f:
+            f.write(round_records.read_text(encoding="utf-8"))
+        for p in (round_in, round_live, round_records):
+            p.unlink(missing_ok=True)
+    return stats
@@ -0,0 +1,220 @@
+# src/pipeline/urlfilter.py
+from __future__ import annotations
+import json, re
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from .artifactset import ArtifactSet
+
+# Archived (gau) and crawled (katana) URL lists are dominated by assets nuclei
+# has nothing to say about and by the same page under different tracking
+# parameters. Everything is canonicalised and filtered on the way into the URL
+# set, one line at a time, so a multi-million-line gau dump is never held in
+# memory and only distinct, scannable URLs reach nuclei.
+
+STATIC_EXTS = frozenset({
+    # images
+    "apng", "avif", "bmp", "gif", "ico", "jpeg", "jpg", "png", "svg", "tif", "tiff", "webp",
+    # fonts
+    "eot", "otf", "ttf", "woff", "woff2",
+    # styles
+    "css", "less", "scss",
+    # audio / video
+    "avi", "flac", "flv", "m4a", "m4v", "mkv", "mov", "mp3", "mp4", "mpeg", "ogg", "wav", "webm", "wmv",
+})
+# .js, .json, .map, .xml, archives and documents are kept: they are where
+# secrets, endpoints and exposed backups turn up.
+
+TRACKING_PARAMS = frozenset({
+    "_ga", "_gl", "dclid", "fbclid", "gclid", "gclsrc", "igshid", "mc_cid", "mc_eid",
+    "msclkid", "yclid", "_hsenc", "_hsmi", "mkt_tok",
+})
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+def _is_tracking(key: str) -> bool:
+    k = key.lower()
+    return k in TRACKING_PARAMS or k.startswith("utm_")
+
+def canonical_url(raw: str) -> Optional[str]:
+    """
+    Canonical form of an http(s) URL, or None if it isn't one:
+    lowercase scheme and host, no default port, no userinfo or fragment,
+    tracking parameters dropped and the rest sorted (raw, so encodings are
+    untouched). A bare root renders as `https://host`, as httpx writes it.
+    """
+    s = (raw or "").strip()
+    if not s:
+        return None
+    try:
+        parts = urlsplit(s)
+        port = parts.port
+    except ValueError:
+        return None
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").rstrip(".")
+    if scheme not in DEFAULT_PORTS or not host or any(c.isspace() for c in host):
+        return None
+    netloc = f"[{host}]" if ":" in host else host
+    if port is not None and port != DEFAULT_PORTS[scheme]:
+        netloc += f":{port}"
+    pairs = [p for p in parts.query.split("&") if p and not _is_tracking(p.split("=", 1)[0])]
+    query = "&".join(sorted(pairs))
+    path = parts.path or "/"
+    if path == "/" and not query:
+        return f"{scheme}://{netloc}"
+    return f"{scheme}://{netloc}{path}" + (f"?{query}" if query else "")
+
+def is_static(url: str, exts: frozenset = STATIC_EXTS) -> bool:
+    """True if the URL path ends in a static-asset extension (query ignored)."""
+    path = urlsplit(url).path
+    last = path.rsplit("/", 1)[-1]
+    if "." not in last:
+        return False
+    return last.rsplit(".", 1)[-1].lower() in exts
+
+def in_scope(url: str, domain: str) -> bool:
+    host = (urlsplit(url).hostname or "").rstrip(".")
+    return host == domain or host.endswith("." + domain)
+
+def _iter_lines(p: Path) -> Iterator[str]:
+    with p.open("r", encoding="utf-8", errors="ignore") as f:
+        for line in f:
+            yield line
+
+def canonical_stream(lines: Iterable[str], stats: Dict[str, int], scope: str = "",
+                     exts: frozenset = STATIC_EXTS) -> Iterator[str]:
+    """Yield canonical, in-scope, non-static URLs, counting what was dropped in stats."""
+    scope = scope.strip().lower().rstrip(".")
+    for line in lines:
+        if not line.strip():
+            continue
+        stats["read"] += 1
+        url = canonical_url(line)
+        if url is None:
+            stats["invalid"] += 1
+        elif scope and not in_scope(url, scope):
+            stats["out_of_scope"] += 1
+        elif is_static(url, exts):
+            stats["static"] += 1
+        else:
+            stats["canonical"] += 1
+            yield url
+
+def new_stats() -> Dict[str, int]:
+    return {"read": 0, "invalid": 0, "out_of_scope": 0, "static": 0, "canonical": 0,
+            "duplicate": 0, "added": 0}
+
+def _ratios(st: Dict[str, int]) -> Dict:
+    read = st["read"]
+    st = dict(st)
+    st["reduction"] = round(1 - st["added"] / read, 4) if read else 0.0
+    return st
+
+def filter_into(urls: ArtifactSet, src: str | Path, scope: str = "",
+                exts: frozenset = STATIC_EXTS) -> Dict:
+    """
+    Stream src through canonical_stream into the URL set.
+    Returns counts plus `reduction` (share of src lines that did not become a new URL).
+    """
+    st = new_stats()
+    p = Path(src)
+    if p.exists():
+        st["added"] = urls.add_lines(canonical_stream(_iter_lines(p), st, scope, exts))
+        st["duplicate"] = st["canonical"] - st["added"]
+    return _ratios(st)
+
+def merge_discovered(
+    sources: List[Tuple[str, Path]],
+    base_urls: Path,
+    out_file: Path,
+    scope: str = "",
+    report_file: Optional[Path] = None,
+) -> Dict:
+    """
+    Build out_file = base_urls (the probed URLs, as-is) plus the filtered URLs
+    of each (name, path) source, in order, so duplicates are charged to the
+    later source. Per-source and total counts go to report_file as JSON.
+    """
+    out_file = Path(out_file)
+    for p in (out_file, out_file.with_name(out_file.name + ".idx")):
+        p.unlink(missing_ok=True)
+    report: Dict = {"sources": {}}
+    with ArtifactSet(out_file) as urls:
+        report["base"] = urls.merge_file(base_urls)
+        total = new_stats()
+        for name, path in sources:
+            st = filter_into(urls, path, scope)
+            report["sources"][name] = st
+            for k in total:
+                total[k] += st[k]
+        report["total"] = _ratios(total)
+        report["urls"] = len(urls)
+    if report_file:
+        Path(report_file).write_text(json.dumps(report, indent=2), encoding="utf-8")
+    return report
+
+# ---------- shape clustering ----------
+# /item/123, /item/124 and /item/125?ref=x run the same handler; scanning one
+# or two of them finds what scanning all of them would. A URL's shape is its
+# origin, its path with ID-like segments abstracted, and its parameter names.
+
+_NUM = re.compile(r"^\d+$")
+_UUID = re.compile(r"^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$", re.I)
+_HEX = re.compile(r"^[0-9a-f]{8,}$", re.I)
+_TOKEN = re.compile(r"^[A-Za-z0-9_\-]{20,}$")
+
+def _segment_shape(seg: str) -> str:
+    stem, dot, ext = seg.partition(".")
+    if not stem:
+        return seg
+    if _NUM.match(stem):
+        shape = "{n}"
+    elif _UUID.match(stem):
+        shape = "{uuid}"
+    elif _HEX.match(stem) and any(c.isdigit() for c in stem):
+        shape = "{hex}"
+    elif _TOKEN.match(stem) and any(c.isdigit() for c in stem) and any(c.isalpha() for c in stem):
+        shape = "{token}"
+    else:
+        return seg
+    return shape + dot + ext
+
+def shape_key(url: str) -> str:
+    """scheme://host[:port]/path/{n}/template?param&names for a canonical URL."""
+    parts = urlsplit(url)
+    path = "/".join(_segment_shape(s) for s in parts.path.split("/"))
+    names = sorted({p.split("=", 1)[0] for p in parts.query.split("&") if p})
+    return f"{parts.scheme}://{parts.netloc}{path}" + ("?" + "&".join(names) if names else "")
+
+def cluster_representatives(src: Path, out_file: Path, reps: int = 3,
+                            report_file: Optional[Path] = None, top: int = 20) -> Dict:
+    """
+    Stream src and write at most `reps` URLs per shape to out_file, keeping
+    the first ones seen (for urls_all.txt: the probed URLs come first).
+    Memory is one counter per shape, not per URL.
+    Returns {"urls", "clusters", "kept", "reduction", "largest": [[shape, size], ...]}.
+    """
+    sizes: Dict[str, int] = {}
+    urls = kept = 0
+    with Path(out_file).open("w", encoding="utf-8") as out:
+        for line in _iter_lines(Path(src)):
+            u = line.strip()
+            if not u:
+                continue
+            urls += 1
+            k = shape_key(u)
+            n = sizes.get(k, 0)
+            sizes[k] = n + 1
+            if n < reps:
+                out.write(u + "\n")
+                kept += 1
+    largest = sorted(sizes.items(), key=lambda kv: (-kv[1], kv[0]))[:top]
+    report = {
+        "urls": urls, "clusters": len(sizes), "kept": kept, "reps": reps,
+        "reduction": round(1 - kept / urls, 4) if urls else 0.0,
+        "largest": [[k, n] for k, n in largest if n > 1],
+    }
+    if report_file:
+        Path(report_file).write_text(json.dumps(report, indent=2), encoding="utf-8")
+    return report
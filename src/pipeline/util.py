@@ -2,31 +2,47 @@ import os
 import shutil
 import subprocess
 import sys
+import tempfile
 from pathlib import Path
 
-# --- append to your existing src/pipeline/util.py ---
-
-import subprocess
-from pathlib import Path
+from . import metrics
+from .artifactset import ArtifactSet
 
 def run_cmd(cmd: list[str], check: bool = True) -> subprocess.CompletedProcess:
     """Run a command and return the CompletedProcess, raising if check=True and exit!=0."""
     return subprocess.run(cmd, text=True, capture_output=True, check=check)
 
-def append_unique_lines(src_file: str | Path, dst_file: str | Path):
-    """Append unique, non-empty lines from src_file to dst_file."""
-    src = Path(src_file)
-    dst = Path(dst_file)
-    dst.parent.mkdir(parents=True, exist_ok=True)
-    have = set()
-    if dst.exists():
-        have = {l.strip() for l in dst.read_text().splitlines() if l.strip()}
-    if src.exists():
-        new = [l.strip() for l in src.read_text().splitlines() if l.strip() and l.strip() not in have]
-        if new:
-            with dst.open("a") as f:
-                for line in new:
-                    f.write(line + "\n")
+def stream_cmd(cmd: list[str], on_line, stderr_tail: int = 4000) -> tuple[int, str]:
+    """
+    Run a command and hand each stdout line to on_line as soon as it is emitted.
+    stderr is spooled to a temp file rather than a pipe so a chatty tool can't
+    deadlock us, and only its last `stderr_tail` bytes are returned.
+    Returns (returncode, stderr_tail_text).
+    """
+    with tempfile.TemporaryFile() as errf:
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=errf,
+                                text=True, bufsize=1, errors="replace")
+        try:
+            for line in proc.stdout:
+                on_line(line.rstrip("\n"))
+        except BaseException:
+            proc.kill()
+            raise
+        finally:
+            proc.stdout.close()
+            rc = metrics.reap(proc)
+        size = errf.seek(0, os.SEEK_END)
+        errf.seek(max(0, size - stderr_tail))
+        err = errf.read().decode("utf-8", errors="replace")
+    return rc, err
+
+def append_unique_lines(src_file: str | Path, dst_file: str | Path) -> int:
+    """
+    Append unique, non-empty lines from src_file to dst_file; returns how many
+    were new. dst_file's hash index (<dst>.idx) means only src is read.
+    """
+    with ArtifactSet(dst_file) as dst:
+        return dst.merge_file(src_file)
 
 
 def _run_ok(args):
@@ -113,29 +129,8 @@ def require_nonempty_file(path: str, label: str) -> str:
         sys.exit(f"[fatal] {label} is empty: {path}")
     return str(p)
 
-from pathlib import Path
-import subprocess
-
-def run_cmd(cmd: list[str], check: bool = True) -> subprocess.CompletedProcess:
-    return subprocess.run(cmd, text=True, capture_output=True, check=check)
-
-def append_unique_lines(src_file: str | Path, dst_file: str | Path):
-    src = Path(src_file); dst = Path(dst_file)
-    dst.parent.mkdir(parents=True, exist_ok=True)
-    have = set()
-    if dst.exists():
-        have = {l.strip() for l in dst.read_text().splitlines() if l.strip()}
-    if src.exists():
-        new = [l.strip() for l in src.read_text().splitlines() if l.strip() and l.strip() not in have]
-        if new:
-            with dst.open("a", encoding="utf-8") as f:
-                for line in new:
-                    f.write(line + "\n")
-
 # --- feature sniffers for CLI flags ---
 
-import subprocess
-
 def httpx_help(httpx_bin: str) -> str:
     try:
         out = subprocess.run([httpx_bin, "-h"], text=True, capture_output=True, check=False)
@@ -0,0 +1,18 @@
+# src/report/frames.py
+import json
+from pathlib import Path
+
+import pandas as pd
+
+def jsonl_to_df(path: Path, max_rows: int = 10000) -> pd.DataFrame:
+    """First max_rows JSON lines of path as a DataFrame (bad lines skipped, empty if missing)."""
+    rows = []
+    if not path.exists(): return pd.DataFrame()
+    with path.open("r", encoding="utf-8", errors="ignore") as f:
+        for i, line in enumerate(f):
+            if i >= max_rows: break
+            s = line.strip()
+            if not s: continue
+            try: rows.append(json.loads(s))
+            except Exception: pass
+    return pd.DataFrame(rows) if rows else pd.DataFrame()
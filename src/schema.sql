@@ -16,9 +16,12 @@ CREATE TABLE IF NOT EXISTS subdomain (
   id        INTEGER PRIMARY KEY,
   run_id    INTEGER NOT NULL REFERENCES run(id) ON DELETE CASCADE,
   name      TEXT NOT NULL,
+  rname     TEXT,            -- reversed labels + '.', e.g. 'edu.monash.apps.' (see db.rname_key)
   UNIQUE(run_id, name)
 );
 CREATE INDEX IF NOT EXISTS ix_subdomain_name ON subdomain(name);
+-- zone/suffix queries are range scans on rname
+CREATE INDEX IF NOT EXISTS ix_subdomain_rname ON subdomain(rname, run_id);
 
 CREATE TABLE IF NOT EXISTS live_host (
   id        INTEGER PRIMARY KEY,
@@ -76,6 +79,22 @@ CREATE TABLE IF NOT EXISTS known_vuln (
 );
 CREATE INDEX IF NOT EXISTS ix_known_vuln_cve ON known_vuln(cve);
 
+CREATE TABLE IF NOT EXISTS stage_metric (
+  id            INTEGER PRIMARY KEY,
+  run_id        INTEGER NOT NULL REFERENCES run(id) ON DELETE CASCADE,
+  stage         TEXT NOT NULL,
+  started_at    REAL,            -- unix epoch seconds
+  wall_s        REAL,
+  cpu_s         REAL,            -- user+sys CPU of child processes
+  peak_rss_kb   INTEGER,
+  items_in      INTEGER,
+  items_out     INTEGER,
+  status        TEXT NOT NULL,   -- ok | failed | skipped
+  error         TEXT,
+  UNIQUE(run_id, stage)
+);
+CREATE INDEX IF NOT EXISTS ix_stage_metric_stage ON stage_metric(stage, started_at);
+
 -- Full-text indexes (optional but handy)
 CREATE VIRTUAL TABLE IF NOT EXISTS url_fts USING fts5(url, host, content='url', content_rowid='id');
 CREATE VIRTUAL TABLE IF NOT EXISTS httpx_fts USING fts5(url, title, content='httpx_row', content_rowid='id');
@@ -0,0 +1,79 @@
+import json
+
+from src.pipeline import cache, nucleistate
+
+
+def _setup(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache, "DB_PATH", tmp_path / "cache.sqlite")
+    urls = tmp_path / "urls.txt"
+    urls.write_text("https://a.example.com\n", encoding="utf-8")
+    http = tmp_path / "http.jsonl"
+    http.write_text(json.dumps({"url": "https://a.example.com", "status_code": 200,
+                                "content_length": 10, "hash": {"body_sha256": "x"}}) + "\n",
+                    encoding="utf-8")
+    return urls, http
+
+
+def _rows(path):
+    return [json.loads(l) for l in path.read_text(encoding="utf-8").splitlines() if l.strip()]
+
+
+def test_host_level_findings_are_carried_forward(tmp_path, monkeypatch):
+    urls, http = _setup(tmp_path, monkeypatch)
+    findings = [
+        {"template-id": "dns-caa", "type": "dns", "host": "a.example.com", "matched-at": "a.example.com"},
+        {"template-id": "weak-cipher", "type": "ssl", "host": "a.example.com:443",
+         "matched-at": "a.example.com:443"},
+        {"template-id": "unrelated", "type": "dns", "host": "other.test", "matched-at": "other.test"},
+    ]
+
+    def runner(in_file, out_file):
+        with open(out_file, "w", encoding="utf-8") as f:
+            for row in findings:
+                f.write(json.dumps(row) + "\n")
+
+    out1 = tmp_path / "run1.jsonl"
+    rep1 = nucleistate.run_incremental(urls, http, out1, tmp_path, runner, params={}, target="example.com")
+    assert rep1["scanned"] == 1 and len(_rows(out1)) == 3
+
+    def no_scan(in_file, out_file):
+        raise AssertionError("unchanged URL was rescanned")
+
+    out2 = tmp_path / "run2.jsonl"
+    rep2 = nucleistate.run_incremental(urls, http, out2, tmp_path, no_scan, params={}, target="example.com")
+    assert rep2["carried"] == 1 and rep2["scanned"] == 0
+    assert sorted(r["template-id"] for r in _rows(out2)) == ["dns-caa", "unrelated", "weak-cipher"]
+
+
+def test_unreported_orphans_expire_with_staggered_scans(tmp_path, monkeypatch):
+    urls, http = _setup(tmp_path, monkeypatch)
+    clock = [1_000_000]
+    monkeypatch.setattr(nucleistate.time, "time", lambda: clock[0])
+    stale = {"template-id": "stale-orphan", "type": "dns", "host": "gone.test", "matched-at": "gone.test"}
+    live = {"template-id": "live-orphan", "type": "dns", "host": "other.test", "matched-at": "other.test"}
+    report = [stale, live]
+
+    def runner(in_file, out_file):
+        with open(out_file, "w", encoding="utf-8") as f:
+            for row in report:
+                f.write(json.dumps(row) + "\n")
+
+    out = tmp_path / "out.jsonl"
+    nucleistate.run_incremental(urls, http, out, tmp_path, runner, params={}, rescan_hours=1, target="example.com")
+    report = [live]   # nuclei no longer reports the stale finding
+
+    # a second URL first scanned 30 minutes later, so no run rescans everything again
+    clock[0] += 1800
+    urls.write_text("https://a.example.com\nhttps://b.example.com\n", encoding="utf-8")
+    with http.open("a", encoding="utf-8") as f:
+        f.write(json.dumps({"url": "https://b.example.com", "status_code": 200,
+                            "content_length": 20, "hash": {"body_sha256": "y"}}) + "\n")
+    ids = []
+    for _ in range(10):
+        rep = nucleistate.run_incremental(urls, http, out, tmp_path, runner, params={},
+                                          rescan_hours=1, target="example.com")
+        assert rep["carried"] > 0
+        ids.append(sorted(r["template-id"] for r in _rows(out)))
+        clock[0] += 2400
+    assert ids[0] == ["live-orphan", "stale-orphan"]
+    assert all(i == ["live-orphan"] for i in ids[2:])